@@ -0,0 +1,571 @@
+"""
+Mesures de performance du module de gestion des T.P.E.
+Usage: python benchmark_tpe.py <scenario> [--tailles ...]  (voir --help)
+"""
+
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from tpe_arrow import ARROW_DISPONIBLE, chemin_cartes
+from tpe_compression import CODECS_DISPONIBLES
+from tpe_excel import coeurs_disponibles
+from tpe_mmap import InstantaneBinaire, sauvegarder_binaire
+from tpe_manager import (
+    GestionnaireTPE, TPE, Regisseur, AccesBackoffice,
+    TypeTPE, ConfigurationReseau, CarteCommercant,
+    positions_colonnes, tpe_depuis_ligne
+)
+
+CLASSES_MODELE = SimpleNamespace(
+    TPE=TPE, Regisseur=Regisseur, AccesBackoffice=AccesBackoffice,
+    TypeTPE=TypeTPE, ConfigurationReseau=ConfigurationReseau, CarteCommercant=CarteCommercant
+)
+
+
+def creer_tpe(shop_id: int, classes: SimpleNamespace = CLASSES_MODELE) -> TPE:
+    """Crée un TPE de test pour le ShopID donné (un sur quatre en Ethernet)"""
+    ethernet = shop_id % 4 == 0
+    config = None
+    if ethernet:
+        config = classes.ConfigurationReseau(
+            adresse_ip=f"10.{(shop_id >> 16) & 255}.{(shop_id >> 8) & 255}.{shop_id & 255}",
+            masque="255.255.0.0",
+            passerelle=f"10.{(shop_id >> 16) & 255}.0.1"
+        )
+    return classes.TPE(
+        service=f"Service {shop_id % 300}",
+        regisseur=classes.Regisseur(prenom="Jean", nom=f"Dupont{shop_id % 1000}", telephone="0601020304"),
+        regisseurs_suppleants="",
+        cartes_commercant=[classes.CarteCommercant(numero=f"C{shop_id}", numero_serie_tpe=f"SN{shop_id}")],
+        shop_id=shop_id,
+        acces_backoffice=classes.AccesBackoffice(
+            actif=shop_id % 2 == 0, email="regie@mairie.fr" if shop_id % 2 == 0 else None),
+        modele_tpe="Ingenico Move 5000" if shop_id % 3 else "Ingenico Desk 5000",
+        type_tpe=classes.TypeTPE(ethernet=ethernet, quatre_cinq_g=not ethernet, config_reseau=config)
+    )
+
+
+def chronometrer(fonction, repetitions: int) -> float:
+    """Retourne le temps moyen d'un appel en microsecondes"""
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction()
+    return (time.perf_counter() - debut) / repetitions * 1e6
+
+
+# ========================================
+# INDEX SHOPID
+# ========================================
+
+class _GestionnaireLineaire:
+    """Reproduction de l'ancien gestionnaire à parcours linéaire (référence)"""
+
+    def __init__(self, tpes):
+        self.tpes = list(tpes)
+
+    def ajouter_tpe(self, tpe):
+        if any(t.shop_id == tpe.shop_id for t in self.tpes):
+            return False
+        self.tpes.append(tpe)
+        return True
+
+    def rechercher_tpe(self, shop_id):
+        for tpe in self.tpes:
+            if tpe.shop_id == shop_id:
+                return tpe
+        return None
+
+    def modifier_tpe(self, shop_id, nouveau_tpe):
+        for i, tpe in enumerate(self.tpes):
+            if tpe.shop_id == shop_id:
+                self.tpes[i] = nouveau_tpe
+                return True
+        return False
+
+    def supprimer_tpe(self, shop_id):
+        self.tpes = [t for t in self.tpes if t.shop_id != shop_id]
+        return True
+
+
+def bench_index(tailles, operations: int):
+    """Compare le coût par opération avant/après l'index ShopID"""
+    print(f"{'Taille':>10} | {'Opération':<12} | {'Linéaire (µs)':>14} | {'Index (µs)':>11} | {'Gain':>8}")
+    print("-" * 68)
+    for taille in tailles:
+        flotte = [creer_tpe(i) for i in range(1, taille + 1)]
+        lineaire = _GestionnaireLineaire(flotte)
+        gestionnaire = GestionnaireTPE()
+        gestionnaire.tpes = flotte
+
+        cibles = [random.randint(1, taille) for _ in range(operations)]
+        nouveaux = [creer_tpe(taille + 1 + i) for i in range(operations)]
+
+        mesures = {}
+        for nom, impl in (("lineaire", lineaire), ("index", gestionnaire)):
+            it = iter(cibles)
+            mesures[(nom, "recherche")] = chronometrer(lambda: impl.rechercher_tpe(next(it)), operations)
+            it = iter(cibles)
+            mesures[(nom, "modification")] = chronometrer(
+                lambda: (lambda s: impl.modifier_tpe(s, impl.rechercher_tpe(s)))(next(it)), operations)
+            it = iter(nouveaux)
+            mesures[(nom, "ajout")] = chronometrer(lambda: impl.ajouter_tpe(next(it)), operations)
+            it = iter(nouveaux)
+            mesures[(nom, "suppression")] = chronometrer(lambda: impl.supprimer_tpe(next(it).shop_id), operations)
+
+        for operation in ("recherche", "modification", "ajout", "suppression"):
+            avant = mesures[("lineaire", operation)]
+            apres = mesures[("index", operation)]
+            print(f"{taille:>10} | {operation:<12} | {avant:>14.1f} | {apres:>11.2f} | {avant / apres:>7.0f}x")
+        del flotte, lineaire, gestionnaire
+
+
+# ========================================
+# EMPREINTE MÉMOIRE (__slots__)
+# ========================================
+
+def _classes_avec_dict() -> SimpleNamespace:
+    """Sous-classes sans __slots__ : chaque instance retrouve un __dict__ (ancien modèle)"""
+    return SimpleNamespace(**{
+        nom: type(f"{nom}AvecDict", (classe,), {})
+        for nom, classe in vars(CLASSES_MODELE).items()
+    })
+
+
+def mesurer_memoire(taille: int, classes: SimpleNamespace) -> float:
+    """Retourne le nombre d'octets alloués par TPE (tracemalloc)"""
+    gc.collect()
+    tracemalloc.start()
+    avant = tracemalloc.get_traced_memory()[0]
+    flotte = [creer_tpe(i, classes) for i in range(1, taille + 1)]
+    apres = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del flotte
+    return (apres - avant) / taille
+
+
+def bench_memoire(tailles):
+    """Compare l'empreinte mémoire par TPE avec et sans __slots__"""
+    avec_dict = _classes_avec_dict()
+    print(f"{'Taille':>10} | {'Avec __dict__ (o/TPE)':>22} | {'__slots__ (o/TPE)':>18} | {'Gain':>6}")
+    print("-" * 67)
+    for taille in tailles:
+        avant = mesurer_memoire(taille, avec_dict)
+        apres = mesurer_memoire(taille, CLASSES_MODELE)
+        print(f"{taille:>10} | {avant:>22.0f} | {apres:>18.0f} | {1 - apres / avant:>6.0%}")
+
+
+# ========================================
+# STOCKAGE COLONNAIRE (statistiques / rapports)
+# ========================================
+
+def bench_colonnes(tailles, repetitions: int):
+    """Compare statistiques() et rapport_par() : parcours d'objets vs miroir colonnaire"""
+    print(f"{'Taille':>10} | {'Calcul':<22} | {'Objets (ms)':>12} | {'Colonnes (ms)':>14} | {'Gain':>6}")
+    print("-" * 78)
+    for taille in tailles:
+        flotte = [creer_tpe(i) for i in range(1, taille + 1)]
+        objets = GestionnaireTPE()
+        objets.tpes = flotte
+        colonnes = GestionnaireTPE(colonnes=True)
+        colonnes.tpes = flotte
+        for nom, calcul in (
+            ("statistiques", lambda g: g.colonnes.statistiques() if g.colonnes else g._recompter_statistiques()),
+            ("rapport_par(modele)", lambda g: g.rapport_par('modele_tpe')),
+            ("rapport_par(service)", lambda g: g.rapport_par('service')),
+        ):
+            avant = chronometrer(lambda: calcul(objets), repetitions) / 1000
+            apres = chronometrer(lambda: calcul(colonnes), repetitions) / 1000
+            print(f"{taille:>10} | {nom:<22} | {avant:>12.2f} | {apres:>14.2f} | {avant / apres:>5.0f}x")
+        compteurs = chronometrer(objets.statistiques, repetitions) / 1000
+        print(f"{taille:>10} | {'statistiques() (compteurs incrémentaux)':<22} : {compteurs:.4f} ms")
+        del flotte, objets, colonnes
+
+
+# ========================================
+# JOURNAL vs RÉÉCRITURE COMPLÈTE
+# ========================================
+
+def bench_journal(tailles, operations: int):
+    """Latence d'une modification : sauvegarde complète (pickle + JSON) vs ajout au journal"""
+    print(f"{'Taille':>10} | {'Réécriture (ms)':>16} | {'Journal (ms)':>13} | {'Gain':>8}")
+    print("-" * 57)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            gestionnaire.fichier_sauvegarde = os.path.join(dossier, "data.pkl")
+            gestionnaire.fichier_backup = os.path.join(dossier, "backup.json")
+            cibles = iter(random.sample(range(1, taille + 1), operations))
+
+            def reecriture():
+                shop_id = next(cibles)
+                gestionnaire.modifier_tpe(shop_id, creer_tpe(shop_id))
+                gestionnaire.sauvegarder()
+                gestionnaire.backup_json()
+
+            avant = chronometrer(reecriture, operations // 2) / 1000
+            gestionnaire.activer_journal(os.path.join(dossier, f"journal_{taille}.ndjson"))
+
+            def journal():
+                shop_id = next(cibles)
+                gestionnaire.modifier_tpe(shop_id, creer_tpe(shop_id))
+
+            apres = chronometrer(journal, operations // 2) / 1000
+            gestionnaire.desactiver_journal()
+            print(f"{taille:>10} | {avant:>16.2f} | {apres:>13.3f} | {avant / apres:>7.0f}x")
+
+
+# ========================================
+# SAUVEGARDE JSON vs NDJSON (pic mémoire)
+# ========================================
+
+def mesurer_pic(fonction) -> tuple:
+    """Retourne (durée en s, pic mémoire alloué en Mo) d'un appel"""
+    gc.collect()
+    tracemalloc.start()
+    debut = time.perf_counter()
+    fonction()
+    duree = time.perf_counter() - debut
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duree, pic / 1e6
+
+
+def bench_ndjson(tailles):
+    """Durée et pic mémoire : backup_json / restaurer_json vs backup_ndjson / restaurer_ndjson"""
+    print(f"{'Taille':>10} | {'Opération':<22} | {'Durée (s)':>10} | {'Pic mémoire (Mo)':>17}")
+    print("-" * 70)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            json_fichier = os.path.join(dossier, "backup.json")
+            ndjson_fichier = os.path.join(dossier, "backup.ndjson")
+            for nom, operation in (
+                ("backup_json", lambda: gestionnaire.backup_json(json_fichier)),
+                ("backup_ndjson", lambda: gestionnaire.backup_ndjson(ndjson_fichier)),
+                ("restaurer_json", lambda: GestionnaireTPE().restaurer_json(json_fichier)),
+                ("restaurer_ndjson", lambda: GestionnaireTPE().restaurer_ndjson(ndjson_fichier)),
+            ):
+                duree, pic = mesurer_pic(operation)
+                print(f"{taille:>10} | {nom:<22} | {duree:>10.2f} | {pic:>17.1f}")
+            del gestionnaire
+
+
+# ========================================
+# COMPRESSION DES SAUVEGARDES
+# ========================================
+
+def bench_compression(tailles):
+    """Taille du fichier et durées d'écriture / relecture par codec (pickle et NDJSON)"""
+    print(f"{'Taille':>10} | {'Format':<7} | {'Codec':<6} | {'Fichier (Mo)':>12} | "
+          f"{'Écriture (s)':>12} | {'Relecture (s)':>13}")
+    print("-" * 78)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            for format_, ecrire, lire in (
+                ("pickle", gestionnaire.sauvegarder, GestionnaireTPE.restaurer),
+                ("ndjson", gestionnaire.backup_ndjson, GestionnaireTPE.restaurer_ndjson),
+            ):
+                for codec in (None,) + CODECS_DISPONIBLES:
+                    fichier = os.path.join(dossier, f"{format_}.{codec or 'brut'}")
+                    ecriture = chronometrer(lambda: ecrire(fichier, compression=codec), 1) / 1e6
+                    relecture = chronometrer(lambda: lire(GestionnaireTPE(), fichier), 1) / 1e6
+                    taille_fichier = os.path.getsize(fichier) / 1e6
+                    print(f"{taille:>10} | {format_:<7} | {codec or 'aucun':<6} | {taille_fichier:>12.1f} | "
+                          f"{ecriture:>12.2f} | {relecture:>13.2f}")
+            del gestionnaire
+
+
+# ========================================
+# RESTAURATION DIFFÉRÉE (démarrage)
+# ========================================
+
+def bench_differe(tailles):
+    """Durée de restaurer() : pickle complet vs sauvegarde indexée (index seul), puis premier accès"""
+    print(f"{'Taille':>10} | {'Pickle (ms)':>12} | {'Indexée (ms)':>13} | {'1er accès (µs)':>15} | {'Gain':>6}")
+    print("-" * 70)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            pickle_fichier = os.path.join(dossier, "data.pkl")
+            index_fichier = os.path.join(dossier, "data.idx")
+            gestionnaire.sauvegarder(pickle_fichier)
+            gestionnaire.sauvegarder_indexe(index_fichier)
+            del gestionnaire
+
+            complet = chronometrer(lambda: GestionnaireTPE().restaurer(pickle_fichier), 1) / 1000
+            differe = GestionnaireTPE()
+            indexe = chronometrer(lambda: differe.restaurer(index_fichier), 1) / 1000
+            cibles = iter(random.sample(range(1, taille + 1), 100))
+            acces = chronometrer(lambda: differe.rechercher_tpe(next(cibles)), 100)
+            print(f"{taille:>10} | {complet:>12.1f} | {indexe:>13.1f} | {acces:>15.1f} | {complet / indexe:>5.0f}x")
+
+
+# ========================================
+# INSTANTANÉ BINAIRE (mmap)
+# ========================================
+
+def bench_mmap(tailles, operations: int):
+    """Ouverture et recherche : restauration pickle vs instantané binaire mmap"""
+    print(f"{'Taille':>10} | {'Pickle (ms)':>12} | {'mmap (ms)':>10} | {'rechercher (µs)':>16} | "
+          f"{'valeur (µs)':>12} | {'Fichier (Mo)':>12}")
+    print("-" * 90)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            pickle_fichier = os.path.join(dossier, "data.pkl")
+            binaire = os.path.join(dossier, "data.bin")
+            gestionnaire.sauvegarder(pickle_fichier)
+            sauvegarder_binaire(gestionnaire, binaire)
+            del gestionnaire
+
+            complet = chronometrer(lambda: GestionnaireTPE().restaurer(pickle_fichier), 1) / 1000
+            ouverture = chronometrer(lambda: InstantaneBinaire(binaire).fermer(), 10) / 1000
+            with InstantaneBinaire(binaire) as instantane:
+                cibles = iter(random.choices(range(1, taille + 1), k=2 * operations))
+                recherche = chronometrer(lambda: instantane.rechercher_tpe(next(cibles)), operations)
+                valeur = chronometrer(lambda: instantane.valeur(next(cibles), 'service'), operations)
+            print(f"{taille:>10} | {complet:>12.1f} | {ouverture:>10.3f} | {recherche:>16.1f} | "
+                  f"{valeur:>12.2f} | {os.path.getsize(binaire) / 1e6:>12.1f}")
+
+
+def bench_confiance(tailles, repetitions: int):
+    """Débit de restauration : instantané de confiance vs validation complète"""
+    print(f"{'Taille':>10} | {'Confiance (ms)':>15} | {'Validation (ms)':>16} | "
+          f"{'TPE/s confiance':>16} | {'TPE/s validation':>17}")
+    print("-" * 86)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            fichier = os.path.join(dossier, "data.pkl")
+            gestionnaire.sauvegarder(fichier)
+            del gestionnaire
+
+            # Gestionnaires conservés : leur destruction n'entre pas dans la mesure
+            restaures = [GestionnaireTPE() for _ in range(repetitions)]
+            suivant = iter(restaures)
+            confiance = chronometrer(lambda: next(suivant).restaurer(fichier), repetitions) / 1000
+            restaures = [GestionnaireTPE() for _ in range(repetitions)]
+            suivant = iter(restaures)
+            validation = chronometrer(lambda: next(suivant).restaurer(fichier, valider=True),
+                                      repetitions) / 1000
+            print(f"{taille:>10} | {confiance:>15.1f} | {validation:>16.1f} | "
+                  f"{taille / confiance * 1000:>16,.0f} | {taille / validation * 1000:>17,.0f}")
+
+
+def bench_historique(tailles, jours: int, taux: float):
+    """Stockage de `jours` sauvegardes quotidiennes : copies JSON complètes vs historique dédupliqué"""
+    print(f"{'Taille':>10} | {'Jours':>5} | {'Modifiés/j':>10} | {'Copies JSON (Mo)':>16} | "
+          f"{'Historique (Mo)':>15} | {'Sauvegarde (s)':>14} | {'Restauration (s)':>16}")
+    print("-" * 104)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            gestionnaire.dossier_historique = os.path.join(dossier, f"historique_{taille}")
+            json_fichier = os.path.join(dossier, "backup.json")
+            modifies = max(1, int(taille * taux))
+            copies = 0
+            duree = 0.0
+            for _ in range(jours):
+                for shop_id in random.sample(range(1, taille + 1), modifies):
+                    tpe_dict = gestionnaire.rechercher_tpe(shop_id).to_dict()
+                    tpe_dict['nombre_tpe'] = tpe_dict['nombre_tpe'] % 5 + 1
+                    gestionnaire.modifier_tpe(shop_id, TPE.from_dict(tpe_dict))
+                gestionnaire.backup_json(json_fichier)
+                copies += os.path.getsize(json_fichier)
+                duree += chronometrer(gestionnaire.sauvegarder_historique, 1) / 1e6
+            stockage = gestionnaire._ouvrir_historique(None).taille()
+            restauration = chronometrer(lambda: GestionnaireTPE().restaurer_historique(
+                dossier=gestionnaire.dossier_historique), 1) / 1e6
+            print(f"{taille:>10} | {jours:>5} | {modifies:>10} | {copies / 1e6:>16.1f} | "
+                  f"{stockage / 1e6:>15.1f} | {duree / jours:>14.2f} | {restauration:>16.2f}")
+            del gestionnaire
+
+
+def bench_excel(tailles):
+    """Export Excel : classeur en mémoire vs écriture seule en flux (durée sans traçage, puis pic)"""
+    print(f"{'Taille':>10} | {'Mode':<9} | {'Durée (s)':>10} | {'Pic mémoire (Mo)':>17} | {'Fichier (Mo)':>12}")
+    print("-" * 72)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            fichier = os.path.join(dossier, "export.xlsx")
+            for mode, flux in (("memoire", False), ("flux", True)):
+                duree = chronometrer(lambda: gestionnaire.exporter_excel(fichier, flux=flux), 1) / 1e6
+                pic = mesurer_pic(lambda: gestionnaire.exporter_excel(fichier, flux=flux))[1]
+                print(f"{taille:>10} | {mode:<9} | {duree:>10.2f} | {pic:>17.1f} | "
+                      f"{os.path.getsize(fichier) / 1e6:>12.1f}")
+            del gestionnaire
+
+
+def bench_partitions(tailles, processus):
+    """Export Excel partitionné (une feuille par service) selon la taille du pool de processus"""
+    print(f"{'Taille':>10} | {'Export':<22} | {'Durée (s)':>10} | {'Fichier (Mo)':>12}")
+    print("-" * 64)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            fichier = os.path.join(dossier, "export.xlsx")
+            duree = chronometrer(lambda: gestionnaire.exporter_excel(fichier), 1) / 1e6
+            print(f"{taille:>10} | {'une feuille':<22} | {duree:>10.2f} | {os.path.getsize(fichier) / 1e6:>12.1f}")
+            for nombre in processus:
+                duree = chronometrer(lambda: gestionnaire.exporter_excel(
+                    fichier, partition="service", processus=nombre), 1) / 1e6
+                print(f"{taille:>10} | {f'service, {nombre} processus':<22} | {duree:>10.2f} | "
+                      f"{os.path.getsize(fichier) / 1e6:>12.1f}")
+            del gestionnaire
+
+
+def bench_import_excel(tailles):
+    """Import Excel : classeur chargé en entier (load_workbook) vs lecture seule en flux"""
+    import openpyxl
+
+    def importer_complet(fichier):
+        ws = openpyxl.load_workbook(fichier).active
+        lignes = ws.iter_rows(values_only=True)
+        positions = positions_colonnes(next(lignes))
+        return GestionnaireTPE().ajouter_tpes_lot(
+            lignes, convertir=lambda valeurs: tpe_depuis_ligne(valeurs, positions))
+
+    print(f"{'Taille':>10} | {'Mode':<9} | {'Durée (s)':>10} | {'Pic mémoire (Mo)':>17}")
+    print("-" * 57)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            source = GestionnaireTPE()
+            source.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            fichier = os.path.join(dossier, "import.xlsx")
+            source.exporter_excel(fichier)
+            del source
+            for mode, importer in (("complet", importer_complet),
+                                   ("flux", lambda f: GestionnaireTPE().importer_excel(f))):
+                duree = chronometrer(lambda: importer(fichier), 1) / 1e6
+                pic = mesurer_pic(lambda: importer(fichier))[1]
+                print(f"{taille:>10} | {mode:<9} | {duree:>10.2f} | {pic:>17.1f}")
+
+
+def bench_parquet(tailles):
+    """Export pour l'analyse : CSV vs Parquet / Feather (pyarrow requis pour ces derniers)"""
+    print(f"{'Taille':>10} | {'Format':<8} | {'Durée (s)':>10} | {'Fichiers (Mo)':>13}")
+    print("-" * 52)
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            gestionnaire = GestionnaireTPE()
+            gestionnaire.tpes = [creer_tpe(i) for i in range(1, taille + 1)]
+            for format_, exporter in (
+                ("csv", gestionnaire.exporter_csv),
+                ("parquet", gestionnaire.exporter_colonnes),
+                ("feather", gestionnaire.exporter_colonnes),
+            ):
+                if format_ != "csv" and not ARROW_DISPONIBLE:
+                    print(f"{taille:>10} | {format_:<8} | {'pyarrow absent':>26}")
+                    continue
+                fichier = os.path.join(dossier, f"export.{format_}")
+                duree = chronometrer(lambda: exporter(fichier), 1) / 1e6
+                octets = sum(os.path.getsize(f) for f in (fichier, chemin_cartes(fichier)) if os.path.exists(f))
+                print(f"{taille:>10} | {format_:<8} | {duree:>10.2f} | {octets / 1e6:>13.1f}")
+            del gestionnaire
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du gestionnaire de TPE")
+    sous_parsers = parser.add_subparsers(dest="scenario", required=True)
+
+    p_index = sous_parsers.add_parser("index", help="Index primaire ShopID (avant/après)")
+    p_index.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p_index.add_argument("--operations", type=int, default=100)
+
+    p_memoire = sous_parsers.add_parser("memoire", help="Octets par TPE avec/sans __slots__ (tracemalloc)")
+    p_memoire.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000])
+
+    p_colonnes = sous_parsers.add_parser("colonnes", help="Statistiques : objets vs stockage colonnaire")
+    p_colonnes.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p_colonnes.add_argument("--repetitions", type=int, default=5)
+
+    p_journal = sous_parsers.add_parser("journal", help="Latence d'une modification : réécriture vs journal")
+    p_journal.add_argument("--tailles", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    p_journal.add_argument("--operations", type=int, default=20)
+
+    p_ndjson = sous_parsers.add_parser("ndjson", help="Pic mémoire : sauvegarde JSON vs NDJSON")
+    p_ndjson.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000])
+
+    p_compression = sous_parsers.add_parser("compression", help="Taille / durée des sauvegardes par codec")
+    p_compression.add_argument("--tailles", type=int, nargs="+", default=[100_000])
+
+    p_differe = sous_parsers.add_parser("differe", help="Démarrage : restauration complète vs différée")
+    p_differe.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000])
+
+    p_mmap = sous_parsers.add_parser("mmap", help="Instantané binaire mmap vs restauration pickle")
+    p_mmap.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000])
+    p_mmap.add_argument("--operations", type=int, default=10_000)
+
+    p_confiance = sous_parsers.add_parser("confiance", help="Restauration : confiance vs validation complète")
+    p_confiance.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000])
+    p_confiance.add_argument("--repetitions", type=int, default=3)
+
+    p_historique = sous_parsers.add_parser("historique", help="Stockage : copies JSON vs historique dédupliqué")
+    p_historique.add_argument("--tailles", type=int, nargs="+", default=[10_000])
+    p_historique.add_argument("--jours", type=int, default=30)
+    p_historique.add_argument("--taux", type=float, default=0.01, help="Part des TPE modifiés par jour")
+
+    p_excel = sous_parsers.add_parser("excel", help="Export Excel : classeur en mémoire vs flux")
+    p_excel.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000])
+
+    p_partitions = sous_parsers.add_parser("partitions", help="Export Excel partitionné : taille du pool")
+    p_partitions.add_argument("--tailles", type=int, nargs="+", default=[100_000])
+    p_partitions.add_argument("--processus", type=int, nargs="+",
+                              default=sorted({1, 2, coeurs_disponibles()}))
+
+    p_import = sous_parsers.add_parser("import_excel", help="Import Excel : classeur complet vs lecture seule")
+    p_import.add_argument("--tailles", type=int, nargs="+", default=[10_000, 100_000])
+
+    p_parquet = sous_parsers.add_parser("parquet", help="Export pour l'analyse : CSV vs Parquet / Feather")
+    p_parquet.add_argument("--tailles", type=int, nargs="+", default=[100_000])
+
+    args = parser.parse_args()
+    if args.scenario == "index":
+        bench_index(args.tailles, args.operations)
+    elif args.scenario == "memoire":
+        bench_memoire(args.tailles)
+    elif args.scenario == "colonnes":
+        bench_colonnes(args.tailles, args.repetitions)
+    elif args.scenario == "journal":
+        bench_journal(args.tailles, args.operations)
+    elif args.scenario == "ndjson":
+        bench_ndjson(args.tailles)
+    elif args.scenario == "compression":
+        bench_compression(args.tailles)
+    elif args.scenario == "differe":
+        bench_differe(args.tailles)
+    elif args.scenario == "mmap":
+        bench_mmap(args.tailles, args.operations)
+    elif args.scenario == "confiance":
+        bench_confiance(args.tailles, args.repetitions)
+    elif args.scenario == "historique":
+        bench_historique(args.tailles, args.jours, args.taux)
+    elif args.scenario == "excel":
+        bench_excel(args.tailles)
+    elif args.scenario == "partitions":
+        bench_partitions(args.tailles, args.processus)
+    elif args.scenario == "import_excel":
+        bench_import_excel(args.tailles)
+    elif args.scenario == "parquet":
+        bench_parquet(args.tailles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Outils communs aux scripts de test (test_*.py)
+"""
+
+import os
+from typing import Optional
+
+from tpe_manager import GestionnaireTPE, TPE, Regisseur, AccesBackoffice, TypeTPE, ConfigurationReseau, CarteCommercant
+
+
+def creer_tpe(shop_id: int, deux_cartes: bool = False, hasard=None, ethernet: Optional[bool] = None,
+              ip: Optional[str] = None, passerelle: str = "10.0.0.1", **champs) -> TPE:
+    """
+    Crée un TPE de test pour le ShopID donné
+    Par défaut tout découle du ShopID : un TPE sur quatre en Ethernet (IP 10.0.x.y unique
+    jusqu'au ShopID 65535), sept services, deux modèles, backoffice un TPE sur deux
+    deux_cartes : ajoute une seconde carte sans numéro de série
+    hasard : générateur (module random ou random.Random) -> service, modèle, type de
+    connexion, backoffice et nombre de TPE tirés au hasard
+    ethernet : impose le type de connexion (True : Ethernet, False : 4/5G)
+    ip, passerelle : configuration réseau du TPE (ip implique Ethernet)
+    champs : remplacent les valeurs calculées (service="Piscine", nombre_tpe=1, ...)
+    """
+    if hasard is None:
+        ethernet_calcule = shop_id % 4 == 0
+        quatre_cinq_g = not ethernet_calcule
+        service = f"Service {shop_id % 7}"
+        modele = "Ingenico Move 5000" if shop_id % 3 else "Ingenico Desk 5000"
+        backoffice = shop_id % 2 == 0
+        nombre_tpe = 1 + shop_id % 3
+    else:
+        ethernet_calcule = hasard.random() < 0.3
+        service = hasard.choice(["Piscine", "Musée", "Crèche", "Parking"])
+        backoffice = hasard.random() < 0.5
+        modele = hasard.choice(["Ingenico Move 5000", "Ingenico Desk 5000"])
+        quatre_cinq_g = hasard.random() < 0.7
+        nombre_tpe = hasard.randint(1, 5)
+    if ip is not None:
+        ethernet = True
+    if ethernet is None:
+        ethernet = ethernet_calcule
+    else:
+        quatre_cinq_g = not ethernet
+    if ip is None:
+        ip = f"10.0.{shop_id // 256}.{shop_id % 256}"
+    config = ConfigurationReseau(ip, "255.255.0.0", passerelle) if ethernet else None
+    cartes = [CarteCommercant(numero=f"C{shop_id}", numero_serie_tpe=f"SN{shop_id}")]
+    if deux_cartes:
+        cartes.append(CarteCommercant(numero=f"D{shop_id}"))
+    valeurs = dict(
+        service=service,
+        regisseur=Regisseur(prenom="Jean", nom=f"Dupont{shop_id}", telephone="0601020304"),
+        regisseurs_suppleants="Marie Martin",
+        cartes_commercant=cartes,
+        shop_id=shop_id,
+        acces_backoffice=AccesBackoffice(actif=backoffice, email="regie@mairie.fr" if backoffice else None),
+        modele_tpe=modele,
+        type_tpe=TypeTPE(ethernet=ethernet, quatre_cinq_g=quatre_cinq_g, config_reseau=config),
+        nombre_tpe=nombre_tpe
+    )
+    valeurs.update(champs)
+    return TPE(**valeurs)
+
+
+def gestionnaire_dans(dossier: str) -> GestionnaireTPE:
+    """
+    Crée un gestionnaire dont la sauvegarde, les backups, l'historique et le journal
+    sont placés dans le dossier donné (chemins absolus, répertoire courant inchangé)
+    """
+    gestionnaire = GestionnaireTPE()
+    for attribut in ('fichier_sauvegarde', 'fichier_backup', 'fichier_backup_flux',
+                     'dossier_historique', 'fichier_journal'):
+        setattr(gestionnaire, attribut, os.path.join(dossier, getattr(gestionnaire, attribut)))
+    return gestionnaire
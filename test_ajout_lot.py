@@ -0,0 +1,39 @@
+from tpe_manager import GestionnaireTPE, TPE, Regisseur, AccesBackoffice, TypeTPE, CarteCommercant
+
+print("=== TEST AJOUT EN LOT ===")
+
+
+def creer_dict(shop_id, carte="123456"):
+    return TPE(
+        service="Service Test",
+        regisseur=Regisseur(prenom="Test", nom="User", telephone="0601020304"),
+        regisseurs_suppleants="",
+        cartes_commercant=[CarteCommercant(numero=carte)],
+        shop_id=shop_id,
+        acces_backoffice=AccesBackoffice(actif=False),
+        modele_tpe="Ingenico Move 5000",
+        type_tpe=TypeTPE(quatre_cinq_g=True)
+    ).to_dict()
+
+
+gestionnaire = GestionnaireTPE()
+assert gestionnaire.ajouter_tpe(TPE.from_dict(creer_dict(5)))
+
+ligne_invalide = creer_dict(7)
+ligne_invalide['cartes_commercant'] = []
+lot = [creer_dict(10), creer_dict(0), creer_dict(5), creer_dict(10), ligne_invalide, creer_dict(0)]
+
+# Tout ou rien : rien n'est ajouté
+rapport = gestionnaire.ajouter_tpes_lot(lot)
+assert not rapport.succes and rapport.ajoutes == []
+assert [indice for indice, _ in rapport.erreurs] == [2, 3, 4]
+assert len(gestionnaire.lister_tpes()) == 1
+assert gestionnaire.prochain_shop_id == 6
+print(f"✅ Lot refusé: {rapport.erreurs}")
+
+# Au mieux : les lignes valides sont ajoutées, ShopID auto après les explicites
+rapport = gestionnaire.ajouter_tpes_lot(lot, tout_ou_rien=False)
+assert rapport.ajoutes == [10, 11, 12]
+assert len(rapport.erreurs) == 3
+assert [t.shop_id for t in gestionnaire.lister_tpes()] == [5, 10, 11, 12]
+print(f"✅ Lot partiel ajouté: {rapport.ajoutes}")
@@ -0,0 +1,112 @@
+import csv
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+from outils_tests import creer_tpe
+from tpe_manager import GestionnaireTPE, COLONNES_EXPORT
+from tpe_sqlite import GestionnaireTPESQLite
+
+print("=== TEST EXPORT / IMPORT CSV ===")
+
+# Virgule et guillemets dans un champ : échappement CSV
+suppleants = "Marie Martin, Paul \"Polo\" Durand"
+gestionnaire = GestionnaireTPE()
+gestionnaire.ajouter_tpes_lot([creer_tpe(i, deux_cartes=True, regisseurs_suppleants=suppleants)
+                               for i in range(1, 301)])
+reference = [tpe.to_dict() for tpe in gestionnaire.lister_tpes()]
+
+dossier = tempfile.mkdtemp()
+
+
+def chemin(nom):
+    return os.path.join(dossier, nom)
+
+
+# Aller-retour CSV et TSV (séparateur déduit de l'extension)
+for nom, separateur in (("export.csv", ","), ("export.tsv", "\t")):
+    assert gestionnaire.exporter_csv(chemin(nom))
+    with open(chemin(nom), encoding='utf-8', newline='') as f:
+        lignes = list(csv.reader(f, delimiter=separateur))
+    assert lignes[0] == COLONNES_EXPORT and len(lignes) == 301
+    assert lignes[4][5:7] == ["C4, D4", "SN4, N/A"]
+    for importe in (GestionnaireTPE(), GestionnaireTPESQLite(":memory:")):
+        rapport = importe.importer_csv(chemin(nom))
+        assert rapport.succes and len(rapport.ajoutes) == 300
+        assert [tpe.to_dict() for tpe in importe.lister_tpes()] == reference
+print("✅ Aller-retour CSV et TSV (mémoire et SQLite)")
+
+# Colonnes dans un autre ordre, ShopID vide = attribution automatique
+ordre = list(reversed(range(len(COLONNES_EXPORT))))
+tampon = io.StringIO()
+ecrivain = csv.writer(tampon)
+ecrivain.writerow([COLONNES_EXPORT[i] for i in ordre])
+valeurs = list(lignes[1])
+valeurs[7] = ""
+ecrivain.writerow([valeurs[i] for i in ordre])
+tampon.seek(0)
+importe = GestionnaireTPE()
+rapport = importe.importer_csv(tampon, separateur=",")
+assert rapport.succes and rapport.ajoutes == [1]
+assert importe.rechercher_tpe(1).to_dict() == reference[0]
+print("✅ Colonnes réordonnées et ShopID automatique")
+
+# Lignes invalides : rapport par ligne, rien n'est ajouté en tout-ou-rien
+with open(chemin("erreurs.csv"), 'w', encoding='utf-8', newline='') as f:
+    ecrivain = csv.writer(f)
+    ecrivain.writerow(COLONNES_EXPORT)
+    ecrivain.writerow(lignes[1])
+    ecrivain.writerow(lignes[2][:7] + ["abc"] + lignes[2][8:])   # ShopID non numérique
+    ecrivain.writerow(lignes[3][:5] + ["", ""] + lignes[3][7:])  # aucune carte
+    ecrivain.writerow([])                                        # ligne vide ignorée
+    ecrivain.writerow(lignes[1])                                 # ShopID en double
+importe = GestionnaireTPE()
+rapport = importe.importer_csv(chemin("erreurs.csv"))
+assert [numero for numero, _ in rapport.erreurs] == [3, 4, 6]
+assert "carte" in rapport.erreurs[1][1] and "double" in rapport.erreurs[2][1]
+assert importe.lister_tpes() == []
+rapport = importe.importer_csv(chemin("erreurs.csv"), tout_ou_rien=False)
+assert rapport.ajoutes == [1]
+
+# Lignes vides (fin de fichier, séparateurs seuls) : ignorées
+with open(chemin("vides.csv"), 'w', encoding='utf-8', newline='') as f:
+    ecrivain = csv.writer(f)
+    ecrivain.writerow(COLONNES_EXPORT)
+    ecrivain.writerow(lignes[1])
+    ecrivain.writerow([""] * len(COLONNES_EXPORT))
+    f.write("\n")
+assert GestionnaireTPE().importer_csv(chemin("vides.csv")).ajoutes == [1]
+print("✅ Erreurs rapportées par numéro de ligne du fichier, lignes vides ignorées")
+
+# Colonne manquante : fichier refusé
+tampon = io.StringIO("Service,ShopID\nPiscine,1\n")
+try:
+    GestionnaireTPE().importer_csv(tampon)
+    assert False, "ValueError attendue"
+except ValueError as e:
+    assert "Colonnes manquantes" in str(e)
+print("✅ Colonne manquante refusée")
+
+# Entrée / sortie standard : export et import enchaînés par un tube
+repertoire = os.path.dirname(os.path.abspath(__file__))
+assert gestionnaire.backup_json(chemin("backup.json"))
+export = subprocess.run(
+    [sys.executable, "-c",
+     "from tpe_manager import GestionnaireTPE\n"
+     "g = GestionnaireTPE()\n"
+     f"assert g.restaurer_json({chemin('backup.json')!r})\n"
+     "assert g.exporter_csv('-', separateur='\\t')"],
+    capture_output=True, text=True, check=True, cwd=repertoire
+)
+importe = subprocess.run(
+    [sys.executable, "-c",
+     "from tpe_manager import GestionnaireTPE\n"
+     "g = GestionnaireTPE()\n"
+     "rapport = g.importer_csv(None, separateur='\\t')\n"
+     "print(len(rapport.ajoutes), len(rapport.erreurs))"],
+    input=export.stdout, capture_output=True, text=True, check=True, cwd=repertoire
+)
+assert importe.stdout.split() == ["300", "0"]
+print("✅ Export vers la sortie standard, import depuis l'entrée standard")
@@ -0,0 +1,123 @@
+import os
+import tempfile
+
+import openpyxl
+
+from outils_tests import creer_tpe
+from tpe_manager import GestionnaireTPE, COLONNES_EXPORT
+
+
+# Garde obligatoire : les processus de l'export partitionné réimportent ce module (mode spawn)
+if __name__ == "__main__":
+    print("=== TEST EXPORT EXCEL ===")
+
+    gestionnaire = GestionnaireTPE()
+    gestionnaire.ajouter_tpes_lot([creer_tpe(i, deux_cartes=True) for i in range(1, 301)])
+
+    dossier = tempfile.mkdtemp()
+    memoire = os.path.join(dossier, "memoire.xlsx")
+    flux = os.path.join(dossier, "flux.xlsx")
+    assert gestionnaire.exporter_excel(memoire, flux=False)
+    assert gestionnaire.exporter_excel(flux)
+
+    # Même contenu, même mise en forme d'en-tête, mêmes largeurs de colonnes
+    classeurs = [openpyxl.load_workbook(fichier).active for fichier in (memoire, flux)]
+    lignes = [list(ws.iter_rows(values_only=True)) for ws in classeurs]
+    assert lignes[0] == lignes[1]
+    assert list(lignes[1][0]) == COLONNES_EXPORT and len(lignes[1]) == 301
+    assert lignes[1][4][5:7] == ("C4, D4", "SN4, N/A")
+    ws = classeurs[1]
+    assert ws.title == "Gestion TPE" and ws["A1"].font.b and ws["A1"].fill.start_color.rgb.endswith("0066CC")
+    largeurs = [{lettre: dimension.width for lettre, dimension in ws.column_dimensions.items()}
+                for ws in classeurs]
+    assert largeurs[0] == largeurs[1] and len(largeurs[1]) == len(COLONNES_EXPORT)
+    print("✅ Export en flux identique à l'export en mémoire (valeurs, en-tête, largeurs)")
+
+    # Import en flux : le classeur exporté se réimporte à l'identique (mémoire et SQLite)
+    from tpe_sqlite import GestionnaireTPESQLite
+
+    for cible in (GestionnaireTPE(), GestionnaireTPESQLite(":memory:")):
+        rapport = cible.importer_excel(flux)
+        assert rapport.succes and len(rapport.ajoutes) == 300 and not rapport.erreurs
+        assert [t.to_dict() for t in cible.lister_tpes()] == [t.to_dict() for t in gestionnaire.lister_tpes()]
+        assert [carte.numero_serie_tpe for carte in cible.rechercher_tpe(4).cartes_commercant] == ["SN4", None]
+    print("✅ Import en flux identique à la flotte exportée (mémoire et SQLite)")
+
+    # Lignes refusées : numéro de ligne de la feuille, classeur d'erreurs réimportable
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(COLONNES_EXPORT)
+    for ligne in lignes[1][1:4]:
+        ws.append(list(ligne[:7]) + [None] + list(ligne[8:]))  # ShopID vide : attribué automatiquement
+    ws.append([])
+    ws.append(["Piscine", "Paul", "Durand", "0601020304", "", None, None, None] + list(lignes[1][1][8:]))  # Sans carte
+    ws.append(list(lignes[1][4][:7]) + [None] + list(lignes[1][4][8:14]) + ["999.1.1.1", "255.255.0.0", "10.0.0.1",
+                                                                          None])  # IP invalide
+    source = os.path.join(dossier, "import.xlsx")
+    wb.save(source)
+
+    erreurs = os.path.join(dossier, "erreurs.xlsx")
+    cible = GestionnaireTPE()
+    rapport = cible.importer_excel(source, fichier_erreurs=erreurs)
+    assert not rapport.succes and not rapport.ajoutes and len(cible.lister_tpes()) == 0
+    assert [numero for numero, _ in rapport.erreurs] == [6, 7]
+    assert "carte" in rapport.erreurs[0][1] and "IP" in rapport.erreurs[1][1]
+
+    ws = openpyxl.load_workbook(erreurs).active
+    refusees = list(ws.iter_rows(values_only=True))
+    assert ws.title == "Erreurs" and list(refusees[0]) == ["Ligne", "Erreur"] + COLONNES_EXPORT
+    assert [ligne[0] for ligne in refusees[1:]] == [6, 7] and refusees[1][3] == "Paul"
+    assert refusees[2][16] == "999.1.1.1"
+
+    rapport = cible.importer_excel(source, tout_ou_rien=False)
+    assert rapport.ajoutes == [1, 2, 3] and [numero for numero, _ in rapport.erreurs] == [6, 7]
+    assert [t.shop_id for t in cible.lister_tpes()] == [1, 2, 3]
+    print("✅ Lignes refusées signalées par numéro de ligne, classeur d'erreurs produit")
+
+    # En-tête incomplet : import refusé
+    wb = openpyxl.Workbook()
+    wb.active.append(COLONNES_EXPORT[:5])
+    wb.save(source)
+    try:
+        cible.importer_excel(source)
+        assert False, "colonnes manquantes non détectées"
+    except ValueError as e:
+        assert "Colonnes manquantes" in str(e)
+    print("✅ Colonnes manquantes détectées")
+
+    # Export partitionné : une feuille par service, rendues dans un pool de processus
+    partitionne = os.path.join(dossier, "services.xlsx")
+    assert gestionnaire.exporter_excel(partitionne, partition="service", processus=2)
+    classeur = openpyxl.load_workbook(partitionne)
+    services = sorted({t.service for t in gestionnaire.lister_tpes()})
+    assert classeur.sheetnames == services
+    for ws in classeur.worksheets:
+        feuille = list(ws.iter_rows(values_only=True))
+        assert list(feuille[0]) == COLONNES_EXPORT and ws["A1"].font.b
+        assert feuille[1:] == [ligne for ligne in lignes[1][1:] if ligne[0] == ws.title]
+        assert len(ws.column_dimensions) == len(COLONNES_EXPORT)
+    cible = GestionnaireTPE()
+    for service in services:
+        assert cible.importer_excel(partitionne, feuille=service).succes
+    assert sorted(t.shop_id for t in cible.lister_tpes()) == list(range(1, 301))
+    print("✅ Export partitionné par service : une feuille par valeur, contenu identique")
+
+    # Un fichier par modèle ; noms de feuille et de fichier nettoyés
+    assert gestionnaire.exporter_excel(os.path.join(dossier, "modeles.xlsx"), partition="modele_tpe",
+                                       fichier_par_partition=True)
+    for modele in ("Ingenico Desk 5000", "Ingenico Move 5000"):
+        ws = openpyxl.load_workbook(os.path.join(dossier, f"modeles_{modele}.xlsx")).active
+        assert ws.title == modele
+        assert all(ligne[11] == modele for ligne in ws.iter_rows(min_row=2, values_only=True))
+
+    speciaux = GestionnaireTPE()
+    speciaux.ajouter_tpes_lot([
+        creer_tpe(1, service="Sports/Loisirs : piscine municipale"),
+        creer_tpe(2, service="Sports\\Loisirs : piscine municipale")
+    ])
+    assert speciaux.exporter_excel(os.path.join(dossier, "speciaux.xlsx"), partition="service", processus=1)
+    noms = openpyxl.load_workbook(os.path.join(dossier, "speciaux.xlsx")).sheetnames
+    assert noms == ["Sports_Loisirs _ piscine munici", "Sports_Loisirs _ piscine mu (2)"]
+    assert not gestionnaire.exporter_excel(partitionne, partition="regisseur")
+    assert not [nom for nom in os.listdir(dossier) if nom.startswith("tpe_")]
+    print("✅ Un fichier par modèle, noms de feuille nettoyés et uniques, partition inconnue refusée")
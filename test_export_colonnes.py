@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+from outils_tests import creer_tpe
+from tpe_arrow import ARROW_DISPONIBLE, chemin_cartes
+from tpe_manager import GestionnaireTPE
+
+
+print("=== TEST EXPORT COLONNAIRE (PARQUET / FEATHER) ===")
+
+gestionnaire = GestionnaireTPE()
+gestionnaire.ajouter_tpes_lot([creer_tpe(i, deux_cartes=True, date_creation="2026-02-13 20:05:20")
+                               for i in range(1, 301)])
+dossier = tempfile.mkdtemp()
+parquet = os.path.join(dossier, "flotte.parquet")
+feather = os.path.join(dossier, "flotte.feather")
+assert chemin_cartes(parquet) == os.path.join(dossier, "flotte_cartes.parquet")
+
+if not ARROW_DISPONIBLE:
+    # Sans pyarrow : échec propre, aucun fichier créé
+    assert not gestionnaire.exporter_colonnes(parquet)
+    assert not os.path.exists(parquet) and not os.path.exists(chemin_cartes(parquet))
+    print("✅ pyarrow absent : export refusé proprement")
+else:
+    import pyarrow as pa
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    # Petits lots : plusieurs groupes de lignes, même dictionnaire partout
+    assert gestionnaire.exporter_colonnes(parquet, taille_lot=64)
+    assert gestionnaire.exporter_colonnes(feather, taille_lot=64)
+    for table, cartes in (
+        (pyarrow.parquet.read_table(parquet), pyarrow.parquet.read_table(chemin_cartes(parquet))),
+        (pyarrow.feather.read_table(feather), pyarrow.feather.read_table(chemin_cartes(feather))),
+    ):
+        assert table.num_rows == 300 and cartes.num_rows == 600
+        assert table.schema.field('shop_id').type == pa.int64()
+        assert table.schema.field('ethernet').type == pa.bool_()
+        assert pa.types.is_dictionary(table.schema.field('service').type)
+        assert table.column('service').to_pylist()[:2] == ["Service 1", "Service 2"]
+        assert table.column('adresse_ip').to_pylist()[3] == "10.0.0.4"
+        assert table.column('email_backoffice').to_pylist()[0] is None
+        assert str(table.column('date_creation').to_pylist()[0]) == "2026-02-13 20:05:20"
+        assert cartes.slice(6, 2).to_pydict() == {
+            'shop_id': [4, 4], 'position': [0, 1], 'numero': ["C4", "D4"], 'numero_serie_tpe': ["SN4", None]
+        }
+    print("✅ Parquet et Feather relus avec leurs types et la table des cartes")
+
+assert not gestionnaire.exporter_colonnes(os.path.join(dossier, "flotte.txt"))
+print("✅ Extension inconnue refusée")
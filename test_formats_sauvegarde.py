@@ -0,0 +1,230 @@
+import json
+import os
+import pickle
+import tempfile
+
+from outils_tests import creer_tpe, gestionnaire_dans
+from tpe_manager import GestionnaireTPE
+
+
+print("=== TEST FORMATS DE SAUVEGARDE ===")
+
+
+gestionnaire = GestionnaireTPE()
+gestionnaire.ajouter_tpes_lot([creer_tpe(i) for i in range(1, 501)])
+reference = [tpe.to_dict() for tpe in gestionnaire.lister_tpes()]
+
+dossier = tempfile.mkdtemp()
+
+
+def chemin(nom):
+    return os.path.join(dossier, nom)
+
+
+# Format compact (1.6) : table de dictionnaires + codes entiers
+tailles = {}
+for compact in (False, True):
+    nom = "backup_compact.json" if compact else "backup_1_5.json"
+    assert gestionnaire.backup_json(chemin(nom), compact=compact)
+    tailles[compact] = os.path.getsize(chemin(nom))
+    restaure = GestionnaireTPE()
+    assert restaure.restaurer_json(chemin(nom))
+    assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == reference
+    assert gestionnaire.sauvegarder(chemin("data.pkl"), compact=compact)
+    assert restaure.restaurer(chemin("data.pkl"))
+    assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == reference
+assert tailles[True] < tailles[False]
+
+# Par défaut : JSON lisible (1.5, noms en clair), pickle compact (1.6)
+assert gestionnaire.backup_json(chemin("backup_defaut.json"))
+with open(chemin("backup_defaut.json"), encoding='utf-8') as f:
+    defaut = json.load(f)
+assert defaut['version'] == '1.5' and 'dictionnaires' not in defaut
+assert defaut['tpes'][0]['service'] == reference[0]['service']
+assert gestionnaire.sauvegarder(chemin("defaut.pkl"))
+with open(chemin("defaut.pkl"), 'rb') as f:
+    assert pickle.load(f)['version'] == '1.6'
+print(f"✅ Format compact relu, taille JSON {tailles[False]} -> {tailles[True]} octets")
+
+# Chaînes internées : une seule copie par valeur
+tpes = restaure.lister_tpes()
+assert tpes[0].modele_tpe is tpes[3].modele_tpe
+print("✅ Modèles et services internés")
+
+# Journal des modifications : instantané + rejeu
+print("\n=== TEST JOURNAL ===")
+gestionnaire = gestionnaire_dans(dossier)
+gestionnaire.activer_journal()
+gestionnaire.ajouter_tpes_lot([creer_tpe(i) for i in range(1, 51)])
+assert gestionnaire.checkpoint() and gestionnaire.taille_journal() == 0
+gestionnaire.ajouter_tpe(creer_tpe(0))
+gestionnaire.modifier_tpe(2, creer_tpe(2))
+gestionnaire.supprimer_tpe(3)
+gestionnaire.supprimer_tpe(51)
+bloc = gestionnaire.reserver_shop_ids(10)
+assert gestionnaire.taille_journal() == 5
+attendu = [tpe.to_dict() for tpe in gestionnaire.lister_tpes()]
+gestionnaire.desactiver_journal()
+
+# Ligne tronquée en fin de journal (arrêt brutal) : ignorée
+with open(gestionnaire.fichier_journal, 'a', encoding='utf-8') as f:
+    f.write('{"op": "ajout", "tp')
+
+relu = gestionnaire_dans(dossier)
+relu.activer_journal()
+assert relu.restaurer()
+assert [tpe.to_dict() for tpe in relu.lister_tpes()] == attendu
+assert relu.prochain_shop_id == bloc.stop
+relu.statistiques(verifier=True)
+print(f"✅ Instantané + {relu.taille_journal()} opérations rejouées")
+
+assert relu.checkpoint() and os.path.getsize(relu.fichier_journal) == 0
+compacte = gestionnaire_dans(dossier)
+assert compacte.restaurer()
+assert [tpe.to_dict() for tpe in compacte.lister_tpes()] == attendu
+relu.desactiver_journal()
+print("✅ Checkpoint : journal intégré à la sauvegarde")
+
+# Opérations refusées au rejeu : relevées, pas comptées comme appliquées
+with open(relu.fichier_journal, 'a', encoding='utf-8') as f:
+    f.write(json.dumps({'op': 'suppression', 'shop_id': 999, 'prochain_shop_id': 1}) + "\n")
+    f.write(json.dumps({'op': 'modification', 'shop_id': 998, 'tpe': creer_tpe(998).to_dict(),
+                        'prochain_shop_id': 1}) + "\n")
+rejoue = gestionnaire_dans(dossier)
+rejoue.activer_journal()
+assert rejoue.restaurer()
+assert [tpe.to_dict() for tpe in rejoue.lister_tpes()] == attendu
+assert [(numero, operation) for numero, operation, _ in rejoue.rejeu_en_echec] == [(1, 'suppression'),
+                                                                                  (2, 'modification')]
+rejoue.desactiver_journal()
+print(f"✅ Opérations refusées au rejeu relevées: {rejoue.rejeu_en_echec[0][2]}")
+
+# Gros lot : journalisé en lignes de TAILLE_LOT_JOURNAL TPE au plus
+from tpe_manager import TAILLE_LOT_JOURNAL
+
+dossier_lots = tempfile.mkdtemp()
+gestionnaire = gestionnaire_dans(dossier_lots)
+gestionnaire.activer_journal()
+gestionnaire.ajouter_tpes_lot([creer_tpe(i) for i in range(1, 2 * TAILLE_LOT_JOURNAL + 2)])
+assert gestionnaire.taille_journal() == 3
+with open(gestionnaire.fichier_journal, encoding='utf-8') as f:
+    assert [len(json.loads(ligne)['tpes']) for ligne in f] == [TAILLE_LOT_JOURNAL, TAILLE_LOT_JOURNAL, 1]
+gestionnaire.desactiver_journal()
+relu = gestionnaire_dans(dossier_lots)
+relu.activer_journal()
+assert relu.restaurer() and not relu.rejeu_en_echec
+assert [tpe.to_dict() for tpe in relu.lister_tpes()] == [tpe.to_dict() for tpe in gestionnaire.lister_tpes()]
+relu.desactiver_journal()
+print("✅ Gros lot journalisé en lignes bornées puis rejoué")
+
+# Sauvegarde en flux (NDJSON) : en-tête + un TPE par ligne
+print("\n=== TEST NDJSON ===")
+gestionnaire = GestionnaireTPE()
+assert gestionnaire.restaurer_json(chemin("backup_1_5.json"))
+gestionnaire.reserver_shop_ids(5)
+assert gestionnaire.backup_ndjson(chemin("backup.ndjson"))
+with open(chemin("backup.ndjson"), encoding='utf-8') as f:
+    lignes = f.readlines()
+assert len(lignes) == 501 and '"format": "tpe-ndjson"' in lignes[0]
+restaure = GestionnaireTPE()
+assert restaure.restaurer_ndjson(chemin("backup.ndjson"))
+assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == reference
+assert restaure.prochain_shop_id == 506
+restaure.statistiques(verifier=True)
+print(f"✅ NDJSON relu ({len(lignes) - 1} TPE)")
+
+# L'ancien format tpe_backup.json est toujours accepté
+for nom in ("backup_1_5.json", "backup_compact.json"):
+    restaure = GestionnaireTPE()
+    assert restaure.restaurer_ndjson(chemin(nom))
+    assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == reference
+print("✅ Ancien format JSON accepté par le lecteur NDJSON")
+
+# Ligne invalide : rien n'est modifié
+with open(chemin("casse.ndjson"), 'w', encoding='utf-8') as f:
+    f.writelines(lignes[:100] + ['{"shop_id": "pas un TPE"}\n'] + lignes[100:])
+assert not restaure.restaurer_ndjson(chemin("casse.ndjson"))
+assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == reference
+assert restaure.rechercher_tpe(1) is not None
+print("✅ Fichier invalide : état précédent conservé")
+
+# Compression : codec choisi à l'écriture, détecté à la lecture
+print("\n=== TEST COMPRESSION ===")
+from tpe_compression import CODECS_DISPONIBLES, detecter
+
+for codec in CODECS_DISPONIBLES:
+    for ecrire, lire, nom in (
+        (gestionnaire.sauvegarder, GestionnaireTPE.restaurer, "data.pkl"),
+        (gestionnaire.backup_json, GestionnaireTPE.restaurer_json, "backup.json"),
+        (gestionnaire.backup_ndjson, GestionnaireTPE.restaurer_ndjson, "backup.ndjson"),
+    ):
+        fichier = chemin(f"{nom}.{codec}")
+        assert ecrire(fichier, compression=codec)
+        assert detecter(fichier) == codec
+        restaure = GestionnaireTPE()
+        assert lire(restaure, fichier)
+        assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == reference
+    assert os.path.getsize(chemin(f"backup.json.{codec}")) < tailles[True] / 4
+print(f"✅ Sauvegardes compressées relues: {', '.join(CODECS_DISPONIBLES)}")
+
+assert not gestionnaire.sauvegarder(chemin("data.pkl.x"), compression="inconnu")
+assert not gestionnaire.sauvegarder_indexe(chemin("indexe.gz"), compression="gzip")
+print("✅ Codec inconnu et sauvegarde indexée compressée refusés")
+
+# Checkpoint : le codec de la sauvegarde principale est conservé, même en mode indexé
+for indexee in (False, True):
+    compresse = gestionnaire_dans(tempfile.mkdtemp())
+    compresse.sauvegarde_indexee = indexee
+    compresse.ajouter_tpes_lot([creer_tpe(i) for i in range(1, 21)])
+    assert compresse.sauvegarder(compression="gzip")
+    compresse.activer_journal()
+    compresse.supprimer_tpe(5)
+    assert compresse.checkpoint() and detecter(compresse.fichier_sauvegarde) == "gzip"
+    compresse.desactiver_journal()
+    relu = gestionnaire_dans(os.path.dirname(compresse.fichier_sauvegarde))
+    assert relu.restaurer() and len(relu.lister_tpes()) == 19
+compresse.compression_sauvegarde = "bz2"
+assert compresse.checkpoint() and detecter(compresse.fichier_sauvegarde) == "bz2"
+print("✅ Codec conservé au checkpoint")
+
+# Restauration de confiance : schéma + somme de contrôle vérifiés, pas de revalidation
+print("\n=== TEST RESTAURATION DE CONFIANCE ===")
+import pickle
+from tpe_manager import SCHEMA_TPE, _somme_controle
+
+assert gestionnaire.sauvegarder(chemin("confiance.pkl"))
+for valider in (False, True):
+    restaure = GestionnaireTPE()
+    assert restaure.restaurer(chemin("confiance.pkl"), valider=valider)
+    assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == reference
+    restaure.statistiques(verifier=True)
+tpes = restaure.lister_tpes()
+assert tpes[0].service is tpes[7].service  # Chaînes toujours internées
+print("✅ Instantané relu avec et sans validation")
+
+
+def ecrire_instantane(nom, contenu, schema=SCHEMA_TPE, somme=None):
+    charge = pickle.dumps(contenu)
+    with open(chemin(nom), 'wb') as f:
+        pickle.dump({'version': '1.5', 'schema': schema, 'charge': charge, 'prochain_shop_id': 2,
+                     'somme_controle': somme or _somme_controle(charge)}, f)
+
+
+# Un TPE invalide (nombre_tpe = 0) n'est détecté que par la validation complète
+invalide = dict(reference[0], nombre_tpe=0)
+ecrire_instantane("invalide.pkl", {'tpes': [invalide], 'version': '1.5'})
+assert GestionnaireTPE().restaurer(chemin("invalide.pkl"))
+assert not GestionnaireTPE().restaurer(chemin("invalide.pkl"), valider=True)
+
+# Schéma antérieur : validation complète imposée
+ecrire_instantane("ancien_schema.pkl", {'tpes': [invalide], 'version': '1.5'}, schema=SCHEMA_TPE - 1)
+assert not GestionnaireTPE().restaurer(chemin("ancien_schema.pkl"))
+with open(chemin("sans_charge.pkl"), 'wb') as f:
+    pickle.dump({'tpes': [invalide], 'version': '1.5'}, f)
+assert not GestionnaireTPE().restaurer(chemin("sans_charge.pkl"))
+print("✅ Validation complète sur demande et pour les anciens schémas")
+
+# Somme de contrôle altérée : restauration refusée
+ecrire_instantane("altere.pkl", {'tpes': [reference[0]], 'version': '1.5'}, somme="0" * 32)
+assert not GestionnaireTPE().restaurer(chemin("altere.pkl"))
+print("✅ Somme de contrôle altérée refusée")
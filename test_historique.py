@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+from outils_tests import creer_tpe
+from tpe_manager import GestionnaireTPE, TPE
+
+
+print("=== TEST HISTORIQUE DÉDUPLIQUÉ ===")
+
+
+dossier = os.path.join(tempfile.mkdtemp(), "historique")
+gestionnaire = GestionnaireTPE()
+gestionnaire.dossier_historique = dossier
+gestionnaire.ajouter_tpes_lot([creer_tpe(i) for i in range(1, 501)])
+jour_1 = [tpe.to_dict() for tpe in gestionnaire.lister_tpes()]
+
+premier = gestionnaire.sauvegarder_historique()
+assert premier['nombre_tpes'] == 500
+assert premier['objets_ecrits'] == 500 + len(premier['pages'])
+print(f"✅ Première sauvegarde: {premier['objets_ecrits']} objets ({len(premier['pages'])} pages)")
+
+# Sauvegarde sans changement : seul le manifeste est écrit
+assert gestionnaire.sauvegarder_historique()['objets_ecrits'] == 0
+
+# Quelques modifications : seuls les TPE concernés et leurs pages sont écrits
+for shop_id in (10, 250, 499):
+    tpe = gestionnaire.rechercher_tpe(shop_id)
+    tpe_dict = dict(tpe.to_dict(), regisseurs_suppleants="Nouveau suppléant")
+    assert gestionnaire.modifier_tpe(shop_id, TPE.from_dict(tpe_dict))
+assert gestionnaire.supprimer_tpe(100)
+assert gestionnaire.ajouter_tpe(creer_tpe(501))
+jour_2 = [tpe.to_dict() for tpe in gestionnaire.lister_tpes()]
+
+second = gestionnaire.sauvegarder_historique()
+assert 4 <= second['objets_ecrits'] <= 4 + 8, second['objets_ecrits']
+print(f"✅ Sauvegarde incrémentale: {second['objets_ecrits']} objets écrits")
+
+# Toute sauvegarde passée se restaure depuis son manifeste
+noms = [premier['nom'], second['nom']]
+restaure = GestionnaireTPE()
+restaure.dossier_historique = dossier
+assert restaure.restaurer_historique(premier['nom'])
+assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == jour_1
+assert restaure.restaurer_historique()  # la plus récente
+assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == jour_2
+assert restaure.prochain_shop_id == 502
+restaure.statistiques(verifier=True)
+print("✅ Sauvegardes passée et récente restaurées")
+
+# Objet altéré : restauration refusée, état conservé
+historique = restaure._ouvrir_historique(None)
+cle = historique._lire(second['pages'][0])[0]
+with open(historique._chemin(cle), 'ab') as f:
+    f.write(b' ')
+assert not restaure.restaurer_historique(premier['nom'])
+assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == jour_2
+os.truncate(historique._chemin(cle), os.path.getsize(historique._chemin(cle)) - 1)
+print("✅ Objet corrompu détecté")
+
+# Élagage : les objets du seul premier jour disparaissent, le dernier reste restaurable
+taille = historique.taille()
+assert historique.elaguer(garder=1) >= 4
+assert historique.manifestes() == [second['nom']]
+assert historique.taille() < taille
+assert restaure.restaurer_historique()
+assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == jour_2
+print("✅ Élagage des anciennes sauvegardes")
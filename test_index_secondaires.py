@@ -0,0 +1,127 @@
+import os
+import tempfile
+
+from outils_tests import creer_tpe
+from tpe_manager import GestionnaireTPE, Regisseur, CarteCommercant
+from tpe_sqlite import GestionnaireTPESQLite
+
+print("=== TEST INDEX SECONDAIRES ===")
+
+avec_index = GestionnaireTPE(index_secondaires=True)
+sans_index = GestionnaireTPE()
+for gestionnaire in (avec_index, sans_index):
+    gestionnaire.ajouter_tpe(creer_tpe(1, service="Piscine", modele_tpe="Ingenico Move 5000", ethernet=False))
+    gestionnaire.ajouter_tpe(creer_tpe(2, service="Piscine", modele_tpe="Ingenico Desk 5000", ethernet=True))
+    gestionnaire.ajouter_tpe(creer_tpe(3, service="Musée", modele_tpe="Ingenico Desk 5000", ethernet=True,
+                                       regisseur=Regisseur(prenom="Jean", nom="Martin", telephone="0601020304")))
+    gestionnaire.ajouter_tpe(creer_tpe(4, service="Musée", modele_tpe="Ingenico Move 5000", ethernet=False))
+    gestionnaire.modifier_tpe(4, creer_tpe(4, service="Piscine", modele_tpe="Ingenico Move 5000", ethernet=False))
+    gestionnaire.supprimer_tpe(1)
+
+
+def ids(tpes):
+    return sorted(t.shop_id for t in tpes)
+
+
+requetes = [
+    {'service': "Piscine"},
+    {'service': "Piscine", 'ethernet': True},
+    {'modele_tpe': ["Ingenico Move 5000", "Ingenico Desk 5000"], 'quatre_cinq_g': True},
+    {'regisseur': "Jean Martin"},
+    {'service': "Inconnu"},
+]
+for criteres in requetes:
+    resultat = ids(avec_index.rechercher_par(**criteres))
+    assert resultat == ids(sans_index.rechercher_par(**criteres)), criteres
+    print(f"✅ {criteres} -> {resultat}")
+
+assert ids(avec_index.rechercher_par(service="Piscine")) == [2, 4]
+
+# Liste de valeurs : résultat dans l'ordre d'insertion, pas groupé par valeur
+for gestionnaire in (avec_index, sans_index):
+    gestionnaire.ajouter_tpe(creer_tpe(5, service="Musée", modele_tpe="Ingenico Desk 5000", ethernet=False))
+    modeles = ["Ingenico Move 5000", "Ingenico Desk 5000"]
+    assert [t.shop_id for t in gestionnaire.rechercher_par(modele_tpe=modeles)] == [2, 3, 4, 5]
+assert sorted(avec_index.valeurs_indexees('service')) == ["Musée", "Piscine"]
+assert avec_index.statistiques() == sans_index.statistiques()
+print("✅ Index secondaires cohérents avec un parcours complet")
+
+# Index inverses cartes / numéros de série
+print("\n=== TEST INDEX CARTES / NUMÉROS DE SÉRIE ===")
+gestionnaire = GestionnaireTPE(cartes_uniques=True)
+tpe = creer_tpe(1, cartes_commercant=[CarteCommercant("111", "SN-A"), CarteCommercant("222", "SN-B")])
+assert gestionnaire.ajouter_tpe(tpe)
+assert [t.shop_id for t in gestionnaire.rechercher_par_numero_serie("SN-B")] == [1]
+assert [t.shop_id for t in gestionnaire.rechercher_par_carte("111")] == [1]
+print("✅ Numéro de série SN-B -> ShopID 1")
+
+# Unicité à l'échelle de la flotte
+doublon = creer_tpe(2, cartes_commercant=[CarteCommercant("333", "SN-A")])
+assert not gestionnaire.ajouter_tpe(doublon)
+print("✅ Numéro de série déjà attribué refusé")
+
+# Échange de terminal : le TPE garde ses cartes, le numéro de série change
+echange = creer_tpe(1, cartes_commercant=[CarteCommercant("111", "SN-C"), CarteCommercant("222", "SN-B")])
+assert gestionnaire.modifier_tpe(1, echange)
+assert gestionnaire.rechercher_par_numero_serie("SN-A") == []
+assert [t.shop_id for t in gestionnaire.rechercher_par_numero_serie("SN-C")] == [1]
+assert gestionnaire.ajouter_tpe(doublon)
+print("✅ Index mis à jour après échange")
+
+gestionnaire.supprimer_tpe(1)
+assert gestionnaire.rechercher_par_carte("111") == []
+print("✅ Index mis à jour après suppression")
+
+# Index des adresses IP
+print("\n=== TEST INDEX ADRESSES IP ===")
+
+gestionnaire = GestionnaireTPE()
+assert gestionnaire.ajouter_tpe(creer_tpe(1, ip="10.2.0.10", passerelle="10.2.0.1"))
+assert gestionnaire.ajouter_tpe(creer_tpe(2, ip="10.2.200.3", passerelle="10.2.0.1"))
+assert gestionnaire.ajouter_tpe(creer_tpe(3, ip="10.3.0.10", passerelle="10.3.0.1"))
+assert not gestionnaire.ajouter_tpe(creer_tpe(4, ip="10.2.0.10", passerelle="10.2.0.1"))
+print("✅ Adresse IP en double refusée")
+
+rapport = gestionnaire.ajouter_tpes_lot([creer_tpe(5, ip="10.4.0.1", passerelle="10.4.0.254"),
+                                         creer_tpe(6, ip="10.4.0.1", passerelle="10.4.0.254")])
+assert [indice for indice, _ in rapport.erreurs] == [1]
+print("✅ Adresse IP en double dans un lot refusée")
+
+assert [t.shop_id for t in gestionnaire.rechercher_par_sous_reseau("10.2.0.0/16")] == [1, 2]
+assert [t.shop_id for t in gestionnaire.rechercher_par_passerelle("10.2.0.1")] == [1, 2]
+assert [t.shop_id for t in gestionnaire.rechercher_par_ip("10.3.0.10")] == [3]
+print("✅ Requêtes par sous-réseau, passerelle et IP")
+
+# Modification : un TPE peut garder sa propre adresse
+assert gestionnaire.modifier_tpe(1, creer_tpe(1, ip="10.2.0.10", passerelle="10.2.0.1"))
+assert gestionnaire.modifier_tpe(2, creer_tpe(2, ip="10.9.0.3", passerelle="10.9.0.1"))
+assert [t.shop_id for t in gestionnaire.rechercher_par_sous_reseau("10.2.0.0/16")] == [1]
+gestionnaire.supprimer_tpe(1)
+assert gestionnaire.rechercher_par_sous_reseau("10.2.0.0/16") == []
+assert gestionnaire.ajouter_tpe(creer_tpe(4, ip="10.2.0.10", passerelle="10.2.0.1"))
+print("✅ Index IP mis à jour après modification et suppression")
+
+# Sauvegarde antérieure avec une IP partagée : les TPE restent modifiables tant que l'IP ne change pas
+for partage in (GestionnaireTPE(), GestionnaireTPESQLite(os.path.join(tempfile.mkdtemp(), "partage.db"))):
+    partage.tpes = [creer_tpe(1, ip="10.5.0.1", passerelle="10.5.0.254"),
+                    creer_tpe(2, ip="10.5.0.1", passerelle="10.5.0.254"),
+                    creer_tpe(3, ip="10.6.0.1", passerelle="10.6.0.254")]
+    modifie = creer_tpe(2, ip="10.5.0.1", passerelle="10.5.0.254", service="Piscine")
+    assert partage.modifier_tpe(2, modifie) and partage.rechercher_tpe(2).service == "Piscine"
+    assert not partage.modifier_tpe(1, creer_tpe(1, ip="10.6.0.1", passerelle="10.6.0.254"))
+    assert partage.derniere_erreur == "Adresse IP 10.6.0.1 déjà attribuée"
+    assert not partage.modifier_tpe(9, creer_tpe(9, ip="10.7.0.1", passerelle="10.7.0.254"))
+    assert partage.derniere_erreur == "ShopID 9 introuvable"
+print("✅ IP inchangée non revérifiée, motif du refus disponible")
+
+# Chargements en masse (lot, réinitialisation) : liste des IP triée une seule fois
+adresses = [f"10.{octet}.0.1" for octet in (200, 7, 150, 3, 99)]
+lot = GestionnaireTPE()
+assert lot.ajouter_tpes_lot([creer_tpe(10 + i, ip=ip, passerelle="10.0.0.254")
+                             for i, ip in enumerate(adresses)]).succes
+recharge = GestionnaireTPE()
+recharge.tpes = lot.lister_tpes()
+for g in (lot, recharge):
+    assert [t.shop_id for t in g.rechercher_par_sous_reseau("10.0.0.0/9")] == [13, 11, 14]
+    assert not g.ajouter_tpe(creer_tpe(20, ip="10.150.0.1", passerelle="10.0.0.254"))
+print("✅ Index IP trié après un ajout en lot et une réinitialisation")
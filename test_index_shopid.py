@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+from outils_tests import creer_tpe
+from tpe_manager import GestionnaireTPE
+
+print("=== TEST INDEX SHOPID ===")
+
+gestionnaire = GestionnaireTPE()
+for shop_id in (30, 10, 20):
+    assert gestionnaire.ajouter_tpe(creer_tpe(shop_id))
+
+# Unicité
+assert not gestionnaire.ajouter_tpe(creer_tpe(10))
+print("✅ Doublon de ShopID refusé")
+
+# Ordre d'insertion conservé
+assert [t.shop_id for t in gestionnaire.lister_tpes()] == [30, 10, 20]
+print("✅ Ordre d'insertion conservé")
+
+# Recherche
+assert gestionnaire.rechercher_tpe(20).shop_id == 20
+assert gestionnaire.rechercher_tpe(99) is None
+print("✅ Recherche par ShopID")
+
+# Modification avec changement de ShopID : la position est conservée
+assert gestionnaire.modifier_tpe(10, creer_tpe(15))
+assert [t.shop_id for t in gestionnaire.lister_tpes()] == [30, 15, 20]
+assert gestionnaire.rechercher_tpe(10) is None
+assert not gestionnaire.modifier_tpe(15, creer_tpe(30))
+print("✅ Modification par ShopID")
+
+# Suppression
+assert gestionnaire.supprimer_tpe(30)
+assert [t.shop_id for t in gestionnaire.lister_tpes()] == [15, 20]
+print("✅ Suppression par ShopID")
+
+# Attribution automatique (le ShopID 30 a déjà été attribué)
+tpe = creer_tpe(0)
+assert gestionnaire.ajouter_tpe(tpe)
+assert tpe.shop_id == 31
+print(f"✅ ShopID automatique: {tpe.shop_id}")
+
+# Séquence monotone : un ShopID supprimé n'est jamais réattribué
+assert gestionnaire.supprimer_tpe(31)
+tpe = creer_tpe(0)
+assert gestionnaire.ajouter_tpe(tpe)
+assert tpe.shop_id == 32
+
+# Ajout refusé : aucun ShopID consommé, TPE reçu inchangé
+gestionnaire.cartes_uniques = True
+refuse = creer_tpe(0, ethernet=False)  # Même carte que le ShopID 32 (adresse IP libre)
+assert not gestionnaire.ajouter_tpe(refuse)
+assert refuse.shop_id == 0 and gestionnaire.prochain_shop_id == 33
+gestionnaire.cartes_uniques = False
+
+bloc = gestionnaire.reserver_shop_ids(100)
+assert bloc == range(33, 133)
+assert gestionnaire.prochain_shop_id == 133
+print(f"✅ Séquence ShopID monotone, bloc réservé: {bloc.start}-{bloc.stop - 1}")
+
+# La séquence est sauvegardée avec les données
+with tempfile.TemporaryDirectory() as dossier:
+    for sauver, restaurer, nom in (
+        (gestionnaire.sauvegarder, GestionnaireTPE.restaurer, "data.pkl"),
+        (gestionnaire.backup_json, GestionnaireTPE.restaurer_json, "backup.json"),
+    ):
+        fichier = os.path.join(dossier, nom)
+        assert sauver(fichier)
+        restaure = GestionnaireTPE()
+        assert restaurer(restaure, fichier)
+        assert restaure.prochain_shop_id == 133
+print("✅ Séquence ShopID restaurée")
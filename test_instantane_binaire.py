@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+from outils_tests import creer_tpe
+from tpe_manager import GestionnaireTPE, Regisseur, CarteCommercant
+from tpe_mmap import InstantaneBinaire, sauvegarder_binaire
+
+print("=== TEST INSTANTANÉ BINAIRE (mmap) ===")
+
+gestionnaire = GestionnaireTPE()
+# ShopID insérés dans le désordre : le répertoire est trié, l'ordre d'insertion conservé
+for shop_id in list(range(500, 0, -2)) + list(range(1, 500, 2)):
+    # Caractères accentués et nombre de cartes variable (chaînes et listes de longueur variable)
+    assert gestionnaire.ajouter_tpe(creer_tpe(
+        shop_id,
+        service=f"Service {shop_id % 7} – Régie",
+        regisseur=Regisseur(prenom="Jérôme", nom=f"Dupont{shop_id}", telephone="0601020304"),
+        regisseurs_suppleants="" if shop_id % 2 else "Marie Martin",
+        cartes_commercant=[CarteCommercant(numero=f"C{shop_id}", numero_serie_tpe=f"SN{shop_id}")]
+        + [CarteCommercant(numero=f"D{shop_id}")] * (shop_id % 3)
+    ))
+reference = [tpe.to_dict() for tpe in gestionnaire.lister_tpes()]
+
+fichier = os.path.join(tempfile.mkdtemp(), "flotte.bin")
+assert sauvegarder_binaire(gestionnaire, fichier)
+
+with InstantaneBinaire(fichier) as instantane:
+    assert len(instantane) == 500
+    assert instantane.prochain_shop_id == gestionnaire.prochain_shop_id
+    assert instantane.rechercher_tpe(123).to_dict() == gestionnaire.rechercher_tpe(123).to_dict()
+    assert instantane.rechercher_tpe(0) is None and instantane.rechercher_tpe(501) is None
+    print("✅ Recherche dichotomique par ShopID")
+
+    assert instantane.valeur(124, 'service') == "Service 5 – Régie"
+    assert instantane.valeur(124, 'nombre_tpe') == 2
+    assert instantane.valeur(125, 'backoffice_email') is None
+    print("✅ Lecture d'un champ sans construire le TPE")
+
+    assert [tpe.to_dict() for tpe in instantane] == reference
+    assert instantane.statistiques() == gestionnaire.statistiques()
+    print("✅ Parcours complet et statistiques sur les colonnes")
+
+    # Plusieurs lecteurs partagent le même fichier
+    with InstantaneBinaire(fichier) as autre:
+        assert autre.rechercher_tpe(8).to_dict() == instantane.rechercher_tpe(8).to_dict()
+    print("✅ Lecteurs concurrents en lecture seule")
+
+    restaure = GestionnaireTPE()
+    restaure.tpes = instantane
+    assert [tpe.to_dict() for tpe in restaure.lister_tpes()] == reference
+    print("✅ Chargement complet dans un gestionnaire")
+
+with open(fichier, 'r+b') as f:
+    f.write(b"XXXX")
+try:
+    InstantaneBinaire(fichier)
+    assert False, "signature invalide acceptée"
+except ValueError:
+    print("✅ Fichier invalide refusé")
+
+print("\n✅ TOUS LES TESTS D'INSTANTANÉ BINAIRE RÉUSSIS")
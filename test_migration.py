@@ -0,0 +1,123 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import tpe_manager2
+from tpe_manager import GestionnaireTPE
+from tpe_migration import VERSION_COURANTE, etapes, migrer, version_de
+
+print("=== TEST MIGRATION DES ANCIENS FORMATS ===")
+
+dossier = tempfile.mkdtemp()
+
+
+def chemin(nom):
+    return os.path.join(dossier, nom)
+
+
+# Fichiers 1.3 livrés avec l'application (numéros de carte en chaînes)
+for source, restaurer in (("tpe_data.pkl", GestionnaireTPE.restaurer),
+                          ("tpe_backup.json", GestionnaireTPE.restaurer_json)):
+    fichier = chemin(source)
+    shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), source), fichier)
+    gestionnaire = GestionnaireTPE()
+    assert restaurer(gestionnaire, fichier)
+    tpe = gestionnaire.rechercher_tpe(1)
+    assert [carte.numero for carte in tpe.cartes_commercant] == ['123456789', '1234567', '123456 mpo']
+    assert tpe.cartes_commercant[0].numero_serie_tpe is None
+    assert tpe.nombre_tpe == 3
+
+    # Original conservé, fichier réécrit au format courant : plus de migration ensuite
+    assert os.path.exists(f"{fichier}.v1.3")
+    modifie = os.path.getmtime(fichier)
+    relu = GestionnaireTPE()
+    assert restaurer(relu, fichier)
+    assert [t.to_dict() for t in relu.lister_tpes()] == [t.to_dict() for t in gestionnaire.lister_tpes()]
+    assert os.path.getmtime(fichier) == modifie
+print("✅ Fichiers 1.3 migrés puis réécrits une seule fois")
+
+# Format 1.2 de tpe_manager2.py (numéros de carte entiers)
+ancien = tpe_manager2.GestionnaireTPE()
+ancien.tpes.append(tpe_manager2.TPE(
+    service="Piscine",
+    regisseur=tpe_manager2.Regisseur("Jean", "Dupont", "0601020304"),
+    regisseurs_suppleants="",
+    cartes_commercant=[123, 456],
+    shop_id=7,
+    acces_backoffice=tpe_manager2.AccesBackoffice(actif=False),
+    modele_tpe="Ingenico Move 5000",
+    type_tpe=tpe_manager2.TypeTPE(ethernet=False, quatre_cinq_g=True),
+    nombre_tpe=2
+))
+assert ancien.sauvegarder(chemin("v1_2.pkl"))
+assert ancien.backup_json(chemin("v1_2.json"))
+for fichier, restaurer in ((chemin("v1_2.pkl"), GestionnaireTPE.restaurer),
+                           (chemin("v1_2.json"), GestionnaireTPE.restaurer_json)):
+    gestionnaire = GestionnaireTPE()
+    assert restaurer(gestionnaire, fichier)
+    tpe = gestionnaire.rechercher_tpe(7)
+    assert [carte.numero for carte in tpe.cartes_commercant] == ['123', '456']
+    assert tpe.nombre_tpe == 2 and gestionnaire.prochain_shop_id == 8
+print("✅ Format 1.2 (tpe_manager2.py) migré")
+
+# 1.2 sans nombre_tpe, et fichier sans version avec 'carte_commercant' unique
+enregistrement = ancien.tpes[0].to_dict()
+del enregistrement['nombre_tpe']
+with open(chemin("sans_nombre.json"), 'w', encoding='utf-8') as f:
+    json.dump({'tpes': [enregistrement], 'version': '1.2'}, f)
+unique = dict(enregistrement, carte_commercant=99)
+del unique['cartes_commercant']
+with open(chemin("sans_version.pkl"), 'wb') as f:
+    pickle.dump({'tpes': [unique]}, f)
+
+gestionnaire = GestionnaireTPE()
+assert gestionnaire.restaurer_json(chemin("sans_nombre.json"))
+assert gestionnaire.rechercher_tpe(7).nombre_tpe == 1
+assert gestionnaire.restaurer(chemin("sans_version.pkl"))
+assert [carte.numero for carte in gestionnaire.rechercher_tpe(7).cartes_commercant] == ['99']
+assert os.path.exists(chemin("sans_version.pkl.v1.0"))
+print("✅ nombre_tpe absent et fichier sans version migrés")
+
+# Choix du décodeur : une chaîne d'étapes par version, vide au format courant
+assert version_de({'tpes': [unique]}) == '1.0'
+assert len(etapes('1.0')) == 3 and len(etapes('1.2')) == 2 and etapes('1.6') == []
+assert migrer({'tpes': [], 'version': VERSION_COURANTE}) is None
+
+# Version inconnue : restauration refusée, fichier intact
+with open(chemin("future.json"), 'w', encoding='utf-8') as f:
+    json.dump({'tpes': [enregistrement], 'version': '9.0'}, f)
+assert not gestionnaire.restaurer_json(chemin("future.json"))
+assert not os.path.exists(chemin("future.json.v9.0"))
+print("✅ Version inconnue refusée")
+
+# Lot et liste JSON sans version : format déduit de toute la liste, enregistrements copiés
+from tpe_sqlite import GestionnaireTPESQLite
+
+anciens = [dict(enregistrement, shop_id=0, nombre_tpe=1, cartes_commercant=[f"C{i}", f"D{i}"])
+           for i in range(5)]
+for lot in (GestionnaireTPE(), GestionnaireTPESQLite(chemin("lot.db"))):
+    rapport = lot.ajouter_tpes_lot(anciens)
+    assert rapport.succes and len(rapport.ajoutes) == 5
+    assert [carte.numero for carte in lot.lister_tpes()[4].cartes_commercant] == ['C4', 'D4']
+assert anciens[0]['cartes_commercant'] == ['C0', 'D0']
+print("✅ Lot d'enregistrements 1.3 migré avant ajout")
+
+# Formats mélangés : refusés explicitement, sans migration partielle
+courant = lot.lister_tpes()[0].to_dict()
+melange = [courant, dict(courant, cartes_commercant=['123'])]
+rapport = GestionnaireTPE().ajouter_tpes_lot(melange)
+assert not rapport.succes and "mélangés" in rapport.erreurs[0][1]
+with open(chemin("melange.json"), 'w', encoding='utf-8') as f:
+    json.dump({'tpes': melange}, f)
+assert not GestionnaireTPE().restaurer_json(chemin("melange.json"))
+try:
+    version_de({'tpes': melange})
+    assert False
+except ValueError as e:
+    assert "1.5 (ligne 1), 1.3 (ligne 2)" in str(e)
+with open(chemin("melange_1_5.json"), 'w', encoding='utf-8') as f:
+    json.dump({'tpes': melange, 'version': '1.5'}, f)
+assert not GestionnaireTPE().restaurer_json(chemin("melange_1_5.json"))
+print("✅ Fichiers et lots aux formats mélangés refusés")
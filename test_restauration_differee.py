@@ -0,0 +1,93 @@
+import os
+import tempfile
+
+from outils_tests import creer_tpe, gestionnaire_dans
+from tpe_manager import GestionnaireTPE
+
+
+print("=== TEST RESTAURATION DIFFÉRÉE ===")
+
+dossier = tempfile.mkdtemp()
+fichier = os.path.join(dossier, "data.idx")
+
+gestionnaire = GestionnaireTPE(index_secondaires=True)
+gestionnaire.ajouter_tpes_lot([creer_tpe(i) for i in range(1, 1001)])
+gestionnaire.reserver_shop_ids(10)
+reference = [tpe.to_dict() for tpe in gestionnaire.lister_tpes()]
+assert gestionnaire.sauvegarder_indexe(fichier)
+
+# Seul l'index est lu : aucun TPE construit
+differe = GestionnaireTPE(index_secondaires=True)
+assert differe.restaurer(fichier)
+assert differe.nombre_differes == 1000
+assert differe.statistiques() == gestionnaire.statistiques()
+assert differe.prochain_shop_id == 1011
+print("✅ Restauration : index seul, statistiques disponibles")
+
+# Accès à la demande
+assert differe.rechercher_tpe(500).to_dict() == reference[499]
+assert differe.rechercher_tpe(5000) is None
+assert differe.nombre_differes == 999
+assert differe.supprimer_tpe(10) and differe.nombre_differes == 998
+assert differe.modifier_tpe(21, creer_tpe(21)) and differe.nombre_differes == 997
+assert not differe.ajouter_tpe(creer_tpe(30))
+print("✅ TPE construits au premier accès")
+
+# Le parcours respecte l'ordre d'insertion
+parcours = differe.iterer_tpes()
+premiers = [next(parcours).shop_id for _ in range(15)]
+assert premiers == [i for i in range(1, 17) if i != 10]
+print("✅ Parcours progressif dans l'ordre d'insertion")
+
+# Nouvelle sauvegarde indexée pendant que des TPE sont encore différés
+assert differe.nombre_differes > 0
+assert differe.sauvegarder_indexe(fichier)
+assert differe.rechercher_tpe(999).to_dict() == reference[998]
+attendu = [tpe.to_dict() for tpe in differe.lister_tpes()]
+assert differe.nombre_differes == 0
+relu = GestionnaireTPE()
+assert relu.restaurer(fichier)
+assert [tpe.to_dict() for tpe in relu.lister_tpes()] == attendu
+print("✅ Sauvegarde indexée réécrite sans construire les TPE différés")
+
+# Les recherches par index secondaires chargent le reste de la flotte
+relu = GestionnaireTPE(index_secondaires=True)
+assert relu.restaurer(fichier)
+assert [t.shop_id for t in relu.rechercher_par_carte("C700")] == [700]
+assert relu.nombre_differes == 0
+meme_ip = creer_tpe(4)
+meme_ip.shop_id = 2000
+assert not relu.ajouter_tpe(creer_tpe(4)) and not relu.ajouter_tpe(meme_ip)
+relu.statistiques(verifier=True)
+print("✅ Index secondaires complétés à la demande")
+
+# Checkpoint au format indexé + journal
+journalise = gestionnaire_dans(dossier)
+journalise.sauvegarde_indexee = True
+journalise.activer_journal()
+journalise.ajouter_tpes_lot([creer_tpe(i) for i in range(1, 101)])
+assert journalise.checkpoint()
+journalise.supprimer_tpe(50)
+attendu = [tpe.to_dict() for tpe in journalise.lister_tpes()]
+journalise.desactiver_journal()
+relu = gestionnaire_dans(dossier)
+relu.sauvegarde_indexee = True
+relu.activer_journal()
+assert relu.restaurer()
+assert relu.nombre_differes == 99
+assert relu.rechercher_tpe(1) is not None and relu._lecteur_differe is not None
+print("✅ Checkpoint indexé et rejeu du journal")
+
+# Fermeture (déconnexion) : journal et sauvegarde source libérés avant la session suivante
+relu.fermer()
+assert not relu.journal_actif and relu._lecteur_differe is None
+session = gestionnaire_dans(dossier)
+session.sauvegarde_indexee = True
+session.activer_journal()
+assert session.restaurer()
+assert [tpe.to_dict() for tpe in session.lister_tpes()] == attendu
+session.fermer()
+assert [tpe.to_dict() for tpe in relu.lister_tpes()] == attendu
+print("✅ Fichiers libérés à la fermeture, TPE différés toujours lisibles")
+
+print("\n✅ TOUS LES TESTS DE RESTAURATION DIFFÉRÉE RÉUSSIS")
@@ -0,0 +1,71 @@
+import tempfile
+import threading
+import time
+
+from outils_tests import creer_tpe, gestionnaire_dans
+from tpe_sauvegarde_auto import SauvegardeAutomatique
+
+print("=== TEST SAUVEGARDE AUTOMATIQUE ===")
+
+
+# Regroupement : une rafale de modifications -> une seule écriture
+ecritures = []
+auto = SauvegardeAutomatique(lambda: ecritures.append(time.monotonic()) or True, delai=0.2)
+debut = time.monotonic()
+for _ in range(50):
+    auto.marquer_modifie()
+assert auto.modifie and not ecritures
+time.sleep(0.5)
+assert len(ecritures) == 1 and ecritures[0] - debut >= 0.2
+assert not auto.modifie
+print("✅ 50 modifications regroupées en une écriture")
+
+# vider() écrit immédiatement, sans attendre le délai
+auto.delai = 60
+auto.marquer_modifie()
+assert auto.vider(timeout=5)
+assert len(ecritures) == 2
+assert auto.arreter(timeout=5)
+print("✅ Écriture forcée à la fermeture")
+
+# Les échecs sont signalés et retentés à la fermeture
+erreurs = []
+resultats = iter([False, True])
+auto = SauvegardeAutomatique(lambda: next(resultats), delai=0.05, en_erreur=erreurs.append)
+auto.marquer_modifie()
+time.sleep(0.3)
+assert erreurs == ["Échec de la sauvegarde automatique"] and auto.modifie
+assert auto.arreter(timeout=5)
+assert not auto.modifie
+print(f"✅ Erreur signalée: {erreurs[0]}")
+
+# Checkpoint pendant des modifications : les opérations écrites pendant
+# l'instantané restent dans le journal, rien n'est perdu
+dossier = tempfile.mkdtemp()
+gestionnaire = gestionnaire_dans(dossier)
+gestionnaire.activer_journal()
+gestionnaire.ajouter_tpes_lot([creer_tpe(i) for i in range(1, 20001)])
+
+
+def modifier():
+    for i in range(20001, 20401):
+        gestionnaire.ajouter_tpe(creer_tpe(i))
+        gestionnaire.supprimer_tpe(i - 20000)
+
+
+thread = threading.Thread(target=modifier)
+thread.start()
+assert gestionnaire.checkpoint()
+thread.join()
+restantes = gestionnaire.taille_journal()
+gestionnaire.desactiver_journal()
+
+relu = gestionnaire_dans(dossier)
+relu.activer_journal()
+assert relu.restaurer()
+assert [t.shop_id for t in relu.lister_tpes()] == [t.shop_id for t in gestionnaire.lister_tpes()]
+assert relu.taille_journal() == restantes
+relu.desactiver_journal()
+print(f"✅ Checkpoint concurrent : {restantes} opération(s) conservée(s) dans le journal")
+
+print("\n✅ TOUS LES TESTS DE SAUVEGARDE AUTOMATIQUE RÉUSSIS")
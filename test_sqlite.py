@@ -0,0 +1,130 @@
+import os
+import tempfile
+import threading
+
+from outils_tests import creer_tpe
+from tpe_manager import GestionnaireTPE
+from tpe_sqlite import GestionnaireTPESQLite
+
+print("=== TEST STOCKAGE SQLITE ===")
+
+dossier = tempfile.mkdtemp()
+base = os.path.join(dossier, "tpe.db")
+gestionnaire = GestionnaireTPESQLite(base, cartes_uniques=True)
+
+for shop_id in (30, 10, 20):
+    assert gestionnaire.ajouter_tpe(creer_tpe(shop_id, deux_cartes=True, ethernet=False))
+piscine = creer_tpe(40, deux_cartes=True, service="Piscine", ip="192.168.1.40", nombre_tpe=1)
+assert gestionnaire.ajouter_tpe(piscine)
+assert not gestionnaire.ajouter_tpe(creer_tpe(10))
+assert not gestionnaire.ajouter_tpe(creer_tpe(41, ip="192.168.1.40"))
+assert [t.shop_id for t in gestionnaire.lister_tpes()] == [30, 10, 20, 40]
+print("✅ Ajout, unicité ShopID / IP et ordre d'insertion")
+
+tpe = gestionnaire.rechercher_tpe(40)
+assert tpe.to_dict() == piscine.to_dict() | {'date_creation': tpe.date_creation}
+assert [c.numero for c in tpe.cartes_commercant] == ["C40", "D40"]
+assert gestionnaire.rechercher_tpe(99) is None
+assert [t.shop_id for t in gestionnaire.rechercher_par_carte("D20")] == [20]
+assert [t.shop_id for t in gestionnaire.rechercher_par_numero_serie("SN30")] == [30]
+assert [t.shop_id for t in gestionnaire.rechercher_par_ip("192.168.1.40")] == [40]
+assert [t.shop_id for t in gestionnaire.rechercher_par(service="Piscine", ethernet=True)] == [40]
+print("✅ Recherches (ShopID, cartes, IP, critères)")
+
+assert gestionnaire.modifier_tpe(10, creer_tpe(15))
+assert [t.shop_id for t in gestionnaire.lister_tpes()] == [30, 15, 20, 40]
+assert gestionnaire.rechercher_par_carte("C10") == []
+assert not gestionnaire.modifier_tpe(15, creer_tpe(30))
+assert gestionnaire.supprimer_tpe(30)
+assert gestionnaire.rechercher_par_carte("C30") == []
+print("✅ Modification et suppression (cartes en cascade)")
+
+rapport = gestionnaire.ajouter_tpes_lot([creer_tpe(0, ethernet=False), creer_tpe(20), creer_tpe(50)])
+assert not rapport.succes and rapport.erreurs[0][0] == 1
+assert len(gestionnaire.lister_tpes()) == 3
+rapport = gestionnaire.ajouter_tpes_lot([creer_tpe(0, ethernet=False), creer_tpe(20), creer_tpe(50)],
+                                        tout_ou_rien=False)
+assert rapport.ajoutes == [51, 50]
+print(f"✅ Ajout par lot transactionnel: {rapport.ajoutes}")
+
+stats = gestionnaire.statistiques()
+assert stats['total_tpes'] == 5 and stats['type_ethernet'] == 1
+assert gestionnaire.rapport_par('service')['Piscine'] == {'entrees': 1, 'appareils': 1}
+print(f"✅ Statistiques SQL: {stats}")
+
+# Les données persistent et se relisent sans chargement complet
+gestionnaire.fermer()
+relu = GestionnaireTPESQLite(base)
+assert [t.shop_id for t in relu.lister_tpes()] == [15, 20, 40, 51, 50]
+assert relu.prochain_shop_id == 52
+print("✅ Persistance dans la base")
+
+# Compatibilité avec les sauvegardes pickle / JSON du gestionnaire en mémoire
+json_fichier = os.path.join(dossier, "backup.json")
+assert relu.backup_json(json_fichier)
+memoire = GestionnaireTPE()
+assert memoire.restaurer_json(json_fichier)
+assert [t.to_dict() for t in memoire.lister_tpes()] == [t.to_dict() for t in relu.lister_tpes()]
+assert memoire.prochain_shop_id == 52
+memoire.supprimer_tpe(15)
+pickle_fichier = os.path.join(dossier, "data.pkl")
+assert memoire.sauvegarder(pickle_fichier)
+assert relu.restaurer(pickle_fichier)
+assert [t.shop_id for t in relu.lister_tpes()] == [20, 40, 51, 50]
+assert relu.exporter_excel(os.path.join(dossier, "export.xlsx"))
+print("✅ Sauvegarde, restauration et export Excel")
+
+# Sauvegarde indexée : tous les TPE sont écrits et réinsérés dans la base
+indexe = os.path.join(dossier, "indexe.pkl")
+attendu = [t.to_dict() for t in relu.lister_tpes()]
+assert relu.sauvegarder_indexe(indexe)
+autre = GestionnaireTPESQLite(os.path.join(dossier, "autre.db"))
+assert autre.restaurer(indexe)
+assert [t.to_dict() for t in autre.lister_tpes()] == attendu
+assert autre.prochain_shop_id == relu.prochain_shop_id
+autre.statistiques(verifier=True)
+memoire = GestionnaireTPE()
+assert memoire.restaurer(indexe)
+assert [t.to_dict() for t in memoire.lister_tpes()] == attendu
+memoire.statistiques(verifier=True)
+memoire.supprimer_tpe(20)
+assert memoire.sauvegarder_indexe(indexe)
+assert autre.restaurer(indexe)
+assert [t.shop_id for t in autre.lister_tpes()] == [40, 51, 50]
+autre.sauvegarde_indexee = True
+autre.fichier_sauvegarde = os.path.join(dossier, "checkpoint.pkl")
+assert autre.checkpoint()
+assert GestionnaireTPESQLite(os.path.join(dossier, "relu.db")).restaurer(autre.fichier_sauvegarde)
+autre.fermer()
+print("✅ Sauvegarde indexée : aller-retour base <-> fichier")
+
+# Connexion partagée entre threads (sauvegarde automatique, interface)
+relu.activer_journal()
+assert not relu.journal_actif
+erreurs = []
+
+
+def ajouter_depuis_thread(debut):
+    try:
+        for shop_id in range(debut, debut + 50):
+            assert relu.ajouter_tpe(creer_tpe(shop_id))
+            relu.lister_tpes()
+    except Exception as e:
+        erreurs.append(e)
+
+
+threads = [threading.Thread(target=ajouter_depuis_thread, args=(1000 * n,)) for n in range(1, 5)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert not erreurs, erreurs
+stats = relu.statistiques(verifier=True)
+assert stats['total_tpes'] == 204
+print(f"✅ Accès concurrents depuis {len(threads)} threads, statistiques vérifiées")
+
+relu.fermer()
+assert not relu.sauvegarder(os.path.join(dossier, "ferme.pkl"))
+print("✅ Sauvegarde sur base fermée : échec signalé")
+
+print("\n✅ TOUS LES TESTS SQLITE RÉUSSIS")
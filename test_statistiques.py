@@ -0,0 +1,45 @@
+import random
+
+from outils_tests import creer_tpe
+from tpe_manager import GestionnaireTPE
+
+
+print("=== TEST STATISTIQUES ===")
+
+random.seed(42)
+
+# Même suite de mutations sur un gestionnaire simple et un gestionnaire colonnaire
+reference = GestionnaireTPE()
+colonnaire = GestionnaireTPE(colonnes=True)
+for gestionnaire in (reference, colonnaire):
+    random.seed(1)
+    for shop_id in range(1, 301):
+        gestionnaire.ajouter_tpe(creer_tpe(shop_id, hasard=random))
+    for shop_id in range(1, 301, 7):
+        gestionnaire.supprimer_tpe(shop_id)
+    for shop_id in range(2, 301, 5):
+        gestionnaire.modifier_tpe(shop_id, creer_tpe(shop_id, hasard=random))
+
+assert colonnaire.statistiques(verifier=True) == reference.statistiques(verifier=True)
+print(f"✅ Statistiques colonnaires: {colonnaire.statistiques()}")
+for champ in ('modele_tpe', 'service'):
+    assert colonnaire.rapport_par(champ) == reference.rapport_par(champ)
+print(f"✅ Rapport par service: {colonnaire.rapport_par('service')}")
+
+# Compteurs incrémentaux : cohérents avec un recomptage complet après chaque étape
+gestionnaire = GestionnaireTPE()
+random.seed(7)
+for shop_id in range(1, 101):
+    gestionnaire.ajouter_tpe(creer_tpe(shop_id, hasard=random))
+    gestionnaire.statistiques(verifier=True)
+for shop_id in range(1, 101, 3):
+    gestionnaire.modifier_tpe(shop_id, creer_tpe(shop_id, hasard=random))
+    gestionnaire.statistiques(verifier=True)
+for shop_id in range(1, 101, 4):
+    gestionnaire.supprimer_tpe(shop_id)
+    gestionnaire.statistiques(verifier=True)
+gestionnaire.ajouter_tpes_lot([creer_tpe(0, hasard=random) for _ in range(20)])
+gestionnaire.statistiques(verifier=True)
+gestionnaire.tpes = gestionnaire.lister_tpes()[:10]
+assert gestionnaire.statistiques(verifier=True)['total_tpes'] == 10
+print("✅ Compteurs incrémentaux cohérents avec le recomptage")
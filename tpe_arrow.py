@@ -0,0 +1,151 @@
+"""
+Export colonnaire typé (Parquet / Feather) pour l'analyse
+Les TPE sont convertis par lots directement en colonnes Arrow (sans liste de
+dictionnaires intermédiaire) : entiers pour ShopID et nombre de TPE, booléens
+pour les options, chaînes codées par dictionnaire pour le service et le modèle,
+horodatage pour la date de création. Les cartes commerçant forment une table fille
+(shop_id, position, numero, numero_serie_tpe) écrite à côté : <nom>_cartes.<ext>.
+Nécessite pyarrow (optionnel) : ARROW_DISPONIBLE indique s'il est installé.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow est optionnel
+    pa = pq = None
+
+ARROW_DISPONIBLE = pa is not None
+
+# Nombre de TPE par lot (groupe de lignes Parquet / lot Arrow)
+TAILLE_LOT = 65_536
+
+# Extension -> format
+FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+
+
+def chemin_cartes(fichier: str) -> str:
+    """Fichier de la table fille des cartes commerçant"""
+    chemin = Path(fichier)
+    return str(chemin.with_name(f"{chemin.stem}_cartes{chemin.suffix}"))
+
+
+def _schemas():
+    """Schémas des tables TPE et cartes"""
+    dictionnaire = pa.dictionary(pa.int32(), pa.string())
+    tpe = pa.schema([
+        pa.field('shop_id', pa.int64(), nullable=False),
+        pa.field('service', dictionnaire),
+        pa.field('regisseur_prenom', pa.string()),
+        pa.field('regisseur_nom', pa.string()),
+        pa.field('regisseur_telephone', pa.string()),
+        pa.field('regisseurs_suppleants', pa.string()),
+        pa.field('nombre_tpe', pa.int32()),
+        pa.field('acces_backoffice', pa.bool_()),
+        pa.field('email_backoffice', pa.string()),
+        pa.field('modele_tpe', dictionnaire),
+        pa.field('ethernet', pa.bool_()),
+        pa.field('quatre_cinq_g', pa.bool_()),
+        pa.field('adresse_ip', pa.string()),
+        pa.field('masque', pa.string()),
+        pa.field('passerelle', pa.string()),
+        pa.field('date_creation', pa.timestamp('s')),
+    ])
+    cartes = pa.schema([
+        pa.field('shop_id', pa.int64(), nullable=False),
+        pa.field('position', pa.int16()),
+        pa.field('numero', pa.string()),
+        pa.field('numero_serie_tpe', pa.string()),
+    ])
+    return tpe, cartes
+
+
+def _horodatage(texte: Optional[str]) -> Optional[datetime]:
+    """Date de création 'AAAA-MM-JJ HH:MM:SS' -> datetime (None si absente ou illisible)"""
+    try:
+        return datetime.fromisoformat(texte)
+    except (TypeError, ValueError):
+        return None
+
+
+@contextmanager
+def _ecrivain(fichier: str, schema, format_: str):
+    """Fonction d'écriture d'un lot Arrow dans un fichier Parquet ou Feather (IPC)"""
+    if format_ == 'parquet':
+        ecrivain = pq.ParquetWriter(fichier, schema)
+        try:
+            yield lambda lot: ecrivain.write_table(pa.Table.from_batches([lot]))
+        finally:
+            ecrivain.close()
+    else:
+        options = pa.ipc.IpcWriteOptions(compression='lz4')
+        with pa.OSFile(fichier, 'wb') as sortie, pa.ipc.new_file(sortie, schema, options=options) as ecrivain:
+            yield ecrivain.write_batch
+
+
+def ecrire_colonnes(tpes: Iterable, fichier: str, dictionnaires: Dict[str, List[str]],
+                    format_: Optional[str] = None, taille_lot: int = TAILLE_LOT) -> str:
+    """
+    Écrit les TPE (objets TPE) par lots dans `fichier` et leurs cartes dans la table fille
+    dictionnaires : valeurs distinctes de 'service' et 'modele_tpe' pour toute la flotte
+    (un seul dictionnaire par colonne, exigé par le format Feather)
+    format_ : 'parquet' ou 'feather', par défaut d'après l'extension
+    Retourne le chemin de la table des cartes
+    """
+    if pa is None:
+        raise ImportError("Export Parquet/Feather indisponible (pip install pyarrow)")
+    format_ = format_ or FORMATS.get(Path(fichier).suffix.lower())
+    if format_ not in ('parquet', 'feather'):
+        raise ValueError(f"Format colonnaire inconnu: {fichier}")
+
+    schema_tpe, schema_cartes = _schemas()
+    codes = {champ: {valeur: code for code, valeur in enumerate(valeurs)}
+             for champ, valeurs in dictionnaires.items()}
+    tables = {champ: pa.array(valeurs, pa.string()) for champ, valeurs in dictionnaires.items()}
+
+    def codees(lot, champ):
+        indices = pa.array([codes[champ][getattr(tpe, champ)] for tpe in lot], pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, tables[champ])
+
+    fichier_cartes = chemin_cartes(fichier)
+    tpes = iter(tpes)
+    with _ecrivain(fichier, schema_tpe, format_) as ecrire_tpes, \
+            _ecrivain(fichier_cartes, schema_cartes, format_) as ecrire_cartes:
+        while True:
+            lot = list(islice(tpes, taille_lot))
+            if not lot:
+                break
+            configs = [tpe.type_tpe.config_reseau for tpe in lot]
+            ecrire_tpes(pa.RecordBatch.from_arrays([
+                pa.array([tpe.shop_id for tpe in lot], pa.int64()),
+                codees(lot, 'service'),
+                pa.array([tpe.regisseur.prenom for tpe in lot], pa.string()),
+                pa.array([tpe.regisseur.nom for tpe in lot], pa.string()),
+                pa.array([tpe.regisseur.telephone for tpe in lot], pa.string()),
+                pa.array([tpe.regisseurs_suppleants for tpe in lot], pa.string()),
+                pa.array([tpe.nombre_tpe for tpe in lot], pa.int32()),
+                pa.array([tpe.acces_backoffice.actif for tpe in lot], pa.bool_()),
+                pa.array([tpe.acces_backoffice.email for tpe in lot], pa.string()),
+                codees(lot, 'modele_tpe'),
+                pa.array([tpe.type_tpe.ethernet for tpe in lot], pa.bool_()),
+                pa.array([tpe.type_tpe.quatre_cinq_g for tpe in lot], pa.bool_()),
+                pa.array([config.adresse_ip if config else None for config in configs], pa.string()),
+                pa.array([config.masque if config else None for config in configs], pa.string()),
+                pa.array([config.passerelle if config else None for config in configs], pa.string()),
+                pa.array([_horodatage(tpe.date_creation) for tpe in lot], pa.timestamp('s')),
+            ], schema=schema_tpe))
+
+            cartes = [(tpe.shop_id, position, carte)
+                      for tpe in lot for position, carte in enumerate(tpe.cartes_commercant)]
+            ecrire_cartes(pa.RecordBatch.from_arrays([
+                pa.array([shop_id for shop_id, _, _ in cartes], pa.int64()),
+                pa.array([position for _, position, _ in cartes], pa.int16()),
+                pa.array([carte.numero for _, _, carte in cartes], pa.string()),
+                pa.array([carte.numero_serie_tpe for _, _, carte in cartes], pa.string()),
+            ], schema=schema_cartes))
+    return fichier_cartes
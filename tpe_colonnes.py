@@ -0,0 +1,158 @@
+"""
+Stockage colonnaire des TPE pour les statistiques et rapports
+Miroir optionnel de GestionnaireTPE : tableaux d'entiers (array / NumPy),
+bitsets pour les booléens et codes entiers pour les chaînes (encodage par dictionnaire)
+"""
+
+from array import array
+from collections import Counter
+from typing import Dict, List
+
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel : repli sur array + Counter
+    np = None
+
+
+def _popcount(valeur: int) -> int:
+    """Nombre de bits à 1 d'un entier"""
+    if hasattr(valeur, 'bit_count'):
+        return valeur.bit_count()
+    return bin(valeur).count('1')
+
+
+class Bitset:
+    """Ensemble de bits indexé par numéro de ligne"""
+
+    def __init__(self):
+        self._octets = bytearray()
+
+    def get(self, ligne: int) -> bool:
+        octet = ligne >> 3
+        return octet < len(self._octets) and bool(self._octets[octet] & (1 << (ligne & 7)))
+
+    def set(self, ligne: int, valeur: bool):
+        octet = ligne >> 3
+        if octet >= len(self._octets):
+            self._octets.extend(bytes(octet + 1 - len(self._octets)))
+        if valeur:
+            self._octets[octet] |= 1 << (ligne & 7)
+        else:
+            self._octets[octet] &= ~(1 << (ligne & 7)) & 0xFF
+
+    def compter(self) -> int:
+        """Nombre de lignes à True"""
+        return _popcount(int.from_bytes(self._octets, 'little'))
+
+
+class Dictionnaire:
+    """Encodage par dictionnaire d'une colonne texte : valeur <-> code entier"""
+
+    def __init__(self):
+        self.valeurs: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encoder(self, valeur: str) -> int:
+        code = self.codes.get(valeur)
+        if code is None:
+            code = len(self.valeurs)
+            self.codes[valeur] = code
+            self.valeurs.append(valeur)
+        return code
+
+
+class StockColonnaire:
+    """
+    Colonnes: shop_id, nombre_tpe, ethernet, quatre_cinq_g, backoffice, modele_tpe, service
+    Une ligne par TPE ; la suppression déplace la dernière ligne dans le trou (O(1))
+    """
+
+    CHAMPS_GROUPES = ('modele_tpe', 'service')
+
+    def __init__(self):
+        self.vider()
+
+    def vider(self):
+        self.shop_id = array('q')
+        self.nombre_tpe = array('q')
+        self.ethernet = Bitset()
+        self.quatre_cinq_g = Bitset()
+        self.backoffice = Bitset()
+        self.dictionnaires = {champ: Dictionnaire() for champ in self.CHAMPS_GROUPES}
+        self.codes = {champ: array('l') for champ in self.CHAMPS_GROUPES}
+        self._lignes: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self.shop_id)
+
+    def ajouter(self, tpe):
+        """Ajoute une ligne pour le TPE"""
+        ligne = len(self.shop_id)
+        self._lignes[tpe.shop_id] = ligne
+        self.shop_id.append(tpe.shop_id)
+        self.nombre_tpe.append(tpe.nombre_tpe)
+        self.ethernet.set(ligne, tpe.type_tpe.ethernet)
+        self.quatre_cinq_g.set(ligne, tpe.type_tpe.quatre_cinq_g)
+        self.backoffice.set(ligne, tpe.acces_backoffice.actif)
+        for champ in self.CHAMPS_GROUPES:
+            self.codes[champ].append(self.dictionnaires[champ].encoder(getattr(tpe, champ)))
+
+    def retirer(self, shop_id: int):
+        """Retire la ligne du TPE en y déplaçant la dernière ligne"""
+        ligne = self._lignes.pop(shop_id)
+        derniere = len(self.shop_id) - 1
+        if ligne != derniere:
+            self._lignes[self.shop_id[derniere]] = ligne
+            self.shop_id[ligne] = self.shop_id[derniere]
+            self.nombre_tpe[ligne] = self.nombre_tpe[derniere]
+            for bits in (self.ethernet, self.quatre_cinq_g, self.backoffice):
+                bits.set(ligne, bits.get(derniere))
+            for colonne in self.codes.values():
+                colonne[ligne] = colonne[derniere]
+        self.shop_id.pop()
+        self.nombre_tpe.pop()
+        for bits in (self.ethernet, self.quatre_cinq_g, self.backoffice):
+            bits.set(derniere, False)
+        for colonne in self.codes.values():
+            colonne.pop()
+
+    def _somme(self, colonne: array) -> int:
+        if np is not None and len(colonne):
+            return int(np.frombuffer(colonne, dtype=np.int64).sum())
+        return sum(colonne)
+
+    def statistiques(self) -> dict:
+        """Mêmes clés que GestionnaireTPE.statistiques()"""
+        return {
+            'total_tpes': len(self.shop_id),
+            'total_appareils': self._somme(self.nombre_tpe),
+            'type_ethernet': self.ethernet.compter(),
+            'type_4_5g': self.quatre_cinq_g.compter(),
+            'backoffice_actifs': self.backoffice.compter()
+        }
+
+    def rapport_par(self, champ: str) -> Dict[str, dict]:
+        """Nombre d'entrées et d'appareils par valeur de 'modele_tpe' ou 'service'"""
+        if champ not in self.CHAMPS_GROUPES:
+            raise ValueError(f"Regroupement impossible sur: {champ}")
+        valeurs = self.dictionnaires[champ].valeurs
+        codes = self.codes[champ]
+
+        if np is not None and len(codes):
+            codes_np = np.frombuffer(codes, dtype=np.dtype(f"i{codes.itemsize}"))
+            entrees = np.bincount(codes_np, minlength=len(valeurs)).tolist()
+            appareils = np.bincount(
+                codes_np, weights=np.frombuffer(self.nombre_tpe, dtype=np.int64), minlength=len(valeurs)
+            ).astype(np.int64).tolist()
+        else:
+            compte = Counter(codes)
+            entrees = [compte.get(code, 0) for code in range(len(valeurs))]
+            appareils = [0] * len(valeurs)
+            for code, nombre in zip(codes, self.nombre_tpe):
+                appareils[code] += nombre
+
+        return {
+            valeur: {'entrees': entrees[code], 'appareils': appareils[code]}
+            for code, valeur in enumerate(valeurs)
+            if entrees[code]
+        }
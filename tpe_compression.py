@@ -0,0 +1,64 @@
+"""
+Compression des fichiers de sauvegarde
+gzip, bz2 et lzma (bibliothèque standard), zstd si le module zstandard est installé.
+En lecture, le codec est détecté d'après les premiers octets du fichier.
+"""
+
+import bz2
+import gzip
+import lzma
+from typing import IO, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd est optionnel
+    zstandard = None
+
+
+# Signature (premiers octets) -> codec
+SIGNATURES = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'lzma',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+
+_OUVERTURES = {
+    'gzip': lambda fichier, mode, encoding: gzip.open(fichier, mode, compresslevel=6, encoding=encoding),
+    'bz2': lambda fichier, mode, encoding: bz2.open(fichier, mode, encoding=encoding),
+    'lzma': lambda fichier, mode, encoding: lzma.open(fichier, mode, encoding=encoding),
+}
+if zstandard is not None:
+    _OUVERTURES['zstd'] = lambda fichier, mode, encoding: zstandard.open(fichier, mode, encoding=encoding)
+
+# Codecs utilisables dans cet environnement
+CODECS_DISPONIBLES = tuple(_OUVERTURES)
+
+
+def detecter(fichier: str) -> Optional[str]:
+    """Retourne le codec d'un fichier compressé, None s'il n'est pas compressé"""
+    with open(fichier, 'rb') as f:
+        debut = f.read(6)
+    for signature, codec in SIGNATURES.items():
+        if debut.startswith(signature):
+            return codec
+    return None
+
+
+def ouvrir(fichier: str, mode: str = 'rb', compression: Optional[str] = None,
+           encoding: Optional[str] = None) -> IO:
+    """
+    Ouvre un fichier de sauvegarde, compressé ou non
+    Écriture : compression parmi CODECS_DISPONIBLES (None = fichier brut)
+    Lecture : le codec est détecté, le paramètre compression est ignoré
+    Modes texte : 'rt' / 'wt' (avec encoding)
+    """
+    if 'r' in mode:
+        compression = detecter(fichier)
+    if compression is None:
+        return open(fichier, mode, encoding=encoding)
+    if compression not in _OUVERTURES:
+        if compression == 'zstd':
+            raise ValueError("Compression zstd indisponible (pip install zstandard)")
+        raise ValueError(f"Compression inconnue: {compression}")
+    return _OUVERTURES[compression](fichier, mode, encoding)
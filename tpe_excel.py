@@ -0,0 +1,289 @@
+"""
+Lecture et écriture de classeurs Excel en flux
+Feuilles openpyxl en écriture seule : chaque ligne est sérialisée dès son ajout,
+la mémoire ne dépend pas du nombre de lignes. Les largeurs de colonnes sont relevées
+pendant l'écriture puis inscrites dans le fichier enregistré (une feuille en écriture
+seule n'accepte plus de largeurs une fois la première ligne écrite).
+En lecture, les classeurs sont ouverts en lecture seule et parcourus ligne à ligne.
+Les exports partitionnés (une feuille par valeur) rendent chaque feuille dans un
+processus distinct puis réunissent les feuilles dans un seul classeur ; les lignes de
+chaque partition transitent par un fichier temporaire (LignesSurDisque) relu en flux.
+"""
+
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+
+
+# Largeur maximale d'une colonne (en caractères)
+LARGEUR_MAX = 50
+
+# Longueur maximale d'un nom de feuille et caractères refusés par Excel
+LONGUEUR_NOM_FEUILLE = 31
+_INTERDITS_FEUILLE = re.compile(r"[\[\]:*?/\\]")
+_INTERDITS_FICHIER = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def entetes(ws, titres: Sequence[str]) -> List[WriteOnlyCell]:
+    """Ligne d'en-tête mise en forme (fond bleu, texte blanc gras centré)"""
+    remplissage = PatternFill(start_color="0066CC", end_color="0066CC", fill_type="solid")
+    police = Font(bold=True, color="FFFFFF", size=12)
+    alignement = Alignment(horizontal="center", vertical="center")
+    cellules = []
+    for titre in titres:
+        cellule = WriteOnlyCell(ws, value=titre)
+        cellule.fill = remplissage
+        cellule.font = police
+        cellule.alignment = alignement
+        cellules.append(cellule)
+    return cellules
+
+
+def ecrire_feuille(ws, titres: Sequence[str], lignes: Iterable[Sequence]) -> List[int]:
+    """
+    Écrit l'en-tête puis les lignes dans une feuille en écriture seule
+    Retourne la plus grande longueur relevée dans chaque colonne (en-tête compris)
+    """
+    ws.append(entetes(ws, titres))
+    largeurs = [len(titre) for titre in titres]
+    for ligne in lignes:
+        ws.append(ligne)
+        largeurs = list(map(max, largeurs, [0 if valeur is None else len(str(valeur)) for valeur in ligne]))
+    return largeurs
+
+
+def _colonnes_xml(largeurs: Sequence[int]) -> bytes:
+    colonnes = "".join(
+        f'<col min="{indice}" max="{indice}" width="{min(largeur + 2, LARGEUR_MAX)}" customWidth="1"/>'
+        for indice, largeur in enumerate(largeurs, start=1)
+    )
+    return f"<cols>{colonnes}</cols>".encode('utf-8')
+
+
+def appliquer_largeurs(fichier: str, largeurs_par_feuille: Sequence[Optional[Sequence[int]]]):
+    """
+    Inscrit les largeurs de colonnes dans un classeur enregistré (feuilles dans l'ordre
+    de création, None = feuille inchangée) ; le contenu des feuilles est recopié en flux
+    """
+    feuilles = {f"xl/worksheets/sheet{indice}.xml": _colonnes_xml(largeurs)
+                for indice, largeurs in enumerate(largeurs_par_feuille, start=1) if largeurs}
+    temporaire = f"{fichier}.tmp"
+    with zipfile.ZipFile(fichier) as source, \
+            zipfile.ZipFile(temporaire, 'w', zipfile.ZIP_DEFLATED) as cible:
+        for info in source.infolist():
+            if info.filename not in feuilles:
+                cible.writestr(info, source.read(info))
+                continue
+            with source.open(info) as entree, cible.open(info, 'w', force_zip64=True) as sortie:
+                # <cols> se place juste avant <sheetData>, au début du fichier
+                debut = entree.read(1 << 16)
+                position = debut.index(b"<sheetData")
+                sortie.write(debut[:position] + feuilles[info.filename] + debut[position:])
+                shutil.copyfileobj(entree, sortie, 1 << 20)
+    os.replace(temporaire, fichier)
+
+
+def enregistrer_feuille(fichier: str, titre: str, titres: Sequence[str], lignes: Iterable[Sequence]):
+    """Enregistre un classeur d'une seule feuille écrite en flux, colonnes dimensionnées"""
+    enregistrer_classeur(fichier, [(titre, lignes)], titres)
+
+
+@contextmanager
+def lignes_classeur(fichier: str, feuille: Optional[str] = None):
+    """
+    Ouvre un classeur en lecture seule et fournit (en-tête, lignes)
+    Les lignes (numéro de ligne, valeurs) sont lues à la demande ; les lignes vides sont ignorées
+    feuille : nom de la feuille, par défaut la feuille active
+    """
+    wb = openpyxl.load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        ws = wb[feuille] if feuille else wb.active
+        lignes = ws.iter_rows(values_only=True)
+        entete = next(lignes, ())
+        yield entete, _non_vides(lignes)
+    finally:
+        wb.close()
+
+
+def _non_vides(lignes: Iterable[Sequence]) -> Iterator[Tuple[int, Sequence]]:
+    for numero, valeurs in enumerate(lignes, start=2):
+        if any(valeur is not None and valeur != "" for valeur in valeurs):
+            yield numero, valeurs
+
+
+def _nom_unique(nom: str, pris: Set[str], longueur: Optional[int] = None) -> str:
+    """Nom non encore pris (comparaison sans casse), suffixé « (2) », « (3) »... si besoin"""
+    nom = (nom.strip() or "Sans nom")[:longueur]
+    candidat, numero = nom, 1
+    while candidat.lower() in pris:
+        numero += 1
+        suffixe = f" ({numero})"
+        candidat = nom[:longueur - len(suffixe) if longueur else None] + suffixe
+    pris.add(candidat.lower())
+    return candidat
+
+
+def nom_feuille(valeur: str, pris: Set[str]) -> str:
+    """Nom de feuille valide et unique pour une valeur de partition"""
+    return _nom_unique(_INTERDITS_FEUILLE.sub("_", valeur), pris, LONGUEUR_NOM_FEUILLE)
+
+
+def nom_fichier_partition(valeur: str, pris: Set[str]) -> str:
+    """Fragment de nom de fichier valide et unique pour une valeur de partition"""
+    return _nom_unique(_INTERDITS_FICHIER.sub("_", valeur), pris)
+
+
+def coeurs_disponibles() -> int:
+    """Nombre de cœurs utilisables par ce processus"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def repartir(tailles: Sequence[int], nombre: int) -> List[List[int]]:
+    """
+    Répartit des groupes (indices) en au plus `nombre` lots de tailles proches :
+    chaque groupe, du plus gros au plus petit, rejoint le lot le moins chargé
+    """
+    lots = [[] for _ in range(min(nombre, len(tailles)))]
+    charges = [0] * len(lots)
+    for indice in sorted(range(len(tailles)), key=lambda i: tailles[i], reverse=True):
+        cible = charges.index(min(charges))
+        lots[cible].append(indice)
+        charges[cible] += tailles[indice]
+    return [lot for lot in lots if lot]
+
+
+def enregistrer_classeur(fichier: str, feuilles: Sequence[Tuple[str, Iterable[Sequence]]], titres: Sequence[str]):
+    """Enregistre un classeur d'une feuille par (titre, lignes), écrites en flux, colonnes dimensionnées"""
+    wb = openpyxl.Workbook(write_only=True)
+    largeurs = [ecrire_feuille(wb.create_sheet(titre), titres, lignes) for titre, lignes in feuilles]
+    wb.save(fichier)
+    appliquer_largeurs(fichier, largeurs)
+
+
+class LignesSurDisque:
+    """
+    Groupe de lignes écrit au fil du parcours dans un fichier temporaire (pickles successifs)
+    Transmis à un processus par son seul chemin et relu en flux : ni le processus principal
+    ni les processus du pool ne gardent le groupe en mémoire
+    """
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self.taille = 0
+        self._fichier = open(chemin, 'wb')
+
+    def ajouter(self, ligne: Sequence):
+        pickle.dump(ligne, self._fichier, protocol=pickle.HIGHEST_PROTOCOL)
+        self.taille += 1
+
+    def fermer(self):
+        if self._fichier is not None:
+            self._fichier.close()
+            self._fichier = None
+
+    def __len__(self) -> int:
+        return self.taille
+
+    def __iter__(self) -> Iterator[Sequence]:
+        with open(self.chemin, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def __getstate__(self) -> dict:
+        # Seuls le chemin et la taille sont transmis aux processus du pool
+        return {'chemin': self.chemin, 'taille': self.taille, '_fichier': None}
+
+
+def _en_parallele(fonction, taches: Sequence[tuple], processus: int):
+    """
+    Exécute fonction(*tache) pour chaque tâche, dans un pool de `processus` processus
+    Un pool inutilisable (processus arrêté, lancement impossible) lève BrokenProcessPool
+    """
+    if processus <= 1 or len(taches) <= 1:
+        for tache in taches:
+            fonction(*tache)
+        return
+    with ProcessPoolExecutor(min(processus, len(taches))) as pool:
+        for resultat in [pool.submit(fonction, *tache) for tache in taches]:
+            resultat.result()
+
+
+def enregistrer_partitions(fichier: str, titres_feuilles: Sequence[str], titres: Sequence[str],
+                           groupes: Sequence[Sequence[Sequence]], processus: Optional[int] = None):
+    """
+    Enregistre un classeur d'une feuille par groupe de lignes
+    Les groupes sont répartis en lots équilibrés, un par processus ; chaque processus écrit
+    ses feuilles dans un classeur intermédiaire, puis les feuilles sont réunies dans l'ordre
+    processus : taille du pool, par défaut le nombre de cœurs disponibles
+    """
+    lots = repartir([len(groupe) for groupe in groupes], processus or coeurs_disponibles())
+    dossier = tempfile.mkdtemp(prefix="tpe_export_", dir=os.path.dirname(os.path.abspath(fichier)))
+    try:
+        parties = [os.path.join(dossier, f"{numero}.xlsx") for numero in range(len(lots))]
+        _en_parallele(enregistrer_classeur, [
+            (partie, [(titres_feuilles[indice], groupes[indice]) for indice in lot], titres)
+            for partie, lot in zip(parties, lots)
+        ], len(lots))
+        sources = [None] * len(groupes)
+        for partie, lot in zip(parties, lots):
+            for rang, indice in enumerate(lot, start=1):
+                sources[indice] = (partie, f"xl/worksheets/sheet{rang}.xml")
+        assembler_classeurs(fichier, titres_feuilles, sources)
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+def enregistrer_fichiers(fichiers: Sequence[str], titres_feuilles: Sequence[str], titres: Sequence[str],
+                         groupes: Sequence[Sequence[Sequence]], processus: Optional[int] = None):
+    """
+    Enregistre chaque groupe de lignes dans son propre classeur, en parallèle dans un pool
+    de processus ; les plus gros groupes partent en premier
+    """
+    ordre = sorted(range(len(fichiers)), key=lambda indice: len(groupes[indice]), reverse=True)
+    _en_parallele(enregistrer_classeur, [
+        (fichiers[indice], [(titres_feuilles[indice], groupes[indice])], titres) for indice in ordre
+    ], processus or coeurs_disponibles())
+
+
+def assembler_classeurs(fichier: str, titres_feuilles: Sequence[str], sources: Sequence[Tuple[str, str]]):
+    """
+    Réunit des feuilles écrites par enregistrer_classeur (mêmes styles, chaînes en ligne) :
+    la feuille i du classeur final reprend sources[i] = (classeur, membre XML de la feuille)
+    Le squelette (classeur, relations, types de contenu) est produit par openpyxl,
+    le contenu des feuilles est recopié en flux
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    for titre in titres_feuilles:
+        wb.create_sheet(titre)
+    wb.save(fichier)
+
+    remplacements = {f"xl/worksheets/sheet{indice}.xml": source
+                     for indice, source in enumerate(sources, start=1)}
+    remplacements["xl/styles.xml"] = (sources[0][0], "xl/styles.xml")
+    temporaire = f"{fichier}.tmp"
+    with zipfile.ZipFile(fichier) as squelette, \
+            zipfile.ZipFile(temporaire, 'w', zipfile.ZIP_DEFLATED) as cible:
+        for info in squelette.infolist():
+            if info.filename not in remplacements:
+                cible.writestr(info, squelette.read(info))
+                continue
+            partie, membre = remplacements[info.filename]
+            with zipfile.ZipFile(partie) as source, source.open(membre) as entree, \
+                    cible.open(info, 'w', force_zip64=True) as sortie:
+                shutil.copyfileobj(entree, sortie, 1 << 20)
+    os.replace(temporaire, fichier)
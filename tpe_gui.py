@@ -11,7 +11,11 @@ from tpe_manager import (
     TypeTPE, ConfigurationReseau, CarteCommercant
 )
 from auth_manager import AuthManager
+from tpe_sauvegarde_auto import SauvegardeAutomatique
+import json
 import os
+import queue
+from itertools import islice
 
 
 class TPEInterface:
@@ -23,6 +27,21 @@ class TPEInterface:
         "Ingenico Move 5000"
     ]
     
+    # Opérations journalisées au-delà desquelles la sauvegarde complète est réécrite
+    SEUIL_CHECKPOINT = 500
+    
+    # Backup NDJSON en flux (tpe_backup.ndjson) écrit en plus de tpe_backup.json (sur demande)
+    BACKUP_NDJSON = False
+    
+    # Codec de tpe_data.pkl ('gzip', 'bz2', 'lzma', 'zstd') ; None = sauvegarde indexée non compressée
+    COMPRESSION_SAUVEGARDE = None
+    
+    # Délai (secondes) de regroupement des modifications avant sauvegarde automatique
+    DELAI_SAUVEGARDE_AUTO = 2.0
+    
+    # Nombre de lignes ajoutées à la liste par passage de la boucle Tk
+    TAILLE_PAQUET_LISTE = 500
+    
     # Palette de couleurs centralisée
     COULEURS = {
         "primaire": "#0066CC",
@@ -59,7 +78,24 @@ class TPEInterface:
         self.fullscreen = False
         
         # Gestionnaire TPE
-        self.gestionnaire = GestionnaireTPE()
+        self.gestionnaire = GestionnaireTPE(index_secondaires=True)
+        # Chaque modification est ajoutée au journal au lieu de réécrire toute la base
+        self.gestionnaire.activer_journal()
+        # Sauvegarde indexée : au démarrage seul l'index est lu, les TPE sont construits à la demande
+        self.gestionnaire.sauvegarde_indexee = True
+        # Une sauvegarde compressée est relue entièrement au démarrage (pas de restauration différée)
+        self.gestionnaire.compression_sauvegarde = self.COMPRESSION_SAUVEGARDE
+        self._remplissage = None
+        
+        # Sauvegarde complète (checkpoint + backup) dans un thread, hors de la boucle Tk,
+        # seulement quand le journal dépasse SEUIL_CHECKPOINT et à la fermeture
+        self._erreurs_sauvegarde = queue.Queue()
+        self.sauvegarde_auto = SauvegardeAutomatique(
+            self._ecrire_sauvegardes,
+            delai=self.DELAI_SAUVEGARDE_AUTO,
+            en_erreur=self._erreurs_sauvegarde.put
+        )
+        self.root.protocol("WM_DELETE_WINDOW", self.quitter)
         
         # Liste pour stocker les champs de cartes (avec numéro de série)
         self.cartes_entries = []
@@ -74,10 +110,18 @@ class TPEInterface:
         self.creer_interface()
         
         # Charger les données existantes si disponibles
-        if os.path.exists("tpe_data.pkl"):
+        if os.path.exists("tpe_data.pkl") or self.gestionnaire.taille_journal():
             try:
                 self.gestionnaire.restaurer()
                 self.rafraichir_liste()
+                if self.gestionnaire.rejeu_en_echec:
+                    details = "\n".join(f"Ligne {numero} ({operation}): {motif}"
+                                        for numero, operation, motif in self.gestionnaire.rejeu_en_echec[:10])
+                    messagebox.showwarning(
+                        "Attention",
+                        f"{len(self.gestionnaire.rejeu_en_echec)} opération(s) du journal "
+                        f"n'ont pas pu être rejouées :\n\n{details}"
+                    )
             except Exception as e:
                 messagebox.showwarning(
                     "Attention",
@@ -87,6 +131,8 @@ class TPEInterface:
                 )
         else:
             self.rafraichir_liste()
+        
+        self._verifier_sauvegarde_auto()
     
     def toggle_fullscreen(self):
         """Bascule en mode plein écran"""
@@ -210,11 +256,15 @@ class TPEInterface:
         menu_fichier = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Fichier", menu=menu_fichier)
         menu_fichier.add_command(label="📊 Export Excel", command=self.exporter_excel)
+        menu_fichier.add_command(label="📊 Export Excel par service",
+                                 command=lambda: self.exporter_excel(partition="service"))
         menu_fichier.add_command(label="💾 Sauvegarder", command=self.sauvegarder)
         menu_fichier.add_command(label="📂 Restaurer", command=self.restaurer)
+        menu_fichier.add_command(label="📥 Importer un lot (JSON)", command=self.importer_lot)
+        menu_fichier.add_command(label="📥 Importer Excel", command=self.importer_excel)
         menu_fichier.add_separator()
         menu_fichier.add_command(label="🚪 Déconnexion", command=self.deconnexion)
-        menu_fichier.add_command(label="❌ Quitter", command=self.root.quit)
+        menu_fichier.add_command(label="❌ Quitter", command=self.quitter)
         
         # Menu Utilisateur (seulement pour admin)
         if self.auth_manager.est_admin():
@@ -322,20 +372,30 @@ class TPEInterface:
     def filtrer_tpe_liste(self, *args):
         """Filtre la liste par type de TPE (Move/Desk) et recherche textuelle multi-champs"""
         filtre = self.filtre_var.get()
-        recherche = self.search_var.get().strip().lower()
+        recherche_brute = self.search_var.get().strip()
+        recherche = recherche_brute.lower()
+        
+        # Correspondance exacte sur une carte ou un numéro de série (index inverses)
+        par_numero = set()
+        if recherche_brute:
+            par_numero = {
+                t.shop_id for t in
+                self.gestionnaire.rechercher_par_carte(recherche_brute)
+                + self.gestionnaire.rechercher_par_numero_serie(recherche_brute)
+            }
         
         for item in self.tree.get_children():
             self.tree.delete(item)
+        self._remplissage = None  # interrompt un remplissage progressif en cours
         
-        for tpe in self.gestionnaire.lister_tpes():
-            modele = tpe.modele_tpe
-            # Filtre par type
-            if filtre != "Tous":
-                if filtre == "Move" and "Move" not in modele:
-                    continue
-                if filtre == "Desk" and "Desk" not in modele:
-                    continue
-            
+        # Filtre par type via l'index des modèles (sans parcourir toute la flotte)
+        if filtre != "Tous":
+            modeles = [m for m in self.gestionnaire.valeurs_indexees('modele_tpe') if filtre in m]
+            tpes = self.gestionnaire.rechercher_par(modele_tpe=modeles)
+        else:
+            tpes = self.gestionnaire.lister_tpes()
+        
+        for tpe in tpes:
             # Filtre textuel multi-champs
             if recherche:
                 champs_recherche = [
@@ -344,7 +404,7 @@ class TPEInterface:
                     f"{tpe.regisseur.prenom} {tpe.regisseur.nom}".lower(),
                     tpe.modele_tpe.lower()
                 ]
-                if not any(recherche in champ for champ in champs_recherche):
+                if not any(recherche in champ for champ in champs_recherche) and tpe.shop_id not in par_numero:
                     continue
             
             type_connexion = []
@@ -796,6 +856,9 @@ class TPEInterface:
                 self.rafraichir_liste()
                 self.vider_formulaire()
                 self.sauvegarder_auto()
+            else:
+                self.set_status(f"❌ Erreur lors de l'ajout du TPE", duree=7000)
+                messagebox.showerror("Erreur", f"Erreur lors de l'ajout du TPE:\n{self.gestionnaire.derniere_erreur}")
             
         except Exception as e:
             self.set_status(f"❌ Erreur lors de l'ajout du TPE", duree=7000)
@@ -865,6 +928,10 @@ class TPEInterface:
                 self.rafraichir_liste()
                 self.vider_formulaire()
                 self.sauvegarder_auto()
+            else:
+                self.set_status(f"❌ Erreur lors de la modification du TPE", duree=7000)
+                messagebox.showerror("Erreur",
+                                     f"Erreur lors de la modification du TPE:\n{self.gestionnaire.derniere_erreur}")
             
         except Exception as e:
             self.set_status(f"❌ Erreur lors de la modification du TPE", duree=7000)
@@ -984,7 +1051,27 @@ class TPEInterface:
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        for tpe in self.gestionnaire.lister_tpes():
+        # Remplissage par paquets : la fenêtre reste réactive et les TPE
+        # d'une restauration différée ne sont construits qu'au fil de l'affichage
+        self._remplissage = self.gestionnaire.iterer_tpes()
+        self._remplir_liste(self._remplissage)
+        
+        stats = self.gestionnaire.statistiques()
+        self.stats_label.config(
+            text=f"📊 Total entrées: {stats['total_tpes']} | "
+                 f"Total appareils: {stats.get('total_appareils', stats['total_tpes'])} | "
+                 f"Ethernet: {stats['type_ethernet']} | "
+                 f"4/5G: {stats['type_4_5g']} | "
+                 f"Backoffice: {stats['backoffice_actifs']}"
+        )
+    
+    def _remplir_liste(self, tpes):
+        """Ajoute un paquet de TPE à la liste puis planifie le suivant"""
+        if tpes is not self._remplissage:
+            return  # remplacé par un rafraîchissement plus récent
+        
+        paquet = list(islice(tpes, self.TAILLE_PAQUET_LISTE))
+        for tpe in paquet:
             type_connexion = []
             if tpe.type_tpe.ethernet:
                 type_connexion.append("Ethernet")
@@ -1004,17 +1091,11 @@ class TPEInterface:
                 cartes_str
             ))
         
-        stats = self.gestionnaire.statistiques()
-        self.stats_label.config(
-            text=f"📊 Total entrées: {stats['total_tpes']} | "
-                 f"Total appareils: {stats.get('total_appareils', stats['total_tpes'])} | "
-                 f"Ethernet: {stats['type_ethernet']} | "
-                 f"4/5G: {stats['type_4_5g']} | "
-                 f"Backoffice: {stats['backoffice_actifs']}"
-        )
+        if len(paquet) == self.TAILLE_PAQUET_LISTE:
+            self.root.after(1, self._remplir_liste, tpes)
     
-    def exporter_excel(self):
-        """Exporte les TPE en Excel"""
+    def exporter_excel(self, partition=None):
+        """Exporte les TPE en Excel (partition : une feuille par service ou par modèle)"""
         fichier = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
             filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
@@ -1022,7 +1103,14 @@ class TPEInterface:
         )
         
         if fichier:
-            if self.gestionnaire.exporter_excel(fichier):
+            try:
+                succes = self.gestionnaire.exporter_excel(fichier, partition=partition)
+            except Exception as e:
+                # Pool de processus inutilisable (export partitionné)
+                messagebox.showerror("Erreur", f"Export Excel interrompu:\n{str(e)}")
+                self.set_status(f"❌ Export Excel interrompu", duree=7000)
+                return
+            if succes:
                 messagebox.showinfo("Succès", f"Export Excel réussi !\nFichier: {fichier}")
                 self.set_status(f"✅ Export Excel réussi : {fichier}")
             else:
@@ -1031,8 +1119,8 @@ class TPEInterface:
     
     def sauvegarder(self):
         """Sauvegarde les données"""
-        if self.gestionnaire.sauvegarder():
-            self.gestionnaire.backup_json()
+        if self.gestionnaire.checkpoint():
+            self._ecrire_backup()
             messagebox.showinfo("Succès", "Sauvegarde réussie !")
             self.set_status("✅ Sauvegarde effectuée avec succès")
         else:
@@ -1040,21 +1128,65 @@ class TPEInterface:
             self.set_status("❌ Erreur lors de la sauvegarde", duree=7000)
     
     def sauvegarder_auto(self):
-        """Sauvegarde automatique après chaque action"""
-        self.gestionnaire.sauvegarder()
-        self.gestionnaire.backup_json()
+        """Sauvegarde automatique après chaque action (regroupée, en arrière-plan)"""
+        # L'action est déjà dans le journal : réécriture complète seulement au-delà du seuil,
+        # dans le thread de sauvegarde
+        if self.gestionnaire.journal_actif and self.gestionnaire.taille_journal() < self.SEUIL_CHECKPOINT:
+            return
+        self.sauvegarde_auto.marquer_modifie()
+    
+    def _ecrire_sauvegardes(self):
+        """Écriture exécutée par le thread de sauvegarde automatique"""
+        return self.gestionnaire.checkpoint() and self._ecrire_backup()
+    
+    def _ecrire_backup(self) -> bool:
+        """tpe_backup.json (nom repris par les utilisateurs et les scripts), plus tpe_backup.ndjson si BACKUP_NDJSON"""
+        if self.BACKUP_NDJSON and not self.gestionnaire.backup_ndjson():
+            return False
+        return self.gestionnaire.backup_json()
+    
+    def _verifier_sauvegarde_auto(self):
+        """Relaye dans la barre de statut les erreurs du thread de sauvegarde"""
+        try:
+            while True:
+                self.set_status(f"❌ {self._erreurs_sauvegarde.get_nowait()}", duree=7000)
+        except queue.Empty:
+            pass
+        self.root.after(500, self._verifier_sauvegarde_auto)
+    
+    def _vider_sauvegarde_auto(self):
+        """Intègre le journal à la sauvegarde complète avant de fermer la fenêtre"""
+        if self.gestionnaire.taille_journal():
+            self.sauvegarde_auto.marquer_modifie()
+        if self.sauvegarde_auto.arreter():
+            return
+        self.set_status("❌ Échec de la sauvegarde automatique", duree=0)
+        messagebox.showwarning(
+            "Attention",
+            "La dernière sauvegarde a échoué.\n"
+            "Les modifications restent dans le journal et seront rechargées au prochain démarrage."
+        )
+    
+    def quitter(self):
+        """Ferme l'application après la dernière sauvegarde"""
+        self._vider_sauvegarde_auto()
+        self.gestionnaire.fermer()
+        self.root.quit()
     
     def restaurer(self):
         """Restaure les données depuis un fichier"""
         fichier = filedialog.askopenfilename(
-            filetypes=[("Pickle files", "*.pkl"), ("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("Pickle files", "*.pkl"), ("JSON files", "*.ndjson *.json"), ("All files", "*.*")]
         )
         
         if fichier:
-            if fichier.endswith('.json'):
-                succes = self.gestionnaire.restaurer_json(fichier)
+            if fichier.endswith(('.json', '.ndjson')):
+                # Lecture en flux ; l'ancien format tpe_backup.json est aussi accepté
+                succes = self.gestionnaire.restaurer_ndjson(fichier)
             else:
-                succes = self.gestionnaire.restaurer(fichier)
+                # Fichier choisi par l'utilisateur : validation complète (la restauration
+                # de confiance est réservée à la sauvegarde de l'application, au démarrage)
+                succes = self.gestionnaire.restaurer(fichier, valider=True)
             
             if succes:
                 messagebox.showinfo("Succès", "Restauration réussie !")
@@ -1063,6 +1195,65 @@ class TPEInterface:
             else:
                 messagebox.showerror("Erreur", "Erreur lors de la restauration")
     
+    def importer_lot(self):
+        """Importe un lot de TPE depuis un fichier JSON (une seule sauvegarde)"""
+        fichier = filedialog.askopenfilename(
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not fichier:
+            return
+        
+        try:
+            with open(fichier, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Liste de TPE ou fichier au format backup ({'tpes': [...]}) : anciennes versions migrées
+            # dans les deux cas (pour une liste, par ajouter_tpes_lot)
+            lignes = GestionnaireTPE.tpes_de_sauvegarde(data) if isinstance(data, dict) else data
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Fichier illisible:\n{str(e)}")
+            return
+        
+        rapport = self.gestionnaire.ajouter_tpes_lot(lignes, tout_ou_rien=True)
+        if rapport.succes:
+            self.rafraichir_liste()
+            self.sauvegarder_auto()
+            messagebox.showinfo("Succès", f"{len(rapport.ajoutes)} TPE importés avec succès !")
+            self.set_status(f"✅ {len(rapport.ajoutes)} TPE importés")
+        else:
+            details = "\n".join(f"Ligne {indice + 1}: {message}" for indice, message in rapport.erreurs[:10])
+            if len(rapport.erreurs) > 10:
+                details += f"\n... et {len(rapport.erreurs) - 10} autre(s) erreur(s)"
+            self.set_status(f"❌ Import annulé : {len(rapport.erreurs)} ligne(s) en erreur", duree=7000)
+            messagebox.showerror("Import annulé", f"Aucun TPE importé.\n\n{details}")
+    
+    def importer_excel(self):
+        """Importe des TPE depuis un classeur au format de l'export Excel"""
+        fichier = filedialog.askopenfilename(
+            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+        )
+        if not fichier:
+            return
+        
+        fichier_erreurs = f"{os.path.splitext(fichier)[0]}_erreurs.xlsx"
+        try:
+            rapport = self.gestionnaire.importer_excel(fichier, tout_ou_rien=True, fichier_erreurs=fichier_erreurs)
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Classeur illisible:\n{str(e)}")
+            return
+        
+        if rapport.succes:
+            self.rafraichir_liste()
+            self.sauvegarder_auto()
+            messagebox.showinfo("Succès", f"{len(rapport.ajoutes)} TPE importés avec succès !")
+            self.set_status(f"✅ {len(rapport.ajoutes)} TPE importés")
+        else:
+            details = "\n".join(f"Ligne {numero}: {message}" for numero, message in rapport.erreurs[:10])
+            if len(rapport.erreurs) > 10:
+                details += f"\n... et {len(rapport.erreurs) - 10} autre(s) erreur(s)"
+            self.set_status(f"❌ Import annulé : {len(rapport.erreurs)} ligne(s) en erreur", duree=7000)
+            messagebox.showerror("Import annulé",
+                                 f"Aucun TPE importé.\n\n{details}\n\nLignes refusées : {fichier_erreurs}")
+    
     def afficher_statistiques(self):
         """Affiche les statistiques détaillées"""
         stats = self.gestionnaire.statistiques()
@@ -1092,6 +1283,9 @@ Accès Backoffice actifs: {stats['backoffice_actifs']}
             "Voulez-vous vraiment vous déconnecter ?"
         )
         if reponse:
+            self._vider_sauvegarde_auto()
+            # Journal et sauvegarde source libérés avant que la session suivante ne les rouvre
+            self.gestionnaire.fermer()
             self.auth_manager.deconnecter()
             self._demande_reconnexion = True
             self.root.quit()
@@ -0,0 +1,177 @@
+"""
+Historique des sauvegardes dédupliqué par contenu
+Chaque TPE est stocké une seule fois sous l'empreinte de son contenu ; une sauvegarde
+n'écrit que les TPE modifiés, les pages qui les référencent et un manifeste.
+Toute sauvegarde passée se restaure à partir de son manifeste.
+
+Organisation du dossier :
+    objets/ab/cdef...     TPE (JSON) et pages (liste d'empreintes de TPE)
+    manifestes/<nom>.json en-tête + liste des pages, dans l'ordre des TPE
+
+Les pages sont découpées d'après le contenu (fin de page quand l'empreinte d'un TPE
+tombe sur un multiple de TAILLE_PAGE) : un ajout ou une suppression ne modifie que
+la page concernée, pas toutes les suivantes.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+
+# Marqueur des manifestes
+FORMAT_HISTORIQUE = "tpe-historique"
+
+# Nombre moyen de TPE par page
+TAILLE_PAGE = 64
+
+
+def empreinte(contenu: bytes) -> str:
+    """Empreinte BLAKE2b (128 bits) servant d'adresse à un objet"""
+    return hashlib.blake2b(contenu, digest_size=16).hexdigest()
+
+
+def _encoder(valeur) -> bytes:
+    """Sérialisation canonique : même contenu, mêmes octets, même empreinte"""
+    return json.dumps(valeur, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class HistoriqueSauvegardes:
+    """Magasin d'objets adressés par contenu + manifestes de sauvegarde"""
+
+    def __init__(self, dossier: str = "tpe_historique"):
+        self.dossier = Path(dossier)
+        self._objets = self.dossier / "objets"
+        self._manifestes = self.dossier / "manifestes"
+        self._connus: Optional[Set[str]] = None  # Empreintes présentes (chargées au premier usage)
+
+    def _chemin(self, cle: str) -> Path:
+        return self._objets / cle[:2] / cle[2:]
+
+    def _objets_connus(self) -> Set[str]:
+        if self._connus is None:
+            self._connus = set()
+            if self._objets.exists():
+                for sous_dossier in os.scandir(self._objets):
+                    self._connus.update(sous_dossier.name + entree.name
+                                        for entree in os.scandir(sous_dossier.path)
+                                        if not entree.name.endswith('.tmp'))
+        return self._connus
+
+    def _stocker(self, contenu: bytes) -> Tuple[str, bool]:
+        """Écrit un objet s'il est absent ; retourne (empreinte, écrit)"""
+        cle = empreinte(contenu)
+        connus = self._objets_connus()
+        if cle in connus:
+            return cle, False
+        chemin = self._chemin(cle)
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        temporaire = chemin.with_name(chemin.name + '.tmp')
+        temporaire.write_bytes(contenu)
+        os.replace(temporaire, chemin)
+        connus.add(cle)
+        return cle, True
+
+    def _lire(self, cle: str):
+        """Relit un objet en vérifiant que son contenu correspond à son empreinte"""
+        contenu = self._chemin(cle).read_bytes()
+        if empreinte(contenu) != cle:
+            raise ValueError(f"Objet corrompu dans l'historique: {cle}")
+        return json.loads(contenu)
+
+    def ecrire(self, tpes: Iterable[dict], prochain_shop_id: int, entete: Optional[dict] = None) -> dict:
+        """
+        Enregistre une sauvegarde (dictionnaires de TPE dans l'ordre) et son manifeste
+        Retourne le manifeste, avec son nom et le nombre d'objets réellement écrits
+        """
+        pages, page = [], []
+        nombre = ecrits = 0
+        for tpe_dict in tpes:
+            cle, ecrit = self._stocker(_encoder(tpe_dict))
+            ecrits += ecrit
+            nombre += 1
+            page.append(cle)
+            if int(cle[:8], 16) % TAILLE_PAGE == 0:
+                pages.append(page)
+                page = []
+        if page:
+            pages.append(page)
+
+        cles_pages = []
+        for page in pages:
+            cle, ecrit = self._stocker(_encoder(page))
+            ecrits += ecrit
+            cles_pages.append(cle)
+
+        maintenant = datetime.now()
+        manifeste = {
+            'format': FORMAT_HISTORIQUE,
+            **(entete or {}),
+            'date_backup': maintenant.strftime("%Y-%m-%d %H:%M:%S"),
+            'prochain_shop_id': prochain_shop_id,
+            'nombre_tpes': nombre,
+            'pages': cles_pages
+        }
+        self._manifestes.mkdir(parents=True, exist_ok=True)
+        nom = base = maintenant.strftime("%Y%m%d-%H%M%S")
+        suffixe = 1
+        while (self._manifestes / f"{nom}.json").exists():
+            suffixe += 1
+            nom = f"{base}-{suffixe}"
+        temporaire = self._manifestes / f"{nom}.json.tmp"
+        temporaire.write_text(json.dumps(manifeste, ensure_ascii=False), encoding='utf-8')
+        os.replace(temporaire, self._manifestes / f"{nom}.json")
+        return {**manifeste, 'nom': nom, 'objets_ecrits': ecrits}
+
+    def manifestes(self) -> List[str]:
+        """Noms des sauvegardes, de la plus ancienne à la plus récente"""
+        if not self._manifestes.exists():
+            return []
+        return sorted(chemin.stem for chemin in self._manifestes.glob("*.json"))
+
+    def manifeste(self, nom: Optional[str] = None) -> dict:
+        """Manifeste d'une sauvegarde (par défaut la plus récente)"""
+        if nom is None:
+            noms = self.manifestes()
+            if not noms:
+                raise FileNotFoundError(f"Aucune sauvegarde dans {self.dossier}")
+            nom = noms[-1]
+        manifeste = json.loads((self._manifestes / f"{nom}.json").read_text(encoding='utf-8'))
+        if manifeste.get('format') != FORMAT_HISTORIQUE:
+            raise ValueError(f"Manifeste invalide: {nom}")
+        return manifeste
+
+    def tpes(self, manifeste: dict) -> Iterator[dict]:
+        """Dictionnaires de TPE d'une sauvegarde, dans l'ordre, relus page par page"""
+        for cle_page in manifeste['pages']:
+            for cle in self._lire(cle_page):
+                yield self._lire(cle)
+
+    def elaguer(self, garder: int) -> int:
+        """
+        Ne conserve que les `garder` sauvegardes les plus récentes et supprime
+        les objets qu'elles ne référencent plus ; retourne le nombre d'objets supprimés
+        """
+        noms = self.manifestes()
+        for nom in noms[:max(len(noms) - garder, 0)]:
+            (self._manifestes / f"{nom}.json").unlink()
+
+        atteints = set()
+        for nom in self.manifestes():
+            for cle_page in self.manifeste(nom)['pages']:
+                if cle_page not in atteints:
+                    atteints.add(cle_page)
+                    atteints.update(self._lire(cle_page))
+
+        supprimes = 0
+        for cle in list(self._objets_connus() - atteints):
+            self._chemin(cle).unlink()
+            self._connus.discard(cle)
+            supprimes += 1
+        return supprimes
+
+    def taille(self) -> int:
+        """Octets occupés par les objets et les manifestes"""
+        return sum(chemin.stat().st_size for chemin in self.dossier.rglob("*") if chemin.is_file())
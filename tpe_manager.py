@@ -4,18 +4,97 @@ Auteur: Spécialiste Python
 Date: 2026-02-13 - Version 1.5 - Numéro de série TPE
 """
 
+import gc
+import csv
+import hashlib
 import json
+import os
 import pickle
+import struct
+import sys
+import tempfile
+import threading
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment
-from dataclasses import dataclass, asdict
-from typing import List, Optional
+from dataclasses import dataclass, asdict, field
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from datetime import datetime
+from functools import wraps
 import re
+import shutil
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+from ipaddress import ip_network
 from pathlib import Path
+from array import array
+from tpe_colonnes import StockColonnaire
+from tpe_arrow import TAILLE_LOT, ecrire_colonnes
+from tpe_compression import detecter, ouvrir
+from tpe_excel import (
+    LignesSurDisque, appliquer_largeurs, ecrire_feuille, enregistrer_feuille, enregistrer_fichiers,
+    enregistrer_partitions, lignes_classeur, nom_feuille, nom_fichier_partition
+)
+from tpe_historique import HistoriqueSauvegardes
+from tpe_migration import VERSION_COURANTE, etapes, migrer, migrer_enregistrements, migrer_tpes
 
 
-@dataclass
+# Champs à faible cardinalité : chaînes internées en mémoire, table + codes entiers dans les sauvegardes
+CHAMPS_DICTIONNAIRE = ('service', 'modele_tpe')
+
+# Marqueur de l'en-tête des sauvegardes NDJSON (une ligne d'en-tête puis un TPE par ligne)
+FORMAT_NDJSON = "tpe-ndjson"
+
+# Nombre maximal de TPE par ligne 'lot' du journal (un gros lot s'écrit en plusieurs lignes)
+TAILLE_LOT_JOURNAL = 1000
+
+# Signature des sauvegardes indexées (restauration différée)
+SIGNATURE_INDEXEE = b"TPEIDX1\n"
+
+# Version du schéma des classes TPE (champs et règles de validation) ; à incrémenter à chaque
+# changement, pour que les anciens instantanés repassent par la validation complète
+SCHEMA_TPE = 1
+
+# Classes de données compactes : __slots__ (pas de __dict__ par instance) si Python >= 3.10
+_COMPACTE = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+def _sous_verrou(nom_verrou: str):
+    """Exécute la méthode en tenant le verrou nommé du gestionnaire"""
+    def decorateur(methode):
+        @wraps(methode)
+        def enveloppe(self, *args, **kwargs):
+            with getattr(self, nom_verrou):
+                return methode(self, *args, **kwargs)
+        return enveloppe
+    return decorateur
+
+
+# Instanciation sans __init__ ni __post_init__ (données déjà validées)
+_nouveau = object.__new__
+
+
+@contextmanager
+def _sans_ramasse_miettes():
+    """
+    Suspend le ramasse-miettes cyclique pendant une construction massive d'objets
+    (sinon déclenché des dizaines de fois pour des objets qui restent tous vivants)
+    """
+    actif = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if actif:
+            gc.enable()
+
+
+def _somme_controle(charge: bytes) -> str:
+    """Empreinte BLAKE2b (128 bits) de la charge sérialisée d'un instantané"""
+    return hashlib.blake2b(charge, digest_size=16).hexdigest()
+
+
+@dataclass(**_COMPACTE)
 class Regisseur:
     """Classe pour gérer les informations du régisseur"""
     prenom: str
@@ -37,7 +116,7 @@ class Regisseur:
         return cls(**data)
 
 
-@dataclass
+@dataclass(**_COMPACTE)
 class ConfigurationReseau:
     """Classe pour la configuration réseau (si Ethernet sélectionné)"""
     adresse_ip: str
@@ -75,7 +154,7 @@ class ConfigurationReseau:
         return cls(**data)
 
 
-@dataclass
+@dataclass(**_COMPACTE)
 class AccesBackoffice:
     """Classe pour gérer l'accès backoffice"""
     actif: bool
@@ -102,7 +181,7 @@ class AccesBackoffice:
         return cls(**data)
 
 
-@dataclass
+@dataclass(**_COMPACTE)
 class TypeTPE:
     """Classe pour gérer le type de TPE"""
     ethernet: bool = False
@@ -130,7 +209,7 @@ class TypeTPE:
         )
 
 
-@dataclass
+@dataclass(**_COMPACTE)
 class CarteCommercant:
     """Classe pour gérer une carte commerçant avec son numéro de série TPE"""
     numero: str  # Numéro de carte (alphanumérique)
@@ -144,17 +223,18 @@ class CarteCommercant:
     
     @classmethod
     def from_dict(cls, data):
-        # Si c'est juste un string ou int (ancienne version), le convertir
-        if isinstance(data, str) or isinstance(data, int):
-            return cls(numero=str(data), numero_serie_tpe=None)
-        # Sinon c'est un dict complet
+        # Format courant uniquement : les anciens formats sont migrés par tpe_migration
+        try:
+            numero = data.get('numero', '')
+        except AttributeError:
+            raise ValueError(f"Carte commerçant au format antérieur à 1.5: {data!r}") from None
         return cls(
-            numero=str(data.get('numero', '')),
+            numero=str(numero),
             numero_serie_tpe=data.get('numero_serie_tpe')
         )
 
 
-@dataclass
+@dataclass(**_COMPACTE)
 class TPE:
     """Classe principale représentant un Terminal de Paiement Électronique"""
     service: str
@@ -172,6 +252,12 @@ class TPE:
         if self.date_creation is None:
             self.date_creation = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
+        # Champs à faible cardinalité : une seule copie de chaque valeur en mémoire
+        for champ in CHAMPS_DICTIONNAIRE:
+            valeur = getattr(self, champ)
+            if isinstance(valeur, str):
+                setattr(self, champ, sys.intern(valeur))
+        
         # Validation des cartes commerçant
         if not self.cartes_commercant or len(self.cartes_commercant) == 0:
             raise ValueError("Au moins une carte commerçant est requise")
@@ -209,25 +295,15 @@ class TPE:
     
     @classmethod
     def from_dict(cls, data):
-        """Crée un TPE à partir d'un dictionnaire"""
-        # Compatibilité avec anciennes versions
-        cartes_data = data.get('cartes_commercant')
-        if cartes_data is None:
-            # Ancienne version avec carte_commercant unique
-            carte_unique = data.get('carte_commercant')
-            if carte_unique is not None:
-                cartes_data = [carte_unique]
-            else:
-                cartes_data = []
-        
-        # Convertir en objets CarteCommercant
-        cartes = [CarteCommercant.from_dict(c) for c in cartes_data]
-        
+        """
+        Crée un TPE à partir d'un dictionnaire au format courant (1.5)
+        Les sauvegardes plus anciennes sont converties une fois par fichier (tpe_migration)
+        """
         return cls(
             service=data['service'],
             regisseur=Regisseur.from_dict(data['regisseur']),
             regisseurs_suppleants=data['regisseurs_suppleants'],
-            cartes_commercant=cartes,
+            cartes_commercant=[CarteCommercant.from_dict(c) for c in data['cartes_commercant']],
             shop_id=data['shop_id'],
             acces_backoffice=AccesBackoffice.from_dict(data['acces_backoffice']),
             modele_tpe=data['modele_tpe'],
@@ -235,68 +311,695 @@ class TPE:
             nombre_tpe=data.get('nombre_tpe', 1),
             date_creation=data.get('date_creation')
         )
+    
+    @classmethod
+    def from_dict_confiance(cls, data):
+        """
+        Crée un TPE sans repasser par les validations (__post_init__)
+        Réservé aux instantanés écrits par ce module au schéma courant, somme de contrôle vérifiée
+        """
+        acces_data = data['acces_backoffice']
+        acces = _nouveau(AccesBackoffice)
+        acces.actif = acces_data['actif']
+        acces.email = acces_data['email']
+        
+        type_data = data['type_tpe']
+        config_data = type_data['config_reseau']
+        if config_data:
+            config = _nouveau(ConfigurationReseau)
+            config.adresse_ip = config_data['adresse_ip']
+            config.masque = config_data['masque']
+            config.passerelle = config_data['passerelle']
+        else:
+            config = None
+        type_tpe = _nouveau(TypeTPE)
+        type_tpe.ethernet = type_data['ethernet']
+        type_tpe.quatre_cinq_g = type_data['quatre_cinq_g']
+        type_tpe.config_reseau = config
+        
+        # Regisseur et CarteCommercant n'ont pas de validation : constructeur ordinaire
+        tpe = _nouveau(cls)
+        tpe.service = sys.intern(data['service'])
+        tpe.regisseur = Regisseur(**data['regisseur'])
+        tpe.regisseurs_suppleants = data['regisseurs_suppleants']
+        tpe.cartes_commercant = [CarteCommercant(carte['numero'], carte['numero_serie_tpe'])
+                                 for carte in data['cartes_commercant']]
+        tpe.shop_id = data['shop_id']
+        tpe.acces_backoffice = acces
+        tpe.modele_tpe = sys.intern(data['modele_tpe'])
+        tpe.type_tpe = type_tpe
+        tpe.nombre_tpe = data['nombre_tpe']
+        tpe.date_creation = data['date_creation']
+        return tpe
+
+
+# Colonnes des exports tabulaires (Excel, CSV), dans l'ordre de ligne_export
+COLONNES_EXPORT = [
+    "Service", "Régisseur Prénom", "Régisseur Nom", "Régisseur Téléphone",
+    "Régisseurs Suppléants", "Cartes Commerçant", "Numéros Série TPE", "ShopID", "Nombre de TPE",
+    "Accès Backoffice", "Email Backoffice", "Modèle TPE",
+    "Type Ethernet", "Type 4/5G", "Adresse IP", "Masque", "Passerelle",
+    "Date Création"
+]
+
+
+def ligne_export(tpe: TPE) -> tuple:
+    """Valeurs d'un TPE dans l'ordre de COLONNES_EXPORT (None si pas de configuration réseau)"""
+    config = tpe.type_tpe.config_reseau
+    return (
+        tpe.service, tpe.regisseur.prenom, tpe.regisseur.nom, tpe.regisseur.telephone,
+        tpe.regisseurs_suppleants,
+        ", ".join([c.numero for c in tpe.cartes_commercant]),
+        ", ".join([c.numero_serie_tpe or "N/A" for c in tpe.cartes_commercant]),
+        tpe.shop_id, tpe.nombre_tpe,
+        "Oui" if tpe.acces_backoffice.actif else "Non", tpe.acces_backoffice.email or "",
+        tpe.modele_tpe,
+        "Oui" if tpe.type_tpe.ethernet else "Non", "Oui" if tpe.type_tpe.quatre_cinq_g else "Non",
+        config.adresse_ip if config else None,
+        config.masque if config else None,
+        config.passerelle if config else None,
+        tpe.date_creation
+    )
+
+
+def _texte(valeur) -> str:
+    """Contenu d'une cellule en texte (cellule vide -> '')"""
+    return "" if valeur is None else str(valeur).strip()
+
+
+def _oui(texte: str) -> bool:
+    return texte.lower() in ("oui", "true", "1")
+
+
+def positions_colonnes(entete: Sequence) -> List[int]:
+    """Position de chaque colonne de COLONNES_EXPORT dans une ligne d'en-tête (ValueError si absente)"""
+    titres = [_texte(titre) for titre in entete]
+    manquantes = [titre for titre in COLONNES_EXPORT if titre not in titres]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes: {', '.join(manquantes)}")
+    return [titres.index(titre) for titre in COLONNES_EXPORT]
+
+
+def tpe_depuis_ligne(valeurs: Sequence, positions: Optional[Sequence[int]] = None) -> dict:
+    """
+    Dictionnaire de TPE (format to_dict) à partir d'une ligne d'export (inverse de ligne_export)
+    positions : place des colonnes dans la ligne (positions_colonnes), par défaut l'ordre de COLONNES_EXPORT
+    ShopID vide = attribution automatique ; numéro de série "N/A" = absent
+    """
+    if positions is None:
+        positions = range(len(COLONNES_EXPORT))
+    (service, prenom, nom, telephone, suppleants, cartes, series, shop_id, nombre_tpe,
+     backoffice, email, modele, ethernet, quatre_cinq_g, ip, masque, passerelle, date_creation) = [
+        _texte(valeurs[position]) if position < len(valeurs) else "" for position in positions
+    ]
+    
+    numeros = [numero.strip() for numero in cartes.split(",")] if cartes else []
+    numeros_serie = [serie.strip() for serie in series.split(",")] if series else []
+    if len(numeros_serie) > len(numeros):
+        raise ValueError("Plus de numéros de série que de cartes commerçant")
+    numeros_serie += ["N/A"] * (len(numeros) - len(numeros_serie))
+    
+    return {
+        'service': service,
+        'regisseur': {'prenom': prenom, 'nom': nom, 'telephone': telephone},
+        'regisseurs_suppleants': suppleants,
+        'cartes_commercant': [{'numero': numero, 'numero_serie_tpe': None if serie in ("", "N/A") else serie}
+                              for numero, serie in zip(numeros, numeros_serie)],
+        'shop_id': int(shop_id or 0),
+        'acces_backoffice': {'actif': _oui(backoffice), 'email': email or None},
+        'modele_tpe': modele,
+        'type_tpe': {
+            'ethernet': _oui(ethernet),
+            'quatre_cinq_g': _oui(quatre_cinq_g),
+            'config_reseau': {'adresse_ip': ip, 'masque': masque, 'passerelle': passerelle} if ip else None
+        },
+        'nombre_tpe': int(nombre_tpe or 1),
+        'date_creation': date_creation or None
+    }
+
+
+def ip_en_entier(ip: str) -> int:
+    """Convertit une adresse IPv4 'a.b.c.d' (déjà validée) en entier 32 bits"""
+    a, b, c, d = (int(octet) for octet in ip.split('.'))
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def _adresse_ip(tpe: TPE) -> Optional[str]:
+    """Adresse IP d'un TPE (None sans configuration réseau)"""
+    config = tpe.type_tpe.config_reseau
+    return config.adresse_ip if config is not None else None
+
+
+# Champs couverts par les index secondaires : nom du critère -> extraction de la clé
+CHAMPS_INDEXES: Dict[str, Callable[[TPE], Any]] = {
+    'service': lambda tpe: tpe.service,
+    'modele_tpe': lambda tpe: tpe.modele_tpe,
+    'regisseur': lambda tpe: f"{tpe.regisseur.prenom} {tpe.regisseur.nom}",
+    'ethernet': lambda tpe: tpe.type_tpe.ethernet,
+    'quatre_cinq_g': lambda tpe: tpe.type_tpe.quatre_cinq_g,
+}
+
+
+@dataclass
+class RapportLot:
+    """Compte rendu d'un ajout en lot (ajouter_tpes_lot)"""
+    ajoutes: List[int] = field(default_factory=list)  # ShopID effectivement ajoutés
+    erreurs: List[Tuple[int, str]] = field(default_factory=list)  # (indice dans le lot, message)
+    
+    @property
+    def succes(self) -> bool:
+        return not self.erreurs
 
 
 class GestionnaireTPE:
     """Gestionnaire principal pour la gestion des TPE"""
     
-    def __init__(self):
-        self.tpes: List[TPE] = []
+    def __init__(self, index_secondaires: bool = False, cartes_uniques: bool = False,
+                 colonnes: bool = False):
+        # Index primaire ShopID -> TPE (un dict conserve l'ordre d'insertion)
+        self._tpes: Dict[int, TPE] = {}
+        # Index inverses toujours tenus à jour : numéro de carte / de série -> {ShopID: None}
+        self._index_cartes: Dict[str, Dict[int, None]] = {}
+        self._index_series: Dict[str, Dict[int, None]] = {}
+        # Index réseau des TPE Ethernet : adresses IP en entiers, triées pour les requêtes par sous-réseau
+        self._ips_triees: List[int] = []
+        self._index_ip: Dict[int, Dict[int, None]] = {}
+        self._index_passerelles: Dict[int, Dict[int, None]] = {}
+        # Si actif, une carte ou un numéro de série ne peut appartenir qu'à un seul TPE
+        self.cartes_uniques = cartes_uniques
+        # Index secondaires optionnels : champ -> valeur -> {ShopID: None} (ensemble ordonné)
+        self._index: Optional[Dict[str, Dict[Any, Dict[int, None]]]] = None
+        if index_secondaires:
+            self._index = {champ: {} for champ in CHAMPS_INDEXES}
+        # Miroir colonnaire optionnel pour les statistiques et rapports
+        self.colonnes: Optional[StockColonnaire] = StockColonnaire() if colonnes else None
+        # Compteurs de statistiques tenus à jour à chaque mutation
+        self._compteurs = self._compteurs_vides()
+        # Séquence ShopID monotone : jamais décrémentée, sauvegardée avec les données
+        self._prochain_shop_id = 1
         self.fichier_sauvegarde = "tpe_data.pkl"
         self.fichier_backup = "tpe_backup.json"
+        self.fichier_backup_flux = "tpe_backup.ndjson"
+        # Historique dédupliqué (un objet par contenu de TPE, un manifeste par sauvegarde)
+        self.dossier_historique = "tpe_historique"
+        self._historique: Optional[HistoriqueSauvegardes] = None
+        # Journal des modifications (une ligne JSON par opération), inactif par défaut
+        self.fichier_journal = "tpe_journal.ndjson"
+        self._journal = None
+        self._journal_synchro = False
+        self._journal_entrees = 0
+        # Opérations du journal refusées au dernier rejeu : (numéro de ligne, opération, motif)
+        self.rejeu_en_echec: List[Tuple[int, str, str]] = []
+        # Motif du dernier refus d'ajouter_tpe / modifier_tpe (affiché par l'interface)
+        self.derniere_erreur: Optional[str] = None
+        # Restauration différée : ShopID -> position dans la sauvegarde indexée des TPE
+        # pas encore construits (leur valeur dans _tpes est None en attendant)
+        self.sauvegarde_indexee = False
+        # Codec de la sauvegarde principale écrite par checkpoint() (None : celui du fichier existant) ;
+        # une sauvegarde compressée est toujours au format pickle (le format indexé ne se compresse pas)
+        self.compression_sauvegarde: Optional[str] = None
+        self._differes: Dict[int, int] = {}
+        self._fichier_differe: Optional[str] = None
+        self._lecteur_differe = None
+        # Verrou des mutations : une sauvegarde en arrière-plan n'y prend qu'un instantané
+        self.verrou = threading.RLock()
+        # Écritures de fichiers une à la fois (toujours pris avant self.verrou)
+        self._verrou_ecriture = threading.RLock()
     
-    def ajouter_tpe(self, tpe: TPE) -> bool:
-        """Ajoute un nouveau TPE"""
+    @property
+    def tpes(self) -> List[TPE]:
+        """Liste des TPE dans l'ordre d'insertion"""
+        return self.lister_tpes()
+    
+    @tpes.setter
+    @_sous_verrou('verrou')
+    def tpes(self, tpes: Iterable[TPE]):
+        self._reinitialiser(tpes)
+    
+    @property
+    def prochain_shop_id(self) -> int:
+        """Prochain ShopID qui sera attribué automatiquement"""
+        return self._prochain_shop_id
+    
+    def allouer_shop_id(self) -> int:
+        """Attribue un nouveau ShopID (jamais réutilisé, même après suppression)"""
+        return self.reserver_shop_ids(1).start
+    
+    @_sous_verrou('verrou')
+    def reserver_shop_ids(self, nombre: int) -> range:
+        """Réserve un bloc contigu de ShopID pour un import en masse"""
+        bloc = self._reserver(nombre)
+        self._journaliser('sequence')
+        return bloc
+    
+    def _reserver(self, nombre: int) -> range:
+        if nombre < 1:
+            raise ValueError("Le nombre de ShopID à réserver doit être au minimum 1")
+        debut = self._prochain_shop_id
+        self._prochain_shop_id += nombre
+        return range(debut, debut + nombre)
+    
+    def _reinitialiser(self, tpes: Iterable[TPE], prochain_shop_id: int = 1):
+        """Remplace tout le contenu du gestionnaire et reconstruit les index"""
+        self._oublier_differes()
+        self._tpes = {}
+        self._prochain_shop_id = 1
+        self._vider_index()
+        for tpe in tpes:
+            self._inserer(tpe, trier=False)
+        self._ips_triees.sort()
+        # La séquence sauvegardée peut dépasser le max courant (ShopID supprimés)
+        self._prochain_shop_id = max(self._prochain_shop_id, prochain_shop_id)
+    
+    def _reinitialiser_en_flux(self, tpes: Iterable[TPE], prochain_shop_id: int = 1):
+        """
+        Comme _reinitialiser, à partir d'un itérable consommé au fil de la lecture
+        L'état précédent est rétabli si l'itérable lève une erreur
+        """
+        self._charger_differes()
+        anciens, ancien_prochain = self._tpes, self._prochain_shop_id
         try:
-            # Si ShopID est 0, générer automatiquement
-            if tpe.shop_id == 0:
-                if self.tpes:
-                    max_shop_id = max(t.shop_id for t in self.tpes)
-                    tpe.shop_id = max_shop_id + 1
+            self._reinitialiser(tpes, prochain_shop_id)
+        except Exception:
+            self._reinitialiser(anciens.values(), ancien_prochain)
+            raise
+    
+    def _inserer(self, tpe: TPE, trier: bool = True):
+        """Insère un TPE dans l'index primaire (unicité déjà vérifiée)"""
+        self._tpes[tpe.shop_id] = tpe
+        if tpe.shop_id >= self._prochain_shop_id:
+            self._prochain_shop_id = tpe.shop_id + 1
+        self._indexer(tpe, trier=trier)
+    
+    def _retirer(self, shop_id: int) -> Optional[TPE]:
+        """Retire un TPE de l'index primaire et le retourne"""
+        if shop_id in self._differes:
+            self._charger(shop_id)
+        tpe = self._tpes.pop(shop_id, None)
+        if tpe is not None:
+            self._desindexer(tpe)
+        return tpe
+    
+    def _remplacer(self, ancien: TPE, nouveau: TPE):
+        """Remplace un TPE en conservant sa position dans l'ordre d'insertion"""
+        self._desindexer(ancien)
+        self._indexer(nouveau)
+        if ancien.shop_id == nouveau.shop_id:
+            self._tpes[nouveau.shop_id] = nouveau
+            return
+        if nouveau.shop_id >= self._prochain_shop_id:
+            self._prochain_shop_id = nouveau.shop_id + 1
+        # Changement de ShopID : on reconstruit le dict pour garder la position (cas rare)
+        self._tpes = {
+            (nouveau.shop_id if shop_id == ancien.shop_id else shop_id):
+            (nouveau if shop_id == ancien.shop_id else tpe)
+            for shop_id, tpe in self._tpes.items()
+        }
+    
+    @staticmethod
+    def _compteurs_vides() -> dict:
+        return {
+            'total_tpes': 0,
+            'total_appareils': 0,
+            'type_ethernet': 0,
+            'type_4_5g': 0,
+            'backoffice_actifs': 0
+        }
+    
+    def _compter(self, tpe: TPE, signe: int):
+        """Ajoute (signe=1) ou retire (signe=-1) un TPE des compteurs de statistiques"""
+        compteurs = self._compteurs
+        compteurs['total_tpes'] += signe
+        compteurs['total_appareils'] += signe * tpe.nombre_tpe
+        if tpe.type_tpe.ethernet:
+            compteurs['type_ethernet'] += signe
+        if tpe.type_tpe.quatre_cinq_g:
+            compteurs['type_4_5g'] += signe
+        if tpe.acces_backoffice.actif:
+            compteurs['backoffice_actifs'] += signe
+    
+    def _vider_index(self):
+        """Vide les index secondaires (avant reconstruction)"""
+        self._compteurs = self._compteurs_vides()
+        self._index_cartes = {}
+        self._index_series = {}
+        self._ips_triees = []
+        self._index_ip = {}
+        self._index_passerelles = {}
+        if self._index is not None:
+            self._index = {champ: {} for champ in CHAMPS_INDEXES}
+        if self.colonnes is not None:
+            self.colonnes.vider()
+    
+    def _indexer(self, tpe: TPE, compter: bool = True, trier: bool = True):
+        """
+        Ajoute un TPE aux index secondaires (compter=False : déjà inclus dans les compteurs)
+        trier=False : adresse IP ajoutée en fin de liste, l'appelant trie une fois à la fin du lot
+        """
+        if compter:
+            self._compter(tpe, 1)
+        for carte in tpe.cartes_commercant:
+            self._index_cartes.setdefault(carte.numero, {})[tpe.shop_id] = None
+            if carte.numero_serie_tpe:
+                self._index_series.setdefault(carte.numero_serie_tpe, {})[tpe.shop_id] = None
+        config = tpe.type_tpe.config_reseau
+        if config is not None:
+            ip = ip_en_entier(config.adresse_ip)
+            if ip not in self._index_ip:
+                if trier:
+                    insort(self._ips_triees, ip)
                 else:
-                    tpe.shop_id = 1
+                    self._ips_triees.append(ip)
+            self._index_ip.setdefault(ip, {})[tpe.shop_id] = None
+            self._index_passerelles.setdefault(ip_en_entier(config.passerelle), {})[tpe.shop_id] = None
+        if self.colonnes is not None:
+            self.colonnes.ajouter(tpe)
+        if self._index is not None:
+            for champ, cle in CHAMPS_INDEXES.items():
+                self._index[champ].setdefault(cle(tpe), {})[tpe.shop_id] = None
+    
+    def _desindexer(self, tpe: TPE):
+        """Retire un TPE des index secondaires"""
+        self._compter(tpe, -1)
+        for carte in tpe.cartes_commercant:
+            self._retirer_posting(self._index_cartes, carte.numero, tpe.shop_id)
+            if carte.numero_serie_tpe:
+                self._retirer_posting(self._index_series, carte.numero_serie_tpe, tpe.shop_id)
+        config = tpe.type_tpe.config_reseau
+        if config is not None:
+            ip = ip_en_entier(config.adresse_ip)
+            self._retirer_posting(self._index_ip, ip, tpe.shop_id)
+            if ip not in self._index_ip:
+                del self._ips_triees[bisect_left(self._ips_triees, ip)]
+            self._retirer_posting(self._index_passerelles, ip_en_entier(config.passerelle), tpe.shop_id)
+        if self.colonnes is not None:
+            self.colonnes.retirer(tpe.shop_id)
+        if self._index is not None:
+            for champ, cle in CHAMPS_INDEXES.items():
+                self._retirer_posting(self._index[champ], cle(tpe), tpe.shop_id)
+    
+    @staticmethod
+    def _retirer_posting(index: Dict[Any, Dict[int, None]], valeur: Any, shop_id: int):
+        """Retire un ShopID de la liste associée à une valeur (tolère les doublons)"""
+        postings = index.get(valeur)
+        if postings is not None:
+            postings.pop(shop_id, None)
+            if not postings:
+                del index[valeur]
+    
+    def _verifier_cartes_uniques(self, tpe: TPE, shop_id_actuel: Optional[int] = None,
+                                 cartes_vues: Optional[set] = None, series_vues: Optional[set] = None):
+        """
+        Vérifie qu'aucune carte ni numéro de série du TPE n'appartient déjà à un autre TPE
+        shop_id_actuel : TPE en cours de modification (ses propres cartes sont autorisées)
+        cartes_vues / series_vues : numéros déjà pris dans le lot en cours (mis à jour si succès)
+        """
+        self._charger_differes()
+        cartes = set() if cartes_vues is None else cartes_vues
+        series = set() if series_vues is None else series_vues
+        nouvelles_cartes, nouvelles_series = set(), set()
+        
+        for carte in tpe.cartes_commercant:
+            proprietaires = self._index_cartes.get(carte.numero, {})
+            if (carte.numero in cartes or carte.numero in nouvelles_cartes
+                    or any(s != shop_id_actuel for s in proprietaires)):
+                raise ValueError(f"Carte commerçant {carte.numero} déjà attribuée")
+            nouvelles_cartes.add(carte.numero)
             
+            serie = carte.numero_serie_tpe
+            if serie:
+                proprietaires = self._index_series.get(serie, {})
+                if serie in series or serie in nouvelles_series or any(s != shop_id_actuel for s in proprietaires):
+                    raise ValueError(f"Numéro de série TPE {serie} déjà attribué")
+                nouvelles_series.add(serie)
+        
+        cartes.update(nouvelles_cartes)
+        series.update(nouvelles_series)
+    
+    def _verifier_ip_unique(self, tpe: TPE, shop_id_actuel: Optional[int] = None,
+                            ips_vues: Optional[set] = None) -> Optional[int]:
+        """
+        Vérifie que l'adresse IP d'un TPE Ethernet n'est pas déjà utilisée (recherche dichotomique)
+        Retourne l'adresse en entier (None si pas de configuration réseau)
+        """
+        config = tpe.type_tpe.config_reseau
+        if config is None:
+            return None
+        self._charger_differes()
+        ip = ip_en_entier(config.adresse_ip)
+        position = bisect_left(self._ips_triees, ip)
+        deja_indexee = position < len(self._ips_triees) and self._ips_triees[position] == ip
+        if (ips_vues is not None and ip in ips_vues) or (
+                deja_indexee and any(s != shop_id_actuel for s in self._index_ip[ip])):
+            raise ValueError(f"Adresse IP {config.adresse_ip} déjà attribuée")
+        return ip
+    
+    def rechercher_par_ip(self, adresse_ip: str) -> List[TPE]:
+        """Retourne le(s) TPE configuré(s) avec cette adresse IP"""
+        self._charger_differes()
+        return [self._tpes[shop_id] for shop_id in self._index_ip.get(ip_en_entier(adresse_ip), {})]
+    
+    def rechercher_par_sous_reseau(self, reseau: str) -> List[TPE]:
+        """Retourne les TPE dont l'adresse IP est dans le sous-réseau (ex: '10.2.0.0/16')"""
+        self._charger_differes()
+        net = ip_network(reseau, strict=False)
+        debut = bisect_left(self._ips_triees, int(net.network_address))
+        fin = bisect_right(self._ips_triees, int(net.broadcast_address))
+        return [
+            self._tpes[shop_id]
+            for ip in self._ips_triees[debut:fin]
+            for shop_id in self._index_ip[ip]
+        ]
+    
+    def rechercher_par_passerelle(self, passerelle: str) -> List[TPE]:
+        """Retourne les TPE configurés derrière cette passerelle"""
+        self._charger_differes()
+        return [self._tpes[shop_id] for shop_id in self._index_passerelles.get(ip_en_entier(passerelle), {})]
+    
+    def rechercher_par_carte(self, numero: str) -> List[TPE]:
+        """Retourne le(s) TPE portant ce numéro de carte commerçant"""
+        self._charger_differes()
+        return [self._tpes[shop_id] for shop_id in self._index_cartes.get(str(numero), {})]
+    
+    def rechercher_par_numero_serie(self, numero_serie: str) -> List[TPE]:
+        """Retourne le(s) TPE portant ce numéro de série (échange de terminal sur site)"""
+        self._charger_differes()
+        return [self._tpes[shop_id] for shop_id in self._index_series.get(numero_serie, {})]
+    
+    def rechercher_par(self, **criteres) -> List[TPE]:
+        """
+        Recherche les TPE vérifiant tous les critères (égalité)
+        Critères: service, modele_tpe, regisseur ("Prénom Nom"), ethernet, quatre_cinq_g
+        Une liste de valeurs pour un critère signifie "l'une de ces valeurs"
+        Avec les index secondaires, on intersecte les listes de ShopID au lieu de tout parcourir
+        Les TPE sont retournés dans l'ordre d'insertion, y compris pour une liste de valeurs
+        """
+        self._charger_differes()
+        for champ in criteres:
+            if champ not in CHAMPS_INDEXES:
+                raise ValueError(f"Critère non indexé: {champ}")
+        valeurs = {
+            champ: list(valeur) if isinstance(valeur, (list, tuple, set)) else [valeur]
+            for champ, valeur in criteres.items()
+        }
+        
+        if self._index is None:
+            return [
+                tpe for tpe in self._tpes.values()
+                if all(CHAMPS_INDEXES[champ](tpe) in possibles for champ, possibles in valeurs.items())
+            ]
+        if not valeurs:
+            return self.lister_tpes()
+        
+        postings = []
+        for champ, possibles in valeurs.items():
+            if len(possibles) == 1:
+                postings.append(self._index[champ].get(possibles[0], {}))
+            else:
+                union = {}
+                for valeur in possibles:
+                    union.update(self._index[champ].get(valeur, {}))
+                postings.append(union)
+        unions = any(len(possibles) > 1 for possibles in valeurs.values())
+        postings.sort(key=len)
+        plus_petite, autres = postings[0], postings[1:]
+        resultat = [shop_id for shop_id in plus_petite if all(shop_id in p for p in autres)]
+        if unions and len(resultat) > 1:
+            # Une union est groupée par valeur : on rétablit l'ordre d'insertion
+            retenus = set(resultat)
+            return [tpe for shop_id, tpe in self._tpes.items() if shop_id in retenus]
+        return [self._tpes[shop_id] for shop_id in resultat]
+    
+    def valeurs_indexees(self, champ: str) -> List[Any]:
+        """Retourne les valeurs distinctes présentes pour un champ indexé"""
+        self._charger_differes()
+        if champ not in CHAMPS_INDEXES:
+            raise ValueError(f"Critère non indexé: {champ}")
+        if self._index is not None:
+            return list(self._index[champ])
+        return list(dict.fromkeys(CHAMPS_INDEXES[champ](tpe) for tpe in self._tpes.values()))
+    
+    @_sous_verrou('verrou')
+    def ajouter_tpe(self, tpe: TPE) -> bool:
+        """Ajoute un nouveau TPE"""
+        try:
             # Vérification unicité ShopID
-            if any(t.shop_id == tpe.shop_id for t in self.tpes):
+            if tpe.shop_id in self._tpes:
                 raise ValueError(f"ShopID {tpe.shop_id} existe déjà")
+            if self.cartes_uniques:
+                self._verifier_cartes_uniques(tpe)
+            self._verifier_ip_unique(tpe)
+            
+            # Si ShopID est 0, générer automatiquement (une fois les vérifications passées :
+            # un ajout refusé ne consomme pas de ShopID et ne modifie pas le TPE reçu)
+            if tpe.shop_id == 0:
+                tpe.shop_id = self._reserver(1).start
             
-            self.tpes.append(tpe)
+            self._inserer(tpe)
+            self._journaliser('ajout', tpe=tpe.to_dict())
             return True
         except Exception as e:
+            self.derniere_erreur = str(e)
             return False
     
+    @staticmethod
+    def _lot_migre(lot: Iterable[Union[TPE, dict]]) -> List[Union[TPE, dict]]:
+        """Lot dont les dictionnaires sont mis au format courant (ValueError si formats mélangés)"""
+        lignes = list(lot)
+        indices = [indice for indice, ligne in enumerate(lignes) if isinstance(ligne, dict)]
+        migres = migrer_enregistrements([lignes[indice] for indice in indices])
+        for indice, tpe_dict in zip(indices, migres):
+            lignes[indice] = tpe_dict
+        return lignes
+    
+    @_sous_verrou('verrou')
+    def ajouter_tpes_lot(self, lot: Iterable[Union[TPE, dict]], tout_ou_rien: bool = True,
+                         convertir: Optional[Callable[[Any], dict]] = None) -> RapportLot:
+        """
+        Ajoute un lot de TPE (objets TPE ou dictionnaires au format to_dict)
+        Valide tout le lot en une passe, puis ajoute :
+        - tout_ou_rien=True : rien n'est ajouté si une seule ligne est en erreur
+        - tout_ou_rien=False : les lignes valides sont ajoutées, les autres signalées
+        convertir : transforme chaque ligne brute en dictionnaire (erreurs rapportées par ligne)
+        Sans convertir, les dictionnaires d'anciens formats sont migrés (version déduite du lot)
+        Aucune sauvegarde n'est faite : l'appelant sauvegarde une seule fois après le lot
+        """
+        rapport = RapportLot()
+        if convertir is None:
+            try:
+                lot = self._lot_migre(lot)
+            except ValueError as e:
+                rapport.erreurs.append((0, str(e)))
+                return rapport
+        valides: List[TPE] = []
+        vus = set()
+        cartes_vues, series_vues, ips_vues = set(), set(), set()
+        max_explicite = 0
+        
+        for indice, ligne in enumerate(lot):
+            try:
+                if convertir is not None:
+                    ligne = convertir(ligne)
+                tpe = ligne if isinstance(ligne, TPE) else TPE.from_dict(ligne)
+                if tpe.shop_id != 0:
+                    if tpe.shop_id in self._tpes:
+                        raise ValueError(f"ShopID {tpe.shop_id} existe déjà")
+                    if tpe.shop_id in vus:
+                        raise ValueError(f"ShopID {tpe.shop_id} en double dans le lot")
+                ip = self._verifier_ip_unique(tpe, ips_vues=ips_vues)
+                if self.cartes_uniques:
+                    self._verifier_cartes_uniques(tpe, cartes_vues=cartes_vues, series_vues=series_vues)
+                if ip is not None:
+                    ips_vues.add(ip)
+                if tpe.shop_id != 0:
+                    vus.add(tpe.shop_id)
+                    max_explicite = max(max_explicite, tpe.shop_id)
+                valides.append(tpe)
+            except Exception as e:
+                rapport.erreurs.append((indice, str(e)))
+        
+        if tout_ou_rien and rapport.erreurs:
+            return rapport
+        
+        # Les ShopID automatiques sont pris après les ShopID explicites du lot
+        if max_explicite >= self._prochain_shop_id:
+            self._prochain_shop_id = max_explicite + 1
+        nb_auto = sum(1 for tpe in valides if tpe.shop_id == 0)
+        shop_ids_auto = iter(self._reserver(nb_auto)) if nb_auto else iter(())
+        
+        for tpe in valides:
+            if tpe.shop_id == 0:
+                tpe.shop_id = next(shop_ids_auto)
+            self._inserer(tpe, trier=False)
+            rapport.ajoutes.append(tpe.shop_id)
+        self._ips_triees.sort()
+        if self._journal is not None:
+            # Lignes de taille bornée, rejouées chacune comme un lot indépendant
+            for debut in range(0, len(valides), TAILLE_LOT_JOURNAL):
+                self._journaliser('lot', tpes=[tpe.to_dict() for tpe in valides[debut:debut + TAILLE_LOT_JOURNAL]])
+        return rapport
+    
+    @_sous_verrou('verrou')
     def supprimer_tpe(self, shop_id: int) -> bool:
         """Supprime un TPE par son ShopID"""
         try:
-            self.tpes = [t for t in self.tpes if t.shop_id != shop_id]
+            if self._retirer(shop_id) is not None:
+                self._journaliser('suppression', shop_id=shop_id)
             return True
         except Exception as e:
             return False
     
     def rechercher_tpe(self, shop_id: int) -> Optional[TPE]:
-        """Recherche un TPE par son ShopID"""
-        for tpe in self.tpes:
-            if tpe.shop_id == shop_id:
-                return tpe
-        return None
+        """Recherche un TPE par son ShopID (construit à la demande après une restauration différée)"""
+        tpe = self._tpes.get(shop_id)
+        if tpe is None and shop_id in self._differes:
+            tpe = self._charger(shop_id)
+        return tpe
     
+    @_sous_verrou('verrou')
     def modifier_tpe(self, shop_id: int, nouveau_tpe: TPE) -> bool:
         """Modifie un TPE existant"""
         try:
-            for i, tpe in enumerate(self.tpes):
-                if tpe.shop_id == shop_id:
-                    nouveau_tpe.date_creation = tpe.date_creation
-                    self.tpes[i] = nouveau_tpe
-                    return True
-            return False
+            tpe = self.rechercher_tpe(shop_id)
+            if tpe is None:
+                raise ValueError(f"ShopID {shop_id} introuvable")
+            # Le nouveau ShopID ne doit pas appartenir à un autre TPE
+            if nouveau_tpe.shop_id != shop_id and nouveau_tpe.shop_id in self._tpes:
+                raise ValueError(f"ShopID {nouveau_tpe.shop_id} existe déjà")
+            if self.cartes_uniques:
+                self._verifier_cartes_uniques(nouveau_tpe, shop_id_actuel=shop_id)
+            # IP inchangée : pas de contrôle (une sauvegarde restaurée peut contenir des IP partagées)
+            if _adresse_ip(nouveau_tpe) != _adresse_ip(tpe):
+                self._verifier_ip_unique(nouveau_tpe, shop_id_actuel=shop_id)
+            nouveau_tpe.date_creation = tpe.date_creation
+            self._remplacer(tpe, nouveau_tpe)
+            self._journaliser('modification', shop_id=shop_id, tpe=nouveau_tpe.to_dict())
+            return True
         except Exception as e:
+            self.derniere_erreur = str(e)
             return False
     
-    def exporter_excel(self, nom_fichier: str = "tpe_export.xlsx") -> bool:
+    def exporter_excel(self, nom_fichier: str = "tpe_export.xlsx", flux: bool = True,
+                       partition: Optional[str] = None, fichier_par_partition: bool = False,
+                       processus: Optional[int] = None) -> bool:
         """
         Exporte la liste des TPE au format Excel (.xlsx)
-        Retourne True si succès, False sinon
+        flux=True : feuille en écriture seule, lignes écrites au fil du parcours (mémoire
+        constante) et largeurs relevées pendant l'écriture
+        flux=False : classeur complet construit en mémoire (ancien mode)
+        partition : 'service' ou 'modele_tpe' -> une feuille par valeur (ordre alphabétique),
+        feuilles rendues en parallèle dans un pool de processus (écriture en flux) ; les lignes
+        de chaque valeur passent par un fichier temporaire à côté de l'export (mémoire constante,
+        disque de l'ordre de la taille de la flotte sérialisée)
+        fichier_par_partition=True : un classeur par valeur, <nom>_<valeur>.xlsx
+        processus : taille du pool, par défaut le nombre de cœurs disponibles
+        Retourne True si succès, False sinon ; un pool de processus inutilisable lève
+        BrokenProcessPool (ex. script lancé sans garde if __name__ == "__main__" en mode spawn)
         """
+        if partition is not None:
+            return self._exporter_excel_partitions(nom_fichier, partition, fichier_par_partition, processus)
+        if flux:
+            return self._exporter_excel_flux(nom_fichier)
         try:
             wb = openpyxl.Workbook()
             ws = wb.active
@@ -306,13 +1009,7 @@ class GestionnaireTPE:
             header_font = Font(bold=True, color="FFFFFF", size=12)
             header_alignment = Alignment(horizontal="center", vertical="center")
             
-            headers = [
-                "Service", "Régisseur Prénom", "Régisseur Nom", "Régisseur Téléphone",
-                "Régisseurs Suppléants", "Cartes Commerçant", "Numéros Série TPE", "ShopID", "Nombre de TPE",
-                "Accès Backoffice", "Email Backoffice", "Modèle TPE",
-                "Type Ethernet", "Type 4/5G", "Adresse IP", "Masque", "Passerelle",
-                "Date Création"
-            ]
+            headers = COLONNES_EXPORT
             
             for col, header in enumerate(headers, start=1):
                 cell = ws.cell(row=1, column=col, value=header)
@@ -320,7 +1017,7 @@ class GestionnaireTPE:
                 cell.font = header_font
                 cell.alignment = header_alignment
             
-            for row_idx, tpe in enumerate(self.tpes, start=2):
+            for row_idx, tpe in enumerate(self._iterer_tpes(), start=2):
                 ws.cell(row=row_idx, column=1, value=tpe.service)
                 ws.cell(row=row_idx, column=2, value=tpe.regisseur.prenom)
                 ws.cell(row=row_idx, column=3, value=tpe.regisseur.nom)
@@ -367,54 +1064,678 @@ class GestionnaireTPE:
         except Exception as e:
             return False
     
-    def sauvegarder(self, nom_fichier: str = None) -> bool:
-        """Sauvegarde les données en format binaire (pickle)"""
+    @staticmethod
+    def _separateur(fichier, separateur: Optional[str]) -> str:
+        """Séparateur explicite, sinon tabulation pour un fichier .tsv et virgule ailleurs"""
+        if separateur is not None:
+            return separateur
+        return "\t" if isinstance(fichier, str) and fichier.lower().endswith(".tsv") else ","
+    
+    @staticmethod
+    def _ouvrir_texte(fichier: Union[str, IO, None], mode: str, standard: IO):
+        """Fichier nommé (ouvert et refermé), flux texte déjà ouvert, ou entrée/sortie standard pour None / '-'"""
+        if fichier is None or fichier == "-":
+            return nullcontext(standard)
+        if isinstance(fichier, str):
+            return open(fichier, mode, encoding='utf-8', newline='')
+        return nullcontext(fichier)
+    
+    def exporter_csv(self, fichier: Union[str, IO, None] = "tpe_export.csv",
+                     separateur: Optional[str] = None) -> bool:
+        """
+        Exporte les TPE en CSV/TSV (mêmes colonnes que exporter_excel), ligne par ligne
+        fichier : chemin, flux texte, ou None / '-' pour la sortie standard
+        separateur : par défaut tabulation pour un fichier .tsv, virgule sinon
+        """
         try:
-            fichier = nom_fichier or self.fichier_sauvegarde
+            with self._ouvrir_texte(fichier, 'w', sys.stdout) as f:
+                ecrivain = csv.writer(f, delimiter=self._separateur(fichier, separateur), lineterminator="\n")
+                ecrivain.writerow(COLONNES_EXPORT)
+                ecrivain.writerows(map(ligne_export, self._iterer_tpes()))
+            return True
+            
+        except Exception as e:
+            return False
+    
+    def importer_csv(self, fichier: Union[str, IO, None] = "tpe_export.csv",
+                     separateur: Optional[str] = None, tout_ou_rien: bool = True) -> RapportLot:
+        """
+        Importe un CSV/TSV au format de exporter_csv (colonnes reconnues par leur titre)
+        Les lignes sont lues en flux et passent par la validation en lot (ajouter_tpes_lot) ;
+        les lignes vides sont ignorées et les erreurs du rapport portent le numéro de ligne
+        dans le fichier (en-tête = 1), comme pour importer_excel
+        fichier : chemin, flux texte, ou None / '-' pour l'entrée standard
+        Lève ValueError si une colonne attendue manque dans l'en-tête
+        """
+        numeros = array('L')  # Numéro de ligne de chaque élément du lot (lignes vides sautées)
+        
+        def lot(lecteur):
+            fin = lecteur.line_num
+            for valeurs in lecteur:
+                # Un enregistrement entre guillemets peut s'étendre sur plusieurs lignes
+                debut, fin = fin + 1, lecteur.line_num
+                if any(valeur != "" for valeur in valeurs):
+                    numeros.append(debut)
+                    yield valeurs
+        
+        with self._ouvrir_texte(fichier, 'r', sys.stdin) as f:
+            lecteur = csv.reader(f, delimiter=self._separateur(fichier, separateur))
+            positions = positions_colonnes(next(lecteur, []))
+            rapport = self.ajouter_tpes_lot(lot(lecteur), tout_ou_rien=tout_ou_rien,
+                                            convertir=lambda valeurs: tpe_depuis_ligne(valeurs, positions))
+        rapport.erreurs = [(numeros[indice], message) for indice, message in rapport.erreurs]
+        return rapport
+    
+    def exporter_colonnes(self, nom_fichier: str = "tpe_export.parquet", format_colonnes: Optional[str] = None,
+                          taille_lot: int = TAILLE_LOT) -> bool:
+        """
+        Exporte la flotte en fichier colonnaire typé pour l'analyse (Parquet ou Feather
+        d'après l'extension), cartes commerçant dans la table fille <nom>_cartes.<ext>
+        Les TPE sont convertis par lots directement en colonnes (voir tpe_arrow)
+        Nécessite pyarrow (tpe_arrow.ARROW_DISPONIBLE) : retourne False s'il est absent
+        """
+        try:
+            with self.verrou:
+                # Dictionnaires de toute la flotte : un seul par colonne pour tous les lots
+                dictionnaires = {champ: self.valeurs_indexees(champ) for champ in CHAMPS_DICTIONNAIRE}
+                ecrire_colonnes(self._iterer_tpes(), nom_fichier, dictionnaires, format_colonnes, taille_lot)
+            return True
+            
+        except Exception as e:
+            return False
+    
+    def importer_excel(self, nom_fichier: str, feuille: Optional[str] = None, tout_ou_rien: bool = True,
+                       fichier_erreurs: Optional[str] = None) -> RapportLot:
+        """
+        Importe un classeur au format de exporter_excel (colonnes reconnues par leur titre)
+        Le classeur est ouvert en lecture seule et lu ligne à ligne ; les lignes passent par
+        la validation en lot (ajouter_tpes_lot) puis sont insérées en une fois
+        Les erreurs du rapport portent le numéro de ligne dans la feuille (en-tête = 1)
+        fichier_erreurs : classeur des lignes refusées (ligne, erreur, valeurs d'origine),
+        réimportable une fois corrigé
+        Lève ValueError si une colonne attendue manque dans l'en-tête
+        """
+        numeros = array('L')  # Numéro de ligne de chaque élément du lot (lignes vides sautées)
+        
+        def lot(lignes):
+            for numero, valeurs in lignes:
+                numeros.append(numero)
+                yield valeurs
+        
+        with lignes_classeur(nom_fichier, feuille) as (entete, lignes):
+            positions = positions_colonnes(entete)
+            rapport = self.ajouter_tpes_lot(lot(lignes), tout_ou_rien=tout_ou_rien,
+                                            convertir=lambda valeurs: tpe_depuis_ligne(valeurs, positions))
+        rapport.erreurs = [(numeros[indice], message) for indice, message in rapport.erreurs]
+        
+        if fichier_erreurs and rapport.erreurs:
+            self._ecrire_erreurs_import(nom_fichier, feuille, dict(rapport.erreurs), fichier_erreurs)
+        return rapport
+    
+    @staticmethod
+    def _ecrire_erreurs_import(nom_fichier: str, feuille: Optional[str], erreurs: Dict[int, str],
+                               fichier_erreurs: str):
+        """Relit le classeur importé et recopie les lignes refusées avec leur message"""
+        with lignes_classeur(nom_fichier, feuille) as (entete, lignes):
+            positions = positions_colonnes(entete)
+            enregistrer_feuille(
+                fichier_erreurs, "Erreurs", ["Ligne", "Erreur"] + COLONNES_EXPORT,
+                ((numero, erreurs[numero], *(valeurs[p] if p < len(valeurs) else None for p in positions))
+                 for numero, valeurs in lignes if numero in erreurs)
+            )
+    
+    def _exporter_excel_flux(self, nom_fichier: str) -> bool:
+        """Export Excel en écriture seule (voir tpe_excel)"""
+        try:
+            wb = openpyxl.Workbook(write_only=True)
+            ws = wb.create_sheet("Gestion TPE")
+            largeurs = ecrire_feuille(ws, COLONNES_EXPORT, map(ligne_export, self._iterer_tpes()))
+            wb.save(nom_fichier)
+            appliquer_largeurs(nom_fichier, [largeurs])
+            return True
+            
+        except Exception as e:
+            return False
+    
+    def _exporter_excel_partitions(self, nom_fichier: str, partition: str, fichier_par_partition: bool,
+                                   processus: Optional[int]) -> bool:
+        """
+        Export Excel partitionné : lignes réparties ici dans un fichier temporaire par valeur,
+        feuilles rendues en parallèle à partir de ces fichiers (voir tpe_excel)
+        """
+        groupes: Dict[str, LignesSurDisque] = {}
+        dossier = None
+        try:
+            if partition not in CHAMPS_DICTIONNAIRE:
+                raise ValueError(f"Partition inconnue: {partition}")
+            dossier = tempfile.mkdtemp(prefix="tpe_lignes_", dir=os.path.dirname(os.path.abspath(nom_fichier)))
+            with self.verrou:
+                for tpe in self._iterer_tpes():
+                    valeur = getattr(tpe, partition)
+                    groupe = groupes.get(valeur)
+                    if groupe is None:
+                        groupe = groupes[valeur] = LignesSurDisque(os.path.join(dossier, f"{len(groupes)}.pkl"))
+                    groupe.ajouter(ligne_export(tpe))
+            for groupe in groupes.values():
+                groupe.fermer()
+            if not groupes and not fichier_par_partition:
+                return self._exporter_excel_flux(nom_fichier)
+            
+            valeurs = sorted(groupes)
+            pris = set()
+            feuilles = [nom_feuille(valeur, pris) for valeur in valeurs]
+            lignes = [groupes[valeur] for valeur in valeurs]
+            
+            if fichier_par_partition:
+                chemin, pris = Path(nom_fichier), set()
+                fichiers = [str(chemin.with_name(
+                                f"{chemin.stem}_{nom_fichier_partition(valeur, pris)}{chemin.suffix}"))
+                            for valeur in valeurs]
+                enregistrer_fichiers(fichiers, feuilles, COLONNES_EXPORT, lignes, processus)
+            else:
+                enregistrer_partitions(nom_fichier, feuilles, COLONNES_EXPORT, lignes, processus)
+            return True
+            
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            return False
+        finally:
+            for groupe in groupes.values():
+                groupe.fermer()
+            if dossier is not None:
+                shutil.rmtree(dossier, ignore_errors=True)
+    
+    # ========================================
+    # JOURNAL DES MODIFICATIONS
+    # ========================================
+    
+    def activer_journal(self, nom_fichier: str = None, synchro: bool = False):
+        """
+        Active le journal : chaque ajout, modification ou suppression ajoute une ligne
+        au fichier journal au lieu de réécrire toute la sauvegarde
+        synchro=True force l'écriture sur disque (fsync) à chaque opération
+        """
+        self.desactiver_journal()
+        if nom_fichier:
+            self.fichier_journal = nom_fichier
+        self._journal_synchro = synchro
+        self._journal = open(self.fichier_journal, 'a', encoding='utf-8')
+        with open(self.fichier_journal, 'r', encoding='utf-8') as f:
+            self._journal_entrees = sum(1 for _ in f)
+    
+    def desactiver_journal(self):
+        """Ferme le journal (les opérations suivantes ne sont plus journalisées)"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+    
+    @property
+    def journal_actif(self) -> bool:
+        return self._journal is not None
+    
+    def taille_journal(self) -> int:
+        """Nombre d'opérations journalisées depuis le dernier checkpoint"""
+        return self._journal_entrees
+    
+    def _journaliser(self, operation: str, **donnees):
+        """Ajoute une opération au journal (sans effet si le journal est inactif)"""
+        if self._journal is None:
+            return
+        donnees['op'] = operation
+        donnees['prochain_shop_id'] = self._prochain_shop_id
+        self._journal.write(json.dumps(donnees, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        if self._journal_synchro:
+            os.fsync(self._journal.fileno())
+        self._journal_entrees += 1
+    
+    def _rejouer_journal(self) -> int:
+        """
+        Rejoue le journal sur l'état courant, retourne le nombre d'opérations appliquées
+        Les opérations refusées sont relevées dans rejeu_en_echec
+        """
+        self.rejeu_en_echec = []
+        if not Path(self.fichier_journal).exists():
+            return 0
+        
+        # Pas de journalisation pendant le rejeu
+        journal, self._journal = self._journal, None
+        appliquees = 0
+        try:
+            with open(self.fichier_journal, 'r', encoding='utf-8') as f:
+                for numero, ligne in enumerate(f, start=1):
+                    try:
+                        operation = json.loads(ligne)
+                    except ValueError:
+                        break  # dernière ligne tronquée (arrêt brutal pendant l'écriture)
+                    try:
+                        motif = self._appliquer_operation(operation)
+                    except Exception as e:
+                        motif = str(e)
+                    if motif is None:
+                        appliquees += 1
+                    else:
+                        self.rejeu_en_echec.append((numero, operation.get('op', '?'), motif))
+        finally:
+            self._journal = journal
+        return appliquees
+    
+    def _appliquer_operation(self, operation: dict) -> Optional[str]:
+        """Applique une opération lue dans le journal ; retourne le motif du refus (None si appliquée)"""
+        nature = operation['op']
+        motif = None
+        if nature == 'ajout':
+            if not self.ajouter_tpe(TPE.from_dict(operation['tpe'])):
+                motif = f"Ajout du ShopID {operation['tpe'].get('shop_id')} refusé"
+        elif nature == 'lot':
+            rapport = self.ajouter_tpes_lot(operation['tpes'], tout_ou_rien=False)
+            if not rapport.succes:
+                motif = "; ".join(f"ligne {indice + 1} du lot: {message}" for indice, message in rapport.erreurs)
+        elif nature == 'modification':
+            if not self.modifier_tpe(operation['shop_id'], TPE.from_dict(operation['tpe'])):
+                motif = f"Modification du ShopID {operation['shop_id']} refusée"
+        elif nature == 'suppression':
+            if self.rechercher_tpe(operation['shop_id']) is None or not self.supprimer_tpe(operation['shop_id']):
+                motif = f"Suppression du ShopID {operation['shop_id']} : TPE introuvable"
+        elif nature != 'sequence':
+            motif = f"Opération inconnue: {nature}"
+        self._prochain_shop_id = max(self._prochain_shop_id, operation.get('prochain_shop_id', 1))
+        return motif
+    
+    @_sous_verrou('_verrou_ecriture')
+    def checkpoint(self) -> bool:
+        """
+        Intègre le journal dans la sauvegarde principale puis le vide
+        La sauvegarde est écrite hors verrou à partir d'un instantané : les opérations
+        journalisées pendant l'écriture sont conservées dans le journal
+        Le codec de la sauvegarde existante est conservé (voir compression_sauvegarde)
+        """
+        fichier = self.fichier_sauvegarde
+        try:
+            compression = self.compression_sauvegarde or (detecter(fichier) if Path(fichier).exists() else None)
+        except OSError:
+            return False
+        indexee = self.sauvegarde_indexee and compression is None
+        try:
+            with self.verrou:
+                instantane = self._instantane_indexe() if indexee else self._instantane()
+                journal = self._journal
+                position = journal.tell() if journal is not None else 0
+                entrees = self._journal_entrees
+        except Exception as e:
+            return False
+        
+        if indexee:
+            ecrit = self._ecrire_indexe(fichier, *instantane)
+        else:
+            ecrit = self._ecrire_sauvegarde(fichier, *instantane, compression=compression)
+        if not ecrit:
+            return False
+        
+        with self.verrou:
+            if journal is not None and journal is self._journal:
+                with open(self.fichier_journal, 'rb') as f:
+                    f.seek(position)
+                    reste = f.read()
+                journal.truncate(0)
+                journal.write(reste.decode('utf-8'))
+                journal.flush()
+                self._journal_entrees -= entrees
+        return True
+    
+    # ========================================
+    # SAUVEGARDE INDEXÉE ET RESTAURATION DIFFÉRÉE
+    # ========================================
+    # Format : signature, ligne d'en-tête JSON (séquence, compteurs), un TPE JSON par ligne,
+    # index binaire (ShopID, position) par paires d'entiers 64 bits, position de l'index (8 octets)
+    
+    @staticmethod
+    def _est_sauvegarde_indexee(fichier: str) -> bool:
+        with open(fichier, 'rb') as f:
+            return f.read(len(SIGNATURE_INDEXEE)) == SIGNATURE_INDEXEE
+    
+    @_sous_verrou('_verrou_ecriture')
+    def sauvegarder_indexe(self, nom_fichier: str = None, compression: Optional[str] = None) -> bool:
+        """
+        Sauvegarde au format indexé (ShopID -> position de chaque TPE dans le fichier)
+        restaurer() ne lit alors que l'index et construit chaque TPE à son premier accès
+        compression : refusée (retourne False), l'accès direct aux TPE demande un fichier brut ;
+        utiliser sauvegarder(compression=...) pour une sauvegarde compressée
+        """
+        if compression is not None:
+            return False
+        try:
+            with self.verrou:
+                instantane = self._instantane_indexe()
+        except Exception as e:
+            return False
+        return self._ecrire_indexe(nom_fichier or self.fichier_sauvegarde, *instantane)
+    
+    def _instantane_indexe(self) -> tuple:
+        """Comme _instantane, sans construire les TPE différés (à appeler sous verrou)"""
+        return (list(self._tpes.items()), dict(self._differes), self._fichier_differe,
+                self._prochain_shop_id, dict(self._compteurs))
+    
+    def _ecrire_indexe(self, fichier: str, entrees: List[Tuple[int, Optional[TPE]]], differes: Dict[int, int],
+                       source: Optional[str], prochain_shop_id: int, compteurs: dict) -> bool:
+        """
+        Écrit un instantané au format indexé (sans tenir le verrou)
+        Les TPE encore différés sont recopiés tels quels depuis la sauvegarde source
+        """
+        try:
+            temporaire = f"{fichier}.tmp"
+            positions = array('q')
+            with open(temporaire, 'wb') as f, (open(source, 'rb') if differes else nullcontext()) as lecteur:
+                f.write(SIGNATURE_INDEXEE)
+                f.write(json.dumps({
+                    'format': 'tpe-index',
+                    'version': '1.5',
+                    'date_sauvegarde': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'prochain_shop_id': prochain_shop_id,
+                    'compteurs': compteurs
+                }, ensure_ascii=False).encode('utf-8') + b"\n")
+                for shop_id, tpe in entrees:
+                    positions.append(shop_id)
+                    positions.append(f.tell())
+                    if tpe is None:
+                        lecteur.seek(differes[shop_id])
+                        f.write(lecteur.readline())
+                    else:
+                        f.write(json.dumps(tpe.to_dict(), ensure_ascii=False).encode('utf-8') + b"\n")
+                debut_index = f.tell()
+                if sys.byteorder == 'big':
+                    positions.byteswap()
+                f.write(positions.tobytes())
+                f.write(struct.pack('<q', debut_index))
+            
+            with self.verrou:
+                # La source est remplacée : les TPE encore différés sont lus aux nouvelles positions
+                remplace_source = self._differes and self._fichier_differe is not None and \
+                    Path(self._fichier_differe).resolve() == Path(fichier).resolve()
+                if remplace_source:
+                    self._fermer_lecteur_differe()
+                os.replace(temporaire, fichier)
+                if remplace_source:
+                    if sys.byteorder == 'big':
+                        positions.byteswap()
+                    nouvelles = dict(zip(positions[0::2], positions[1::2]))
+                    for shop_id in self._differes:
+                        self._differes[shop_id] = nouvelles[shop_id]
+            
+            return True
+            
+        except Exception as e:
+            return False
+    
+    @staticmethod
+    def _lire_index(fichier: str) -> Tuple[dict, array]:
+        """En-tête et index (ShopID, position, ShopID, position...) d'une sauvegarde indexée"""
+        with open(fichier, 'rb') as f:
+            f.seek(len(SIGNATURE_INDEXEE))
+            entete = json.loads(f.readline())
+            fin = f.seek(-8, os.SEEK_END)
+            debut_index = struct.unpack('<q', f.read(8))[0]
+            f.seek(debut_index)
+            positions = array('q')
+            positions.frombytes(f.read(fin - debut_index))
+        if sys.byteorder == 'big':
+            positions.byteswap()
+        return entete, positions
+    
+    def _restaurer_indexe(self, fichier: str):
+        """Charge uniquement l'en-tête et l'index : les TPE sont construits à la demande"""
+        entete, positions = self._lire_index(fichier)
+        shop_ids = positions[0::2]
+        self._reinitialiser([], prochain_shop_id=entete.get('prochain_shop_id', 1))
+        self._tpes = dict.fromkeys(shop_ids)
+        self._differes = dict(zip(shop_ids, positions[1::2]))
+        self._fichier_differe = fichier
+        # Les compteurs de statistiques de la sauvegarde restent valables sans lire les TPE
+        self._compteurs = {**self._compteurs_vides(), **entete['compteurs']}
+    
+    def _charger(self, shop_id: int, trier: bool = True) -> TPE:
+        """Construit un TPE différé lors de son premier accès (trier : voir _indexer)"""
+        with self.verrou:
+            tpe = self._tpes.get(shop_id)
+            if tpe is not None:
+                return tpe  # chargé entre-temps par un autre thread
+            if self._lecteur_differe is None:
+                self._lecteur_differe = open(self._fichier_differe, 'rb')
+            self._lecteur_differe.seek(self._differes[shop_id])
+            tpe = TPE.from_dict(json.loads(self._lecteur_differe.readline()))
+            del self._differes[shop_id]
+            # Remplace l'emplacement réservé : l'ordre d'insertion est conservé
+            self._tpes[shop_id] = tpe
+            self._indexer(tpe, compter=False, trier=trier)
+            if not self._differes:
+                self._oublier_differes()
+            return tpe
+    
+    def _charger_differes(self):
+        """Construit tous les TPE encore différés (requis par les index secondaires)"""
+        if not self._differes:
+            return
+        with self.verrou:
+            try:
+                for shop_id in list(self._differes):
+                    self._charger(shop_id, trier=False)
+            finally:
+                self._ips_triees.sort()
+    
+    def _fermer_lecteur_differe(self):
+        if self._lecteur_differe is not None:
+            self._lecteur_differe.close()
+            self._lecteur_differe = None
+    
+    def _oublier_differes(self):
+        """Abandonne la sauvegarde source de la restauration différée"""
+        self._fermer_lecteur_differe()
+        self._differes = {}
+        self._fichier_differe = None
+    
+    @_sous_verrou('verrou')
+    def fermer(self):
+        """
+        Libère les fichiers ouverts (journal, sauvegarde source des TPE différés) avant
+        d'abandonner le gestionnaire ; les TPE différés restent lisibles, le fichier étant rouvert à la demande
+        """
+        self.desactiver_journal()
+        self._fermer_lecteur_differe()
+    
+    @property
+    def nombre_differes(self) -> int:
+        """Nombre de TPE restaurés mais pas encore construits"""
+        return len(self._differes)
+    
+    def _est_sauvegarde_principale(self, fichier: str) -> bool:
+        return Path(fichier).resolve() == Path(self.fichier_sauvegarde).resolve()
+    
+    def _instantane(self) -> Tuple[List[TPE], int]:
+        """TPE et séquence ShopID à un instant donné (à appeler sous verrou)"""
+        return list(self._iterer_tpes()), self.prochain_shop_id
+    
+    def _tpes_encodes(self, compact: bool, tpes: Optional[Iterable[TPE]] = None) -> dict:
+        """
+        Sérialise les TPE pour une sauvegarde (par défaut tous les TPE du gestionnaire)
+        compact=True (version 1.6) : service et modèle remplacés par des codes entiers
+        renvoyant à une table 'dictionnaires' stockée une seule fois dans le fichier
+        """
+        tpes = [tpe.to_dict() for tpe in (self._iterer_tpes() if tpes is None else tpes)]
+        if not compact:
+            return {'tpes': tpes, 'version': '1.5'}
+        
+        dictionnaires = {champ: {} for champ in CHAMPS_DICTIONNAIRE}
+        for tpe_dict in tpes:
+            for champ, codes in dictionnaires.items():
+                tpe_dict[champ] = codes.setdefault(tpe_dict[champ], len(codes))
+        return {
+            'tpes': tpes,
+            'dictionnaires': {champ: list(codes) for champ, codes in dictionnaires.items()},
+            'version': '1.6'
+        }
+    
+    @staticmethod
+    def _tpes_decodes(data: dict) -> List[dict]:
+        """Retourne les dictionnaires de TPE d'une sauvegarde, codes entiers résolus"""
+        tpes = data['tpes']
+        dictionnaires = data.get('dictionnaires')
+        if dictionnaires:
+            tables = {champ: [sys.intern(v) for v in valeurs] for champ, valeurs in dictionnaires.items()}
+            for tpe_dict in tpes:
+                for champ, valeurs in tables.items():
+                    tpe_dict[champ] = valeurs[tpe_dict[champ]]
+        return tpes
+    
+    @classmethod
+    def tpes_de_sauvegarde(cls, data: dict) -> List[dict]:
+        """Dictionnaires de TPE d'une sauvegarde chargée (JSON ou pickle), au format courant"""
+        migrer(data)
+        return cls._tpes_decodes(data)
+    
+    def _mettre_a_niveau(self, fichier: str, version: str, ecrire: Callable[..., bool]) -> bool:
+        """
+        Réécrit au format courant un fichier migré à la restauration (à appeler sous verrou),
+        l'original étant conservé sous <fichier>.v<version> ; les lectures suivantes n'ont
+        plus de migration à faire
+        """
+        shutil.copy2(fichier, f"{fichier}.v{version}")
+        return ecrire(fichier, *self._instantane(), compression=detecter(fichier))
+    
+    @_sous_verrou('_verrou_ecriture')
+    def sauvegarder(self, nom_fichier: str = None, compact: bool = True,
+                    compression: Optional[str] = None) -> bool:
+        """
+        Sauvegarde les données en format binaire (pickle)
+        compression : 'gzip', 'bz2', 'lzma' ou 'zstd' (détectée automatiquement à la restauration)
+        """
+        try:
+            with self.verrou:
+                instantane = self._instantane()
+        except Exception as e:
+            return False
+        return self._ecrire_sauvegarde(nom_fichier or self.fichier_sauvegarde, *instantane,
+                                       compact=compact, compression=compression)
+    
+    def _ecrire_sauvegarde(self, fichier: str, tpes: List[TPE], prochain_shop_id: int,
+                           compact: bool = True, compression: Optional[str] = None) -> bool:
+        """
+        Écrit un instantané au format pickle (sans tenir le verrou)
+        Les TPE sont sérialisés à part ('charge') avec le schéma et une somme de contrôle,
+        qui autorisent la restauration rapide sans revalidation
+        """
+        try:
+            contenu = self._tpes_encodes(compact, tpes)
+            charge = pickle.dumps(contenu, protocol=pickle.HIGHEST_PROTOCOL)
             data = {
-                'tpes': [tpe.to_dict() for tpe in self.tpes],
+                'version': contenu['version'],
+                'schema': SCHEMA_TPE,
+                'somme_controle': _somme_controle(charge),
+                'charge': charge,
                 'date_sauvegarde': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'version': '1.5'
+                'prochain_shop_id': prochain_shop_id
             }
             
-            with open(fichier, 'wb') as f:
+            # Écriture dans un fichier temporaire puis remplacement atomique
+            temporaire = f"{fichier}.tmp"
+            with ouvrir(temporaire, 'wb', compression) as f:
                 pickle.dump(data, f)
+            os.replace(temporaire, fichier)
             
             return True
             
         except Exception as e:
             return False
     
-    def restaurer(self, nom_fichier: str = None) -> bool:
-        """Restaure les données depuis un fichier de sauvegarde"""
+    @_sous_verrou('_verrou_ecriture')
+    @_sous_verrou('verrou')
+    def restaurer(self, nom_fichier: str = None, valider: bool = False) -> bool:
+        """
+        Restaure les données depuis un fichier de sauvegarde
+        Un instantané au schéma courant dont la somme de contrôle est intacte est restauré
+        sans revalidation ; valider=True force la validation complète (fichier importé)
+        """
         try:
             fichier = nom_fichier or self.fichier_sauvegarde
+            principale = self._est_sauvegarde_principale(fichier)
             
-            if not Path(fichier).exists():
+            if Path(fichier).exists() and self._est_sauvegarde_indexee(fichier):
+                data = None
+            elif Path(fichier).exists():
+                with ouvrir(fichier, 'rb') as f, _sans_ramasse_miettes():
+                    data = pickle.load(f)
+            elif principale and self._journal is not None and self._journal_entrees:
+                data = {'tpes': []}  # Pas encore de checkpoint : tout est dans le journal
+            else:
                 return False
             
-            with open(fichier, 'rb') as f:
-                data = pickle.load(f)
+            if data is None:
+                self._restaurer_indexe(fichier)
+            else:
+                with _sans_ramasse_miettes():
+                    contenu, confiance = self._contenu_instantane(data)
+                    version = migrer(contenu)
+                    construire = TPE.from_dict_confiance if confiance and not valider else TPE.from_dict
+                    self._reinitialiser(
+                        [construire(tpe_dict) for tpe_dict in self._tpes_decodes(contenu)],
+                        prochain_shop_id=data.get('prochain_shop_id', 1)
+                    )
+                if version is not None and Path(fichier).exists():
+                    self._mettre_a_niveau(fichier, version, self._ecrire_sauvegarde)
             
-            self.tpes = [TPE.from_dict(tpe_dict) for tpe_dict in data['tpes']]
+            if self._journal is not None:
+                if principale:
+                    self._rejouer_journal()
+                else:
+                    # Les données restaurées deviennent la nouvelle base du journal
+                    self.checkpoint()
             
             return True
             
         except Exception as e:
             return False
     
-    def backup_json(self, nom_fichier: str = None) -> bool:
-        """Crée une sauvegarde en format JSON (lisible)"""
+    @staticmethod
+    def _contenu_instantane(data: dict) -> Tuple[dict, bool]:
+        """
+        Retourne le contenu d'un instantané pickle et s'il est digne de confiance
+        (schéma courant et somme de contrôle vérifiée) ; les instantanés antérieurs
+        sans charge séparée sont toujours revalidés
+        """
+        if 'charge' not in data:
+            return data, False
+        charge = data['charge']
+        if _somme_controle(charge) != data.get('somme_controle'):
+            raise ValueError("Somme de contrôle de l'instantané invalide")
+        return pickle.loads(charge), data.get('schema') == SCHEMA_TPE
+    
+    @_sous_verrou('_verrou_ecriture')
+    def backup_json(self, nom_fichier: str = None, compact: bool = False,
+                    compression: Optional[str] = None) -> bool:
+        """
+        Crée une sauvegarde en format JSON (lisible), éventuellement compressée
+        Format 1.5 par défaut (noms de service et de modèle en clair) ; compact=True : format 1.6
+        """
+        try:
+            with self.verrou:
+                instantane = self._instantane()
+        except Exception as e:
+            return False
+        return self._ecrire_json(nom_fichier or self.fichier_backup, *instantane,
+                                 compact=compact, compression=compression)
+    
+    def _ecrire_json(self, fichier: str, tpes: List[TPE], prochain_shop_id: int,
+                     compact: bool = False, compression: Optional[str] = None) -> bool:
+        """Écrit une sauvegarde JSON (sans tenir le verrou)"""
         try:
-            fichier = nom_fichier or self.fichier_backup
             data = {
-                'tpes': [tpe.to_dict() for tpe in self.tpes],
+                **self._tpes_encodes(compact, tpes),
                 'date_backup': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'version': '1.5',
-                'nombre_tpes': len(self.tpes)
+                'prochain_shop_id': prochain_shop_id
             }
+            data['nombre_tpes'] = len(data['tpes'])
             
-            with open(fichier, 'w', encoding='utf-8') as f:
+            with ouvrir(fichier, 'wt', compression, encoding='utf-8') as f:
                 json.dump(data, f, indent=4, ensure_ascii=False)
             
             return True
@@ -422,6 +1743,8 @@ class GestionnaireTPE:
         except Exception as e:
             return False
     
+    @_sous_verrou('_verrou_ecriture')
+    @_sous_verrou('verrou')
     def restaurer_json(self, nom_fichier: str = None) -> bool:
         """Restaure les données depuis un fichier JSON"""
         try:
@@ -430,10 +1753,142 @@ class GestionnaireTPE:
             if not Path(fichier).exists():
                 return False
             
-            with open(fichier, 'r', encoding='utf-8') as f:
+            with ouvrir(fichier, 'rt', encoding='utf-8') as f:
                 data = json.load(f)
             
-            self.tpes = [TPE.from_dict(tpe_dict) for tpe_dict in data['tpes']]
+            version = migrer(data)
+            self._reinitialiser(
+                [TPE.from_dict(tpe_dict) for tpe_dict in self._tpes_decodes(data)],
+                prochain_shop_id=data.get('prochain_shop_id', 1)
+            )
+            if version is not None:
+                self._mettre_a_niveau(fichier, version, self._ecrire_json)
+            
+            # Les données restaurées deviennent la nouvelle base du journal
+            if self._journal is not None:
+                self.checkpoint()
+            
+            return True
+            
+        except Exception as e:
+            return False
+    
+    def _lignes_ndjson(self, tpes: List[TPE], prochain_shop_id: int) -> Iterator[str]:
+        """Génère les lignes d'une sauvegarde NDJSON : en-tête puis un TPE par ligne"""
+        yield json.dumps({
+            'format': FORMAT_NDJSON,
+            'version': '1.5',
+            'date_backup': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'prochain_shop_id': prochain_shop_id,
+            'nombre_tpes': len(tpes)
+        }, ensure_ascii=False) + "\n"
+        for tpe in tpes:
+            yield json.dumps(tpe.to_dict(), ensure_ascii=False) + "\n"
+    
+    @_sous_verrou('_verrou_ecriture')
+    def backup_ndjson(self, nom_fichier: str = None, compression: Optional[str] = None) -> bool:
+        """
+        Crée une sauvegarde JSON en flux (NDJSON) : une ligne d'en-tête puis un TPE par ligne
+        Chaque TPE est sérialisé puis écrit aussitôt (mémoire constante), compressé à la volée
+        si compression est donnée
+        """
+        try:
+            fichier = nom_fichier or self.fichier_backup_flux
+            with self.verrou:
+                tpes, prochain_shop_id = self._instantane()
+            
+            temporaire = f"{fichier}.tmp"
+            with ouvrir(temporaire, 'wt', compression, encoding='utf-8') as f:
+                f.writelines(self._lignes_ndjson(tpes, prochain_shop_id))
+            os.replace(temporaire, fichier)
+            
+            return True
+            
+        except Exception as e:
+            return False
+    
+    @_sous_verrou('_verrou_ecriture')
+    @_sous_verrou('verrou')
+    def restaurer_ndjson(self, nom_fichier: str = None) -> bool:
+        """
+        Restaure une sauvegarde NDJSON en lisant un TPE par ligne
+        Accepte aussi l'ancien format tpe_backup.json (document JSON unique)
+        """
+        try:
+            fichier = nom_fichier or self.fichier_backup_flux
+            
+            if not Path(fichier).exists():
+                return False
+            
+            with ouvrir(fichier, 'rt', encoding='utf-8') as f:
+                try:
+                    entete = json.loads(f.readline())
+                except ValueError:
+                    entete = None
+                if not isinstance(entete, dict) or entete.get('format') != FORMAT_NDJSON:
+                    # Ancien format (backup_json) : lecture complète
+                    return self.restaurer_json(fichier)
+                
+                # Décodeur choisi une fois pour tout le fichier
+                lignes = migrer_tpes((json.loads(ligne) for ligne in f if ligne.strip()),
+                                     etapes(entete.get('version')))
+                self._reinitialiser_en_flux(
+                    (TPE.from_dict(tpe_dict) for tpe_dict in lignes),
+                    prochain_shop_id=entete.get('prochain_shop_id', 1)
+                )
+            
+            # Les données restaurées deviennent la nouvelle base du journal
+            if self._journal is not None:
+                self.checkpoint()
+            
+            return True
+            
+        except Exception as e:
+            return False
+    
+    def _ouvrir_historique(self, dossier: Optional[str]) -> HistoriqueSauvegardes:
+        """Historique du dossier demandé (conservé : la liste des objets n'est lue qu'une fois)"""
+        dossier = dossier or self.dossier_historique
+        if self._historique is None or self._historique.dossier != Path(dossier):
+            self._historique = HistoriqueSauvegardes(dossier)
+        return self._historique
+    
+    @_sous_verrou('_verrou_ecriture')
+    def sauvegarder_historique(self, dossier: str = None) -> Optional[dict]:
+        """
+        Ajoute une sauvegarde à l'historique dédupliqué : seuls les TPE modifiés depuis
+        les sauvegardes précédentes sont écrits
+        Retourne le manifeste (dont 'nom' et 'objets_ecrits'), None en cas d'échec
+        """
+        try:
+            with self.verrou:
+                tpes, prochain_shop_id = self._instantane()
+            return self._ouvrir_historique(dossier).ecrire(
+                (tpe.to_dict() for tpe in tpes), prochain_shop_id,
+                entete={'version': VERSION_COURANTE, 'schema': SCHEMA_TPE}
+            )
+        except Exception as e:
+            return None
+    
+    @_sous_verrou('_verrou_ecriture')
+    @_sous_verrou('verrou')
+    def restaurer_historique(self, nom: str = None, dossier: str = None) -> bool:
+        """Restaure une sauvegarde de l'historique d'après son manifeste (par défaut la plus récente)"""
+        try:
+            historique = self._ouvrir_historique(dossier)
+            manifeste = historique.manifeste(nom)
+            chaine = etapes(manifeste.get('version'))
+            # Objets vérifiés par leur empreinte : pas de revalidation au schéma courant
+            confiance = not chaine and manifeste.get('schema') == SCHEMA_TPE
+            construire = TPE.from_dict_confiance if confiance else TPE.from_dict
+            self._reinitialiser_en_flux(
+                (construire(tpe_dict) for tpe_dict in migrer_tpes(historique.tpes(manifeste), chaine)),
+                prochain_shop_id=manifeste['prochain_shop_id']
+            )
+            
+            # Les données restaurées deviennent la nouvelle base du journal
+            if self._journal is not None:
+                self.checkpoint()
             
             return True
             
@@ -442,15 +1897,52 @@ class GestionnaireTPE:
     
     def lister_tpes(self) -> List[TPE]:
         """Retourne la liste complète des TPE"""
-        return self.tpes
-    
-    def statistiques(self) -> dict:
-        """Retourne des statistiques sur les TPE"""
-        total = len(self.tpes)
-        total_appareils = sum(tpe.nombre_tpe for tpe in self.tpes)
-        ethernet = sum(1 for t in self.tpes if t.type_tpe.ethernet)
-        quatre_cinq_g = sum(1 for t in self.tpes if t.type_tpe.quatre_cinq_g)
-        backoffice_actif = sum(1 for t in self.tpes if t.acces_backoffice.actif)
+        return list(self._iterer_tpes())
+    
+    def iterer_tpes(self) -> Iterator[TPE]:
+        """Parcourt les TPE dans l'ordre d'insertion, les TPE différés étant construits au fil du parcours"""
+        return iter(self._iterer_tpes())
+    
+    def _iterer_tpes(self) -> Iterable[TPE]:
+        """Parcourt les TPE dans l'ordre d'insertion (utilisé par les exports et sauvegardes)"""
+        if not self._differes:
+            return iter(self._tpes.values())
+        return self._iterer_avec_differes()
+    
+    def _iterer_avec_differes(self) -> Iterator[TPE]:
+        for shop_id, tpe in list(self._tpes.items()):
+            if tpe is None:
+                tpe = self.rechercher_tpe(shop_id)
+                if tpe is None:
+                    continue  # supprimé pendant le parcours
+            yield tpe
+    
+    def statistiques(self, verifier: bool = False) -> dict:
+        """
+        Retourne des statistiques sur les TPE (compteurs tenus à jour, O(1))
+        Avec colonnes=True, calculées sur le miroir colonnaire (comme rapport_par)
+        verifier=True : recompte toute la flotte et lève RuntimeError en cas d'écart
+        """
+        if self.colonnes is not None:
+            self._charger_differes()
+            stats = self.colonnes.statistiques()
+        else:
+            stats = dict(self._compteurs)
+        if verifier:
+            recompte = self._recompter_statistiques()
+            if recompte != stats:
+                raise RuntimeError(f"Compteurs incohérents: {stats} != recomptage {recompte}")
+        return stats
+    
+    def _recompter_statistiques(self) -> dict:
+        """Calcule les statistiques par un parcours complet de la flotte"""
+        self._charger_differes()
+        tpes = self._tpes.values()
+        total = len(self._tpes)
+        total_appareils = sum(tpe.nombre_tpe for tpe in tpes)
+        ethernet = sum(1 for t in tpes if t.type_tpe.ethernet)
+        quatre_cinq_g = sum(1 for t in tpes if t.type_tpe.quatre_cinq_g)
+        backoffice_actif = sum(1 for t in tpes if t.acces_backoffice.actif)
         
         return {
             'total_tpes': total,
@@ -458,4 +1950,18 @@ class GestionnaireTPE:
             'type_ethernet': ethernet,
             'type_4_5g': quatre_cinq_g,
             'backoffice_actifs': backoffice_actif
-        }
\ No newline at end of file
+        }
+    
+    def rapport_par(self, champ: str) -> Dict[str, dict]:
+        """Nombre d'entrées et d'appareils par 'modele_tpe' ou par 'service'"""
+        self._charger_differes()
+        if self.colonnes is not None:
+            return self.colonnes.rapport_par(champ)
+        if champ not in StockColonnaire.CHAMPS_GROUPES:
+            raise ValueError(f"Regroupement impossible sur: {champ}")
+        rapport: Dict[str, dict] = {}
+        for tpe in self._tpes.values():
+            groupe = rapport.setdefault(getattr(tpe, champ), {'entrees': 0, 'appareils': 0})
+            groupe['entrees'] += 1
+            groupe['appareils'] += tpe.nombre_tpe
+        return rapport
@@ -0,0 +1,132 @@
+"""
+Migration des anciens formats de sauvegarde
+Le décodeur est choisi une seule fois par fichier d'après le champ 'version' :
+les enregistrements passent ensuite par une chaîne fixe d'étapes, sans test de type
+par TPE. Les fichiers migrés sont réécrits au format courant par le gestionnaire.
+
+Historique des formats d'enregistrement :
+    1.0 / 1.1 : 'carte_commercant' unique (entier), 'nombre_tpe' absent en 1.0
+    1.2       : 'cartes_commercant' liste d'entiers (tpe_manager2.py)
+    1.3 / 1.4 : 'cartes_commercant' liste de chaînes
+    1.5       : cartes {'numero', 'numero_serie_tpe'} (format courant)
+    1.6       : enregistrements 1.5, service et modèle codés via 'dictionnaires'
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Format courant des enregistrements TPE
+VERSION_COURANTE = '1.5'
+
+# Versions de fichier dont les enregistrements sont déjà au format courant
+VERSIONS_COURANTES = ('1.5', '1.6')
+
+
+def _depuis_1_0(tpe: dict):
+    """Carte commerçant unique -> liste de cartes, nombre de TPE par défaut"""
+    carte = tpe.pop('carte_commercant', None)
+    tpe['cartes_commercant'] = [] if carte is None else [carte]
+    tpe.setdefault('nombre_tpe', 1)
+
+
+def _depuis_1_2(tpe: dict):
+    """Numéros de carte entiers -> chaînes (nombre_tpe absent des fichiers convertis depuis 1.1)"""
+    tpe['cartes_commercant'] = [str(carte) for carte in tpe['cartes_commercant']]
+    tpe.setdefault('nombre_tpe', 1)
+
+
+def _depuis_1_3(tpe: dict):
+    """Numéros de carte -> cartes avec numéro de série TPE (vide)"""
+    tpe['cartes_commercant'] = [{'numero': carte, 'numero_serie_tpe': None}
+                                for carte in tpe['cartes_commercant']]
+
+
+# Version source -> (version obtenue, étape appliquée à chaque enregistrement)
+MIGRATIONS: Dict[str, Tuple[str, Callable[[dict], None]]] = {
+    '1.0': ('1.2', _depuis_1_0),
+    '1.1': ('1.2', _depuis_1_0),
+    '1.2': ('1.3', _depuis_1_2),
+    '1.3': ('1.5', _depuis_1_3),
+    '1.4': ('1.5', _depuis_1_3),
+}
+
+
+def _version_enregistrement(tpe: dict) -> Optional[str]:
+    """Version d'un enregistrement d'après ses cartes (None si aucune carte : compatible avec toutes)"""
+    if 'carte_commercant' in tpe:
+        return '1.0'
+    cartes = tpe.get('cartes_commercant')
+    if not cartes:
+        return None
+    if isinstance(cartes[0], dict):
+        return VERSION_COURANTE
+    return '1.3' if isinstance(cartes[0], str) else '1.2'
+
+
+def _deviner_version(tpes: List[dict]) -> str:
+    """
+    Version d'enregistrements sans champ 'version', déduite de toute la liste
+    Lève ValueError si la liste mêle plusieurs formats (aucune migration partielle)
+    """
+    premieres: Dict[str, int] = {}
+    for indice, tpe in enumerate(tpes):
+        if isinstance(tpe, dict):
+            version = _version_enregistrement(tpe)
+            if version is not None:
+                premieres.setdefault(version, indice)
+    if len(premieres) > 1:
+        details = ", ".join(f"{version} (ligne {indice + 1})" for version, indice in premieres.items())
+        raise ValueError(f"Formats d'enregistrement mélangés: {details}")
+    return next(iter(premieres), VERSION_COURANTE)
+
+
+def version_de(data: dict) -> str:
+    """Version des enregistrements d'une sauvegarde (champ 'version', sinon déduite)"""
+    return data.get('version') or _deviner_version(data.get('tpes', []))
+
+
+def etapes(version: Optional[str]) -> List[Callable[[dict], None]]:
+    """Étapes à appliquer à chaque enregistrement d'un fichier de cette version (vide si courant)"""
+    version = version or VERSION_COURANTE
+    chaine = []
+    while version not in VERSIONS_COURANTES:
+        if version not in MIGRATIONS:
+            raise ValueError(f"Version de sauvegarde non supportée: {version}")
+        version, etape = MIGRATIONS[version]
+        chaine.append(etape)
+    return chaine
+
+
+def migrer_tpes(tpes: Iterable[dict], chaine: List[Callable[[dict], None]]) -> Iterator[dict]:
+    """Applique les étapes à un flux d'enregistrements"""
+    for tpe in tpes:
+        for etape in chaine:
+            etape(tpe)
+        yield tpe
+
+
+def migrer_enregistrements(tpes: List[dict]) -> List[dict]:
+    """
+    Met au format courant des enregistrements sans version (lot, liste JSON)
+    La version est déduite de toute la liste ; les dictionnaires reçus ne sont pas modifiés
+    """
+    chaine = etapes(_deviner_version(tpes))
+    if not chaine:
+        return tpes
+    return list(migrer_tpes((dict(tpe) for tpe in tpes), chaine))
+
+
+def migrer(data: dict) -> Optional[str]:
+    """
+    Met les enregistrements d'une sauvegarde au format courant (sur place)
+    Retourne la version d'origine si une migration a eu lieu, None sinon
+    """
+    version = version_de(data)
+    chaine = etapes(version)
+    if not chaine:
+        return None
+    for tpe in data['tpes']:
+        for etape in chaine:
+            etape(tpe)
+    data['version'] = VERSION_COURANTE
+    return version
@@ -0,0 +1,281 @@
+"""
+Instantané binaire à disposition fixe, lu par mmap
+Colonnes numériques de largeur fixe, tas de chaînes dédupliquées et répertoire
+des ShopID trié : une recherche est une dichotomie suivie de lectures directes
+dans les pages du fichier, sans désérialiser la flotte. Plusieurs processus
+en lecture seule (exports, rapports) partagent les mêmes pages.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from ipaddress import IPv4Address
+from typing import Dict, Iterator, List, Optional
+
+from tpe_manager import (
+    GestionnaireTPE, TPE, Regisseur, AccesBackoffice, TypeTPE,
+    ConfigurationReseau, CarteCommercant, ip_en_entier
+)
+
+SIGNATURE = b"TPEMMAP1"
+VERSION = 1
+
+# Valeur absente dans une colonne de chaînes (email, numéro de série)
+AUCUNE = 0xFFFFFFFF
+
+# Bits de la colonne drapeaux
+ETHERNET, QUATRE_CINQ_G, BACKOFFICE, CONFIG_RESEAU = 1, 2, 4, 8
+
+# Colonnes des TPE (une valeur de largeur fixe par ligne, dans l'ordre d'insertion)
+COLONNES_TPE = (
+    ('shop_id', 'q'),
+    ('nombre_tpe', 'i'),
+    ('drapeaux', 'B'),
+    ('adresse_ip', 'I'),
+    ('masque', 'I'),
+    ('passerelle', 'I'),
+    ('premiere_carte', 'I'),
+    ('nombre_cartes', 'I'),
+    # Colonnes de chaînes : numéro de chaîne dans le tas
+    ('service', 'I'),
+    ('regisseur_prenom', 'I'),
+    ('regisseur_nom', 'I'),
+    ('regisseur_telephone', 'I'),
+    ('regisseurs_suppleants', 'I'),
+    ('backoffice_email', 'I'),
+    ('modele_tpe', 'I'),
+    ('date_creation', 'I'),
+)
+COLONNES_CHAINES = {
+    'service', 'regisseur_prenom', 'regisseur_nom', 'regisseur_telephone',
+    'regisseurs_suppleants', 'backoffice_email', 'modele_tpe', 'date_creation'
+}
+COLONNES_CARTES = (('numero', 'I'), ('numero_serie_tpe', 'I'))
+# Répertoire trié par ShopID -> ligne ; tas : positions de fin de chaque chaîne puis octets UTF-8
+SECTIONS = ([nom for nom, _ in COLONNES_TPE] + [f"carte_{nom}" for nom, _ in COLONNES_CARTES]
+            + ['repertoire_shop_id', 'repertoire_ligne', 'fins_chaines', 'tas'])
+TYPES = {**dict(COLONNES_TPE), **{f"carte_{nom}": code for nom, code in COLONNES_CARTES},
+         'repertoire_shop_id': 'q', 'repertoire_ligne': 'I', 'fins_chaines': 'Q', 'tas': 'B'}
+
+# signature, version, ordre des octets (0 = petit-boutiste), nombre de TPE, de cartes,
+# de chaînes, prochain ShopID, puis (position, longueur) de chaque section
+ENTETE = struct.Struct(f"<8sHHIIIq{2 * len(SECTIONS)}Q")
+
+
+def _aligner(position: int) -> int:
+    return (position + 7) & ~7
+
+
+class _TasDeChaines:
+    """Tas de chaînes UTF-8 dédupliquées, repérées par leur numéro"""
+
+    def __init__(self):
+        self.numeros: Dict[str, int] = {}
+        self.octets = bytearray()
+        self.fins = array('Q')
+
+    def ajouter(self, valeur: Optional[str]) -> int:
+        if valeur is None:
+            return AUCUNE
+        numero = self.numeros.get(valeur)
+        if numero is None:
+            numero = len(self.fins)
+            self.numeros[valeur] = numero
+            self.octets += valeur.encode('utf-8')
+            self.fins.append(len(self.octets))
+        return numero
+
+
+def ecrire_instantane(tpes: List[TPE], fichier: str, prochain_shop_id: int = 1):
+    """Écrit les TPE dans un instantané binaire"""
+    colonnes = {nom: array(TYPES[nom]) for nom in SECTIONS[:-2]}
+    tas = _TasDeChaines()
+
+    for tpe in tpes:
+        config = tpe.type_tpe.config_reseau
+        drapeaux = ((ETHERNET if tpe.type_tpe.ethernet else 0)
+                    | (QUATRE_CINQ_G if tpe.type_tpe.quatre_cinq_g else 0)
+                    | (BACKOFFICE if tpe.acces_backoffice.actif else 0)
+                    | (CONFIG_RESEAU if config is not None else 0))
+        colonnes['shop_id'].append(tpe.shop_id)
+        colonnes['nombre_tpe'].append(tpe.nombre_tpe)
+        colonnes['drapeaux'].append(drapeaux)
+        colonnes['adresse_ip'].append(ip_en_entier(config.adresse_ip) if config else 0)
+        colonnes['masque'].append(ip_en_entier(config.masque) if config else 0)
+        colonnes['passerelle'].append(ip_en_entier(config.passerelle) if config else 0)
+        colonnes['premiere_carte'].append(len(colonnes['carte_numero']))
+        colonnes['nombre_cartes'].append(len(tpe.cartes_commercant))
+        for carte in tpe.cartes_commercant:
+            colonnes['carte_numero'].append(tas.ajouter(carte.numero))
+            colonnes['carte_numero_serie_tpe'].append(tas.ajouter(carte.numero_serie_tpe))
+        colonnes['service'].append(tas.ajouter(tpe.service))
+        colonnes['regisseur_prenom'].append(tas.ajouter(tpe.regisseur.prenom))
+        colonnes['regisseur_nom'].append(tas.ajouter(tpe.regisseur.nom))
+        colonnes['regisseur_telephone'].append(tas.ajouter(tpe.regisseur.telephone))
+        colonnes['regisseurs_suppleants'].append(tas.ajouter(tpe.regisseurs_suppleants))
+        colonnes['backoffice_email'].append(tas.ajouter(tpe.acces_backoffice.email))
+        colonnes['modele_tpe'].append(tas.ajouter(tpe.modele_tpe))
+        colonnes['date_creation'].append(tas.ajouter(tpe.date_creation))
+
+    lignes = sorted(range(len(colonnes['shop_id'])), key=colonnes['shop_id'].__getitem__)
+    colonnes['repertoire_shop_id'] = array('q', (colonnes['shop_id'][ligne] for ligne in lignes))
+    colonnes['repertoire_ligne'] = array('I', lignes)
+    colonnes['fins_chaines'] = tas.fins
+    colonnes['tas'] = array('B', tas.octets)
+
+    # Les colonnes sont écrites dans l'ordre natif ; l'en-tête indique lequel
+    emplacements = []
+    position = _aligner(ENTETE.size)
+    for nom in SECTIONS:
+        taille = len(colonnes[nom]) * colonnes[nom].itemsize
+        emplacements += [position, taille]
+        position = _aligner(position + taille)
+
+    temporaire = f"{fichier}.tmp"
+    with open(temporaire, 'wb') as f:
+        f.write(ENTETE.pack(SIGNATURE, VERSION, 0 if sys.byteorder == 'little' else 1,
+                            len(colonnes['shop_id']), len(colonnes['carte_numero']), len(tas.fins),
+                            prochain_shop_id, *emplacements))
+        for nom, debut in zip(SECTIONS, emplacements[0::2]):
+            f.write(bytes(debut - f.tell()))
+            colonnes[nom].tofile(f)
+    os.replace(temporaire, fichier)
+
+
+def sauvegarder_binaire(gestionnaire: GestionnaireTPE, fichier: str) -> bool:
+    """Écrit l'instantané binaire d'un gestionnaire (instantané pris sous son verrou)"""
+    try:
+        with gestionnaire.verrou:
+            tpes, prochain_shop_id = gestionnaire.lister_tpes(), gestionnaire.prochain_shop_id
+        ecrire_instantane(tpes, fichier, prochain_shop_id)
+        return True
+    except Exception as e:
+        return False
+
+
+class InstantaneBinaire:
+    """
+    Lecture seule d'un instantané binaire via mmap
+    Les colonnes sont des memoryview sur les pages du fichier (aucune copie)
+    """
+
+    def __init__(self, fichier: str):
+        self.fichier = fichier
+        with open(fichier, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (signature, version, ordre, self.nombre_tpes, self.nombre_cartes, self.nombre_chaines,
+         self.prochain_shop_id, *emplacements) = ENTETE.unpack_from(self._mm, 0)
+        if signature != SIGNATURE or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"Instantané binaire invalide: {fichier}")
+        if ordre != (0 if sys.byteorder == 'little' else 1):
+            self._mm.close()
+            raise ValueError("Instantané écrit avec un autre ordre des octets")
+
+        vue = memoryview(self._mm)
+        self._vues = [vue]
+        self.colonnes = {}
+        for nom, debut, taille in zip(SECTIONS, emplacements[0::2], emplacements[1::2]):
+            colonne = vue[debut:debut + taille].cast(TYPES[nom])
+            self._vues.append(colonne)
+            self.colonnes[nom] = colonne
+        self._tas = self.colonnes['tas']
+        self._fins = self.colonnes['fins_chaines']
+
+    def fermer(self):
+        """Libère les vues puis le mmap"""
+        for vue in reversed(self._vues):
+            vue.release()
+        self._vues = []
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def __len__(self):
+        return self.nombre_tpes
+
+    def chaine(self, numero: int) -> Optional[str]:
+        """Chaîne du tas (None si absente)"""
+        if numero == AUCUNE:
+            return None
+        debut = self._fins[numero - 1] if numero else 0
+        return str(self._tas[debut:self._fins[numero]], 'utf-8')
+
+    def ligne(self, shop_id: int) -> Optional[int]:
+        """Numéro de ligne d'un ShopID (recherche dichotomique dans le répertoire)"""
+        repertoire = self.colonnes['repertoire_shop_id']
+        position = bisect_left(repertoire, shop_id)
+        if position < len(repertoire) and repertoire[position] == shop_id:
+            return self.colonnes['repertoire_ligne'][position]
+        return None
+
+    def valeur(self, shop_id: int, champ: str):
+        """Lit un seul champ d'un TPE (colonne de COLONNES_TPE), sans construire le TPE"""
+        ligne = self.ligne(shop_id)
+        if ligne is None:
+            return None
+        valeur = self.colonnes[champ][ligne]
+        return self.chaine(valeur) if champ in COLONNES_CHAINES else valeur
+
+    def rechercher_tpe(self, shop_id: int) -> Optional[TPE]:
+        """Construit le TPE d'un ShopID (None s'il est absent)"""
+        ligne = self.ligne(shop_id)
+        return None if ligne is None else self._construire(ligne)
+
+    def __iter__(self) -> Iterator[TPE]:
+        """Parcourt les TPE dans l'ordre d'insertion"""
+        for ligne in range(self.nombre_tpes):
+            yield self._construire(ligne)
+
+    def _construire(self, ligne: int) -> TPE:
+        c = self.colonnes
+        chaine = self.chaine
+        drapeaux = c['drapeaux'][ligne]
+        config = None
+        if drapeaux & CONFIG_RESEAU:
+            config = ConfigurationReseau(
+                adresse_ip=str(IPv4Address(c['adresse_ip'][ligne])),
+                masque=str(IPv4Address(c['masque'][ligne])),
+                passerelle=str(IPv4Address(c['passerelle'][ligne]))
+            )
+        premiere = c['premiere_carte'][ligne]
+        cartes = [
+            CarteCommercant(numero=chaine(c['carte_numero'][i]), numero_serie_tpe=chaine(c['carte_numero_serie_tpe'][i]))
+            for i in range(premiere, premiere + c['nombre_cartes'][ligne])
+        ]
+        return TPE(
+            service=chaine(c['service'][ligne]),
+            regisseur=Regisseur(
+                prenom=chaine(c['regisseur_prenom'][ligne]),
+                nom=chaine(c['regisseur_nom'][ligne]),
+                telephone=chaine(c['regisseur_telephone'][ligne])
+            ),
+            regisseurs_suppleants=chaine(c['regisseurs_suppleants'][ligne]),
+            cartes_commercant=cartes,
+            shop_id=c['shop_id'][ligne],
+            acces_backoffice=AccesBackoffice(actif=bool(drapeaux & BACKOFFICE), email=chaine(c['backoffice_email'][ligne])),
+            modele_tpe=chaine(c['modele_tpe'][ligne]),
+            type_tpe=TypeTPE(ethernet=bool(drapeaux & ETHERNET), quatre_cinq_g=bool(drapeaux & QUATRE_CINQ_G),
+                             config_reseau=config),
+            nombre_tpe=c['nombre_tpe'][ligne],
+            date_creation=chaine(c['date_creation'][ligne])
+        )
+
+    def statistiques(self) -> dict:
+        """Mêmes clés que GestionnaireTPE.statistiques(), calculées sur les colonnes"""
+        drapeaux = self.colonnes['drapeaux']
+        return {
+            'total_tpes': self.nombre_tpes,
+            'total_appareils': sum(self.colonnes['nombre_tpe']),
+            'type_ethernet': sum(1 for d in drapeaux if d & ETHERNET),
+            'type_4_5g': sum(1 for d in drapeaux if d & QUATRE_CINQ_G),
+            'backoffice_actifs': sum(1 for d in drapeaux if d & BACKOFFICE)
+        }
+
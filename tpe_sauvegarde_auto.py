@@ -0,0 +1,110 @@
+"""
+Sauvegarde automatique en arrière-plan
+Un thread d'écriture regroupe les modifications rapprochées en une seule
+sauvegarde, pour ne jamais bloquer la boucle d'événements de l'interface.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class SauvegardeAutomatique:
+    """
+    Écrivain en arrière-plan
+    marquer_modifie() signale une modification ; l'écriture a lieu au plus tard
+    `delai` secondes après la première modification non sauvegardée, toutes les
+    modifications survenues entre-temps étant couvertes par la même écriture.
+    """
+
+    def __init__(self, ecrire: Callable[[], bool], delai: float = 2.0,
+                 en_erreur: Optional[Callable[[str], None]] = None):
+        """
+        ecrire : fonction de sauvegarde (retourne True si succès), appelée dans le thread d'écriture
+        en_erreur : appelée dans le thread d'écriture avec le message d'erreur
+        """
+        self._ecrire = ecrire
+        self.delai = delai
+        self._en_erreur = en_erreur
+        self._condition = threading.Condition()
+        self._modifie = False
+        self._echeance = 0.0
+        self._en_cours = False
+        self._arret = False
+        self.derniere_erreur: Optional[str] = None
+        self.ecritures = 0
+        self._thread = threading.Thread(target=self._boucle, name="sauvegarde-auto", daemon=True)
+        self._thread.start()
+
+    @property
+    def modifie(self) -> bool:
+        """True si des modifications attendent d'être sauvegardées"""
+        with self._condition:
+            return self._modifie or self._en_cours or self.derniere_erreur is not None
+
+    def marquer_modifie(self):
+        """Signale une modification (retour immédiat)"""
+        with self._condition:
+            if self._arret:
+                raise RuntimeError("Sauvegarde automatique arrêtée")
+            if not self._modifie:
+                self._modifie = True
+                self._echeance = time.monotonic() + self.delai
+                self._condition.notify_all()
+
+    def vider(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sauvegarde immédiatement les modifications en attente et attend la fin de l'écriture
+        (nouvelle tentative si la précédente a échoué)
+        Retourne True si rien n'est en attente et que la dernière écriture a réussi
+        """
+        with self._condition:
+            if self._arret:
+                return not self._modifie and self.derniere_erreur is None
+            if self.derniere_erreur is not None:
+                self._modifie = True
+            if self._modifie:
+                self._echeance = time.monotonic()
+                self._condition.notify_all()
+            termine = self._condition.wait_for(lambda: not self._modifie and not self._en_cours, timeout)
+            return termine and self.derniere_erreur is None
+
+    def arreter(self, timeout: Optional[float] = None) -> bool:
+        """Sauvegarde ce qui est en attente puis arrête le thread (sans effet si déjà arrêté)"""
+        succes = self.vider(timeout)
+        with self._condition:
+            self._arret = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        return succes
+
+    def _boucle(self):
+        while True:
+            with self._condition:
+                while not self._arret and (not self._modifie or time.monotonic() < self._echeance):
+                    attente = self._echeance - time.monotonic() if self._modifie else None
+                    self._condition.wait(attente)
+                if not self._modifie:
+                    return
+                self._modifie = False
+                self._en_cours = True
+
+            erreur = self._executer()
+
+            with self._condition:
+                self._en_cours = False
+                # En cas d'échec, nouvelle tentative à la prochaine modification ou à vider()
+                self.derniere_erreur = erreur
+                self._condition.notify_all()
+            if erreur is not None and self._en_erreur is not None:
+                self._en_erreur(erreur)
+
+    def _executer(self) -> Optional[str]:
+        """Lance une écriture, retourne le message d'erreur éventuel"""
+        try:
+            if not self._ecrire():
+                return "Échec de la sauvegarde automatique"
+            self.ecritures += 1
+            return None
+        except Exception as e:
+            return f"Échec de la sauvegarde automatique : {e}"
@@ -0,0 +1,530 @@
+"""
+Stockage SQLite pour la gestion des T.P.E.
+Variante de GestionnaireTPE dont les données vivent dans une base SQLite locale :
+chaque modification ne touche que les lignes concernées, et le démarrage ne
+désérialise pas toute la flotte.
+"""
+
+import json
+import sqlite3
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from tpe_manager import (
+    GestionnaireTPE, TPE, Regisseur, AccesBackoffice, TypeTPE,
+    ConfigurationReseau, CarteCommercant, RapportLot, CHAMPS_INDEXES, _sous_verrou
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tpe (
+    shop_id INTEGER PRIMARY KEY,
+    ordre INTEGER NOT NULL,
+    service TEXT NOT NULL,
+    regisseur_prenom TEXT NOT NULL,
+    regisseur_nom TEXT NOT NULL,
+    regisseur_telephone TEXT NOT NULL,
+    regisseurs_suppleants TEXT NOT NULL,
+    backoffice_actif INTEGER NOT NULL,
+    backoffice_email TEXT,
+    modele_tpe TEXT NOT NULL,
+    ethernet INTEGER NOT NULL,
+    quatre_cinq_g INTEGER NOT NULL,
+    nombre_tpe INTEGER NOT NULL,
+    date_creation TEXT
+);
+CREATE TABLE IF NOT EXISTS carte_commercant (
+    shop_id INTEGER NOT NULL REFERENCES tpe(shop_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    rang INTEGER NOT NULL,
+    numero TEXT NOT NULL,
+    numero_serie_tpe TEXT,
+    PRIMARY KEY (shop_id, rang)
+);
+CREATE TABLE IF NOT EXISTS config_reseau (
+    shop_id INTEGER PRIMARY KEY REFERENCES tpe(shop_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    adresse_ip TEXT NOT NULL,
+    masque TEXT NOT NULL,
+    passerelle TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    cle TEXT PRIMARY KEY,
+    valeur INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tpe_ordre ON tpe(ordre);
+CREATE INDEX IF NOT EXISTS idx_tpe_service ON tpe(service);
+CREATE INDEX IF NOT EXISTS idx_tpe_modele ON tpe(modele_tpe);
+CREATE INDEX IF NOT EXISTS idx_carte_numero ON carte_commercant(numero);
+CREATE INDEX IF NOT EXISTS idx_carte_serie ON carte_commercant(numero_serie_tpe);
+CREATE INDEX IF NOT EXISTS idx_config_ip ON config_reseau(adresse_ip);
+"""
+
+# Colonnes de la table tpe correspondant aux critères de rechercher_par()
+COLONNES_CRITERES = {
+    'service': "t.service",
+    'modele_tpe': "t.modele_tpe",
+    'regisseur': "t.regisseur_prenom || ' ' || t.regisseur_nom",
+    'ethernet': "t.ethernet",
+    'quatre_cinq_g': "t.quatre_cinq_g",
+}
+
+SELECT_TPE = """
+    SELECT t.shop_id, t.service, t.regisseur_prenom, t.regisseur_nom, t.regisseur_telephone,
+           t.regisseurs_suppleants, t.backoffice_actif, t.backoffice_email, t.modele_tpe,
+           t.ethernet, t.quatre_cinq_g, t.nombre_tpe, t.date_creation,
+           c.adresse_ip, c.masque, c.passerelle
+    FROM tpe t LEFT JOIN config_reseau c ON c.shop_id = t.shop_id
+"""
+
+# Nombre maximal de paramètres par requête IN (...)
+TAILLE_PAQUET = 500
+
+
+class GestionnaireTPESQLite(GestionnaireTPE):
+    """
+    Gestionnaire de TPE stocké dans SQLite (tables tpe, carte_commercant, config_reseau)
+    Même API publique que GestionnaireTPE ; les structures en mémoire de la classe
+    parente ne sont pas utilisées. sauvegarder()/sauvegarder_indexe()/backup_json() exportent
+    la base vers les formats pickle/indexé/JSON, restaurer()/restaurer_json() la remplacent.
+    La connexion est partagée entre threads : tout accès à la base se fait sous self.verrou.
+    """
+
+    def __init__(self, fichier_db: str = "tpe_data.db", cartes_uniques: bool = False):
+        super().__init__(cartes_uniques=cartes_uniques)
+        self.fichier_db = fichier_db
+        self._connexion = sqlite3.connect(fichier_db, check_same_thread=False)
+        self._connexion.execute("PRAGMA foreign_keys = ON")
+        self._connexion.execute("PRAGMA journal_mode = WAL")
+        self._connexion.executescript(SCHEMA)
+
+    @_sous_verrou('verrou')
+    def fermer(self):
+        """Ferme la connexion à la base"""
+        super().fermer()
+        self._connexion.close()
+
+    def activer_journal(self, nom_fichier: str = None, synchro: bool = False):
+        """
+        Sans effet : chaque opération est déjà une transaction SQLite validée sur disque
+        (aucun fichier journal n'est ouvert, checkpoint() reste une simple sauvegarde)
+        """
+
+    # ========================================
+    # ÉCRITURE
+    # ========================================
+
+    def _meta(self, cle: str, defaut: int = 0) -> int:
+        ligne = self._connexion.execute("SELECT valeur FROM meta WHERE cle = ?", (cle,)).fetchone()
+        return ligne[0] if ligne else defaut
+
+    def _ecrire_meta(self, cle: str, valeur: int):
+        self._connexion.execute(
+            "INSERT INTO meta (cle, valeur) VALUES (?, ?) "
+            "ON CONFLICT(cle) DO UPDATE SET valeur = excluded.valeur", (cle, valeur))
+
+    @property
+    def prochain_shop_id(self) -> int:
+        """Prochain ShopID qui sera attribué automatiquement"""
+        with self.verrou:
+            return self._meta('prochain_shop_id', 1)
+
+    def _reserver(self, nombre: int) -> range:
+        if nombre < 1:
+            raise ValueError("Le nombre de ShopID à réserver doit être au minimum 1")
+        debut = self.prochain_shop_id
+        self._ecrire_meta('prochain_shop_id', debut + nombre)
+        return range(debut, debut + nombre)
+
+    @_sous_verrou('verrou')
+    def reserver_shop_ids(self, nombre: int) -> range:
+        """Réserve un bloc contigu de ShopID pour un import en masse"""
+        with self._connexion:
+            return self._reserver(nombre)
+
+    def _avancer_sequence(self, shop_id: int):
+        """Garantit que la séquence ShopID reste au-delà d'un ShopID explicite"""
+        if shop_id >= self.prochain_shop_id:
+            self._ecrire_meta('prochain_shop_id', shop_id + 1)
+
+    def _ecrire_tpe(self, tpe: TPE, ordre: int):
+        """Insère les lignes d'un TPE (tpe, cartes, configuration réseau)"""
+        self._connexion.execute(
+            "INSERT INTO tpe VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (tpe.shop_id, ordre, tpe.service, tpe.regisseur.prenom, tpe.regisseur.nom,
+             tpe.regisseur.telephone, tpe.regisseurs_suppleants, tpe.acces_backoffice.actif,
+             tpe.acces_backoffice.email, tpe.modele_tpe, tpe.type_tpe.ethernet,
+             tpe.type_tpe.quatre_cinq_g, tpe.nombre_tpe, tpe.date_creation)
+        )
+        self._ecrire_details(tpe)
+
+    def _ecrire_details(self, tpe: TPE):
+        self._connexion.executemany(
+            "INSERT INTO carte_commercant VALUES (?, ?, ?, ?)",
+            [(tpe.shop_id, rang, carte.numero, carte.numero_serie_tpe)
+             for rang, carte in enumerate(tpe.cartes_commercant)]
+        )
+        config = tpe.type_tpe.config_reseau
+        if config is not None:
+            self._connexion.execute(
+                "INSERT INTO config_reseau VALUES (?, ?, ?, ?)",
+                (tpe.shop_id, config.adresse_ip, config.masque, config.passerelle)
+            )
+
+    def _ordre_suivant(self) -> int:
+        return self._connexion.execute("SELECT COALESCE(MAX(ordre), 0) + 1 FROM tpe").fetchone()[0]
+
+    def _existe(self, shop_id: int) -> bool:
+        return self._connexion.execute("SELECT 1 FROM tpe WHERE shop_id = ?", (shop_id,)).fetchone() is not None
+
+    def _existants(self, shop_ids: List[int]) -> set:
+        """ShopID déjà présents dans la base parmi ceux donnés (requêtes IN par paquets)"""
+        existants = set()
+        for debut in range(0, len(shop_ids), TAILLE_PAQUET):
+            paquet = shop_ids[debut:debut + TAILLE_PAQUET]
+            existants.update(ligne[0] for ligne in self._connexion.execute(
+                f"SELECT shop_id FROM tpe WHERE shop_id IN ({','.join('?' * len(paquet))})", paquet))
+        return existants
+
+    def _proprietaires(self, colonne: str, valeur: str) -> set:
+        table = "config_reseau" if colonne == "adresse_ip" else "carte_commercant"
+        return {ligne[0] for ligne in self._connexion.execute(
+            f"SELECT shop_id FROM {table} WHERE {colonne} = ?", (valeur,))}
+
+    def _verifier_unicites(self, tpe: TPE, shop_id_actuel: Optional[int] = None, ip_actuelle: Optional[str] = None):
+        """
+        Unicité de l'adresse IP (et des cartes / numéros de série si cartes_uniques)
+        ip_actuelle : adresse du TPE modifié, non revérifiée si elle est conservée
+        """
+        config = tpe.type_tpe.config_reseau
+        if config is not None and config.adresse_ip != ip_actuelle and \
+                self._proprietaires("adresse_ip", config.adresse_ip) - {shop_id_actuel}:
+            raise ValueError(f"Adresse IP {config.adresse_ip} déjà attribuée")
+        if not self.cartes_uniques:
+            return
+        numeros = [c.numero for c in tpe.cartes_commercant]
+        series = [c.numero_serie_tpe for c in tpe.cartes_commercant if c.numero_serie_tpe]
+        for numero in numeros:
+            if numeros.count(numero) > 1 or self._proprietaires("numero", numero) - {shop_id_actuel}:
+                raise ValueError(f"Carte commerçant {numero} déjà attribuée")
+        for serie in series:
+            if series.count(serie) > 1 or self._proprietaires("numero_serie_tpe", serie) - {shop_id_actuel}:
+                raise ValueError(f"Numéro de série TPE {serie} déjà attribué")
+
+    @_sous_verrou('verrou')
+    def ajouter_tpe(self, tpe: TPE) -> bool:
+        """Ajoute un nouveau TPE (une transaction)"""
+        try:
+            with self._connexion:
+                if tpe.shop_id != 0 and self._existe(tpe.shop_id):
+                    raise ValueError(f"ShopID {tpe.shop_id} existe déjà")
+                self._verifier_unicites(tpe)
+                if tpe.shop_id == 0:
+                    tpe.shop_id = self._reserver(1).start
+                self._avancer_sequence(tpe.shop_id)
+                self._ecrire_tpe(tpe, self._ordre_suivant())
+            return True
+        except Exception as e:
+            self.derniere_erreur = str(e)
+            return False
+
+    @_sous_verrou('verrou')
+    def ajouter_tpes_lot(self, lot: Iterable[Union[TPE, dict]], tout_ou_rien: bool = True,
+                         convertir: Optional[Callable[[Any], dict]] = None) -> RapportLot:
+        """
+        Ajoute un lot de TPE en une seule transaction
+        Mêmes règles que GestionnaireTPE.ajouter_tpes_lot
+        """
+        rapport = RapportLot()
+        if convertir is None:
+            try:
+                lot = self._lot_migre(lot)
+            except ValueError as e:
+                rapport.erreurs.append((0, str(e)))
+                return rapport
+        candidats = []
+        for indice, ligne in enumerate(lot):
+            try:
+                if convertir is not None:
+                    ligne = convertir(ligne)
+                candidats.append((indice, ligne if isinstance(ligne, TPE) else TPE.from_dict(ligne)))
+            except Exception as e:
+                rapport.erreurs.append((indice, str(e)))
+
+        existants = self._existants([tpe.shop_id for _, tpe in candidats if tpe.shop_id != 0])
+        vus, cartes_vues, series_vues, ips_vues = set(), set(), set(), set()
+        valides: List[TPE] = []
+        for indice, tpe in candidats:
+            try:
+                if tpe.shop_id != 0:
+                    if tpe.shop_id in existants:
+                        raise ValueError(f"ShopID {tpe.shop_id} existe déjà")
+                    if tpe.shop_id in vus:
+                        raise ValueError(f"ShopID {tpe.shop_id} en double dans le lot")
+                self._verifier_unicites(tpe)
+                config = tpe.type_tpe.config_reseau
+                if config is not None and config.adresse_ip in ips_vues:
+                    raise ValueError(f"Adresse IP {config.adresse_ip} déjà attribuée")
+                if self.cartes_uniques:
+                    self._verifier_cartes_uniques(tpe, cartes_vues=cartes_vues, series_vues=series_vues)
+                if config is not None:
+                    ips_vues.add(config.adresse_ip)
+                if tpe.shop_id != 0:
+                    vus.add(tpe.shop_id)
+                valides.append(tpe)
+            except Exception as e:
+                rapport.erreurs.append((indice, str(e)))
+        rapport.erreurs.sort()
+
+        if tout_ou_rien and rapport.erreurs:
+            return rapport
+
+        with self._connexion:
+            if vus:
+                self._avancer_sequence(max(vus))
+            nb_auto = sum(1 for tpe in valides if tpe.shop_id == 0)
+            shop_ids_auto = iter(self._reserver(nb_auto)) if nb_auto else iter(())
+            ordre = self._ordre_suivant()
+            for tpe in valides:
+                if tpe.shop_id == 0:
+                    tpe.shop_id = next(shop_ids_auto)
+                self._ecrire_tpe(tpe, ordre)
+                ordre += 1
+                rapport.ajoutes.append(tpe.shop_id)
+        return rapport
+
+    @_sous_verrou('verrou')
+    def supprimer_tpe(self, shop_id: int) -> bool:
+        """Supprime un TPE par son ShopID (cartes et configuration supprimées en cascade)"""
+        try:
+            with self._connexion:
+                self._connexion.execute("DELETE FROM tpe WHERE shop_id = ?", (shop_id,))
+            return True
+        except Exception as e:
+            return False
+
+    @_sous_verrou('verrou')
+    def modifier_tpe(self, shop_id: int, nouveau_tpe: TPE) -> bool:
+        """Modifie un TPE existant (seules ses lignes sont réécrites)"""
+        try:
+            with self._connexion:
+                ligne = self._connexion.execute(
+                    "SELECT t.date_creation, c.adresse_ip FROM tpe t "
+                    "LEFT JOIN config_reseau c ON c.shop_id = t.shop_id WHERE t.shop_id = ?", (shop_id,)).fetchone()
+                if ligne is None:
+                    raise ValueError(f"ShopID {shop_id} introuvable")
+                if nouveau_tpe.shop_id != shop_id and self._existe(nouveau_tpe.shop_id):
+                    raise ValueError(f"ShopID {nouveau_tpe.shop_id} existe déjà")
+                self._verifier_unicites(nouveau_tpe, shop_id_actuel=shop_id, ip_actuelle=ligne[1])
+                nouveau_tpe.date_creation = ligne[0]
+                self._connexion.execute("DELETE FROM carte_commercant WHERE shop_id = ?", (shop_id,))
+                self._connexion.execute("DELETE FROM config_reseau WHERE shop_id = ?", (shop_id,))
+                self._connexion.execute(
+                    """UPDATE tpe SET shop_id = ?, service = ?, regisseur_prenom = ?, regisseur_nom = ?,
+                       regisseur_telephone = ?, regisseurs_suppleants = ?, backoffice_actif = ?,
+                       backoffice_email = ?, modele_tpe = ?, ethernet = ?, quatre_cinq_g = ?,
+                       nombre_tpe = ?, date_creation = ? WHERE shop_id = ?""",
+                    (nouveau_tpe.shop_id, nouveau_tpe.service, nouveau_tpe.regisseur.prenom,
+                     nouveau_tpe.regisseur.nom, nouveau_tpe.regisseur.telephone,
+                     nouveau_tpe.regisseurs_suppleants, nouveau_tpe.acces_backoffice.actif,
+                     nouveau_tpe.acces_backoffice.email, nouveau_tpe.modele_tpe,
+                     nouveau_tpe.type_tpe.ethernet, nouveau_tpe.type_tpe.quatre_cinq_g,
+                     nouveau_tpe.nombre_tpe, nouveau_tpe.date_creation, shop_id)
+                )
+                self._ecrire_details(nouveau_tpe)
+                self._avancer_sequence(nouveau_tpe.shop_id)
+            return True
+        except Exception as e:
+            self.derniere_erreur = str(e)
+            return False
+
+    @_sous_verrou('verrou')
+    def _reinitialiser(self, tpes: Iterable[TPE], prochain_shop_id: int = 1):
+        """Remplace tout le contenu de la base (restauration) en une transaction"""
+        with self._connexion:
+            self._connexion.execute("DELETE FROM tpe")
+            self._ecrire_meta('prochain_shop_id', 1)
+            for ordre, tpe in enumerate(tpes, start=1):
+                self._ecrire_tpe(tpe, ordre)
+                self._avancer_sequence(tpe.shop_id)
+            if prochain_shop_id > self.prochain_shop_id:
+                self._ecrire_meta('prochain_shop_id', prochain_shop_id)
+
+    def _reinitialiser_en_flux(self, tpes: Iterable[TPE], prochain_shop_id: int = 1):
+        """La transaction de _reinitialiser annule tout si la lecture échoue"""
+        self._reinitialiser(tpes, prochain_shop_id)
+
+    def _instantane_indexe(self) -> tuple:
+        """Instantané pour la sauvegarde indexée : aucun TPE différé, compteurs issus de la base"""
+        entrees = [(tpe.shop_id, tpe) for tpe in self._iterer_tpes()]
+        return entrees, {}, None, self.prochain_shop_id, self.statistiques()
+
+    def _restaurer_indexe(self, fichier: str):
+        """Pas de construction à la demande en base : tous les TPE sont insérés (une transaction)"""
+        entete, positions = self._lire_index(fichier)
+        with open(fichier, 'rb') as f:
+            def lire():
+                for position in positions[1::2]:
+                    f.seek(position)
+                    yield TPE.from_dict(json.loads(f.readline()))
+            self._reinitialiser(lire(), prochain_shop_id=entete.get('prochain_shop_id', 1))
+
+    # ========================================
+    # LECTURE
+    # ========================================
+
+    def _construire(self, ligne: tuple, cartes: List[CarteCommercant]) -> TPE:
+        """Construit un TPE à partir d'une ligne de SELECT_TPE et de ses cartes"""
+        (shop_id, service, prenom, nom, telephone, suppleants, backoffice_actif, email,
+         modele, ethernet, quatre_cinq_g, nombre_tpe, date_creation, ip, masque, passerelle) = ligne
+        config = ConfigurationReseau(ip, masque, passerelle) if ip is not None else None
+        return TPE(
+            service=service,
+            regisseur=Regisseur(prenom=prenom, nom=nom, telephone=telephone),
+            regisseurs_suppleants=suppleants,
+            cartes_commercant=cartes,
+            shop_id=shop_id,
+            acces_backoffice=AccesBackoffice(actif=bool(backoffice_actif), email=email),
+            modele_tpe=modele,
+            type_tpe=TypeTPE(ethernet=bool(ethernet), quatre_cinq_g=bool(quatre_cinq_g), config_reseau=config),
+            nombre_tpe=nombre_tpe,
+            date_creation=date_creation
+        )
+
+    def _cartes_de(self, shop_ids: List[int]) -> Dict[int, List[CarteCommercant]]:
+        cartes: Dict[int, List[CarteCommercant]] = {shop_id: [] for shop_id in shop_ids}
+        for debut in range(0, len(shop_ids), TAILLE_PAQUET):
+            paquet = shop_ids[debut:debut + TAILLE_PAQUET]
+            for shop_id, numero, serie in self._connexion.execute(
+                    f"SELECT shop_id, numero, numero_serie_tpe FROM carte_commercant "
+                    f"WHERE shop_id IN ({','.join('?' * len(paquet))}) ORDER BY shop_id, rang", paquet):
+                cartes[shop_id].append(CarteCommercant(numero=numero, numero_serie_tpe=serie))
+        return cartes
+
+    def _selectionner(self, condition: str = "", parametres: tuple = ()) -> Iterator[TPE]:
+        """
+        Parcourt les TPE vérifiant la condition SQL, par paquets, dans l'ordre d'insertion
+        Le verrou est tenu jusqu'à la fin du parcours (ou la fermeture du générateur)
+        """
+        with self.verrou:
+            curseur = self._connexion.execute(f"{SELECT_TPE} {condition} ORDER BY t.ordre", parametres)
+            while True:
+                lignes = curseur.fetchmany(TAILLE_PAQUET)
+                if not lignes:
+                    return
+                cartes = self._cartes_de([ligne[0] for ligne in lignes])
+                for ligne in lignes:
+                    yield self._construire(ligne, cartes[ligne[0]])
+
+    def _iterer_tpes(self) -> Iterator[TPE]:
+        return self._selectionner()
+
+    @property
+    def tpes(self) -> List[TPE]:
+        return self.lister_tpes()
+
+    @tpes.setter
+    def tpes(self, tpes: Iterable[TPE]):
+        self._reinitialiser(tpes)
+
+    def lister_tpes(self) -> List[TPE]:
+        """Retourne la liste complète des TPE"""
+        return list(self._selectionner())
+
+    def rechercher_tpe(self, shop_id: int) -> Optional[TPE]:
+        """Recherche un TPE par son ShopID"""
+        return next(self._selectionner("WHERE t.shop_id = ?", (shop_id,)), None)
+
+    def _par_sous_requete(self, table: str, colonne: str, valeur: str) -> List[TPE]:
+        return list(self._selectionner(
+            f"WHERE t.shop_id IN (SELECT shop_id FROM {table} WHERE {colonne} = ?)", (valeur,)))
+
+    def rechercher_par_carte(self, numero: str) -> List[TPE]:
+        """Retourne le(s) TPE portant ce numéro de carte commerçant"""
+        return self._par_sous_requete("carte_commercant", "numero", str(numero))
+
+    def rechercher_par_numero_serie(self, numero_serie: str) -> List[TPE]:
+        """Retourne le(s) TPE portant ce numéro de série"""
+        return self._par_sous_requete("carte_commercant", "numero_serie_tpe", numero_serie)
+
+    def rechercher_par_ip(self, adresse_ip: str) -> List[TPE]:
+        """Retourne le(s) TPE configuré(s) avec cette adresse IP"""
+        return self._par_sous_requete("config_reseau", "adresse_ip", adresse_ip)
+
+    def rechercher_par_passerelle(self, passerelle: str) -> List[TPE]:
+        """Retourne les TPE configurés derrière cette passerelle"""
+        return self._par_sous_requete("config_reseau", "passerelle", passerelle)
+
+    @_sous_verrou('verrou')
+    def rechercher_par_sous_reseau(self, reseau: str) -> List[TPE]:
+        """Retourne les TPE dont l'adresse IP est dans le sous-réseau (filtrage en Python)"""
+        from ipaddress import ip_address, ip_network
+        net = ip_network(reseau, strict=False)
+        return [
+            tpe for tpe in self._selectionner("WHERE c.adresse_ip IS NOT NULL")
+            if ip_address(tpe.type_tpe.config_reseau.adresse_ip) in net
+        ]
+
+    def rechercher_par(self, **criteres) -> List[TPE]:
+        """Recherche les TPE vérifiant tous les critères (voir GestionnaireTPE.rechercher_par)"""
+        conditions, parametres = [], []
+        for champ, valeur in criteres.items():
+            if champ not in CHAMPS_INDEXES:
+                raise ValueError(f"Critère non indexé: {champ}")
+            valeurs = list(valeur) if isinstance(valeur, (list, tuple, set)) else [valeur]
+            if not valeurs:
+                return []
+            conditions.append(f"{COLONNES_CRITERES[champ]} IN ({','.join('?' * len(valeurs))})")
+            parametres.extend(valeurs)
+        condition = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return list(self._selectionner(condition, tuple(parametres)))
+
+    @_sous_verrou('verrou')
+    def valeurs_indexees(self, champ: str) -> List:
+        """Retourne les valeurs distinctes présentes pour un champ"""
+        if champ not in CHAMPS_INDEXES:
+            raise ValueError(f"Critère non indexé: {champ}")
+        colonne = COLONNES_CRITERES[champ]
+        valeurs = [ligne[0] for ligne in self._connexion.execute(f"SELECT DISTINCT {colonne} FROM tpe t")]
+        return [bool(v) for v in valeurs] if champ in ('ethernet', 'quatre_cinq_g') else valeurs
+
+    @_sous_verrou('verrou')
+    def statistiques(self, verifier: bool = False) -> dict:
+        """
+        Retourne des statistiques sur les TPE (agrégats SQL)
+        verifier=True : recompte à partir des TPE reconstruits et lève RuntimeError en cas d'écart
+        """
+        total, appareils, ethernet, quatre_cinq_g, backoffice = self._connexion.execute(
+            "SELECT COUNT(*), COALESCE(SUM(nombre_tpe), 0), COALESCE(SUM(ethernet), 0), "
+            "COALESCE(SUM(quatre_cinq_g), 0), COALESCE(SUM(backoffice_actif), 0) FROM tpe"
+        ).fetchone()
+        stats = {
+            'total_tpes': total,
+            'total_appareils': appareils,
+            'type_ethernet': ethernet,
+            'type_4_5g': quatre_cinq_g,
+            'backoffice_actifs': backoffice
+        }
+        if verifier:
+            recompte = self._recompter_statistiques()
+            if recompte != stats:
+                raise RuntimeError(f"Compteurs incohérents: {stats} != recomptage {recompte}")
+        return stats
+
+    def _recompter_statistiques(self) -> dict:
+        """Calcule les statistiques par un parcours complet des TPE de la base"""
+        stats = self._compteurs_vides()
+        for tpe in self._selectionner():
+            stats['total_tpes'] += 1
+            stats['total_appareils'] += tpe.nombre_tpe
+            stats['type_ethernet'] += tpe.type_tpe.ethernet
+            stats['type_4_5g'] += tpe.type_tpe.quatre_cinq_g
+            stats['backoffice_actifs'] += tpe.acces_backoffice.actif
+        return stats
+
+    @_sous_verrou('verrou')
+    def rapport_par(self, champ: str) -> Dict[str, dict]:
+        """Nombre d'entrées et d'appareils par 'modele_tpe' ou par 'service'"""
+        if champ not in ('modele_tpe', 'service'):
+            raise ValueError(f"Regroupement impossible sur: {champ}")
+        return {
+            valeur: {'entrees': entrees, 'appareils': appareils}
+            for valeur, entrees, appareils in self._connexion.execute(
+                f"SELECT {champ}, COUNT(*), SUM(nombre_tpe) FROM tpe GROUP BY {champ} ORDER BY MIN(ordre)")
+        }